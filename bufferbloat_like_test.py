@@ -12,6 +12,8 @@
 # - Metrix: avg, stddev, IPDV, p5/p95, min/max
 # - Skor: Δp95 ve Δavg’e göre Excellent/Good/Fair/Poor
 # - SIGINT/SIGTERM yakalar → o ana kadarki verilerle “partial” özet basar
+# - OPROBE_CONVERGE=1 ise her faz, ortalama RTT'nin güven aralığı daralınca erken biter
+#   (faz süresi üst sınır olarak kalır)
 #
 # Notlar:
 # * Upload için varsayılan uç nokta: https://speed.cloudflare.com/__up
@@ -32,6 +34,9 @@ from typing import List, Tuple, Optional
 
 import requests
 
+from oprobe_records import RecordStream
+from oprobe_stats import ConvergenceTracker, convergence_from_env
+
 # -------------------- Varsayılanlar --------------------
 BASELINE_DURATION = 12.0
 LOAD_DURATION     = 12.0
@@ -50,6 +55,8 @@ DEFAULT_UPLOAD_URLS: List[str] = [
 USER_AGENT = "Oprobe-Bufferbloat/2.1"
 # -------------------------------------------------------
 
+REC = RecordStream("bufferbloat_like_test")
+
 
 @dataclass
 class PhaseStats:
@@ -173,7 +180,8 @@ def stop_load(stop_evt: threading.Event, threads: List[threading.Thread]):
 
 
 def measure_phase(host_for_probe: str, duration: float, sample_period: float, tls_probe: bool, discard: int,
-                  timeout: float, shared_buffer: Optional[List[float]] = None) -> List[float]:
+                  timeout: float, shared_buffer: Optional[List[float]] = None, phase: str = "",
+                  conv: Optional[ConvergenceTracker] = None) -> List[float]:
     values: List[float] = []
     deadline = time.monotonic() + duration
     next_t = time.monotonic()
@@ -187,6 +195,13 @@ def measure_phase(host_for_probe: str, duration: float, sample_period: float, tl
             values.append(ms)
             if shared_buffer is not None:
                 shared_buffer.append(ms)
+            REC.sample(host_for_probe, {"rtt_ms": ms}, phase=phase)
+            if conv is not None and len(values) > discard:
+                conv.add(ms)
+                if conv.converged():
+                    break
+        else:
+            REC.diagnostic(host_for_probe, "connect_failed", phase=phase)
         next_t += sample_period
     if discard and len(values) > discard:
         values = values[discard:]
@@ -206,6 +221,16 @@ def printable_stats(title: str, stats: PhaseStats) -> str:
     )
 
 
+def stats_metrics(stats: PhaseStats) -> dict:
+    return {"samples": stats.samples, "avg_ms": stats.avg, "stddev_ms": stats.stddev, "ipdv_ms": stats.ipdv,
+            "p5_ms": stats.p5, "p95_ms": stats.p95, "min_ms": stats.vmin, "max_ms": stats.vmax}
+
+
+def record_score(host: str, base: PhaseStats, load: PhaseStats, score: str, partial: bool = False):
+    REC.summary(host, {"delta_avg_ms": load.avg - base.avg, "delta_p95_ms": load.p95 - base.p95},
+                phase="score", score=score, partial=partial)
+
+
 def decide_score(base: PhaseStats, load: PhaseStats) -> Tuple[str, str]:
     delta_avg = load.avg - base.avg
     delta_p95 = load.p95 - base.p95
@@ -273,16 +298,19 @@ def main():
             bvals = baseline_buf[args.discard:] if len(baseline_buf) > args.discard else baseline_buf[:]
             bstats = compute_stats(bvals)
             print(printable_stats("Baseline Summary (partial)", bstats))
+            REC.summary(probe_host, stats_metrics(bstats), phase="baseline", partial=True)
         # Load partial
         if load_buf:
             lvals = load_buf[args.discard:] if len(load_buf) > args.discard else load_buf[:]
             lstats = compute_stats(lvals)
             print(printable_stats("Under Load Summary (partial)", lstats))
+            REC.summary(probe_host, stats_metrics(lstats), phase="load", partial=True)
         # Skor partial (her ikisi de varsa)
         if baseline_buf and load_buf:
             bvals = baseline_buf[args.discard:] if len(baseline_buf) > args.discard else baseline_buf[:]
             lvals = load_buf[args.discard:] if len(load_buf) > args.discard else load_buf[:]
             score, expl = decide_score(compute_stats(bvals), compute_stats(lvals))
+            record_score(probe_host, compute_stats(bvals), compute_stats(lvals), score, partial=True)
             print(f">>> Bufferbloat score (partial): {score}")
             print(expl)
         raise SystemExit(143)
@@ -292,23 +320,34 @@ def main():
 
     # Phase 1: Baseline
     print("--- Phase 1: Baseline (no load) ---")
+    base_conv = convergence_from_env(max_duration=args.baseline)
     base_values = measure_phase(probe_host, args.baseline, args.period, args.tls_probe, args.discard,
-                                timeout, shared_buffer=baseline_buf)
+                                timeout, shared_buffer=baseline_buf, phase="baseline", conv=base_conv)
     base_stats = compute_stats(base_values)
     print(printable_stats("Baseline Summary", base_stats))
+    if base_conv is not None:
+        print(f"Precision  : {base_conv.describe('baseline avg')}\n")
+    REC.summary(probe_host, dict(stats_metrics(base_stats), **(base_conv.metrics() if base_conv else {})),
+                phase="baseline")
 
     # Phase 2: Under Load
     print("--- Phase 2: Under Load ---")
     stop_evt, threads = start_load(args.dl, args.ul, args.num_dl, args.num_ul, timeout)
+    load_conv = convergence_from_env(max_duration=args.load)
     try:
         load_values = measure_phase(probe_host, args.load, args.period, args.tls_probe, args.discard,
-                                    timeout, shared_buffer=load_buf)
+                                    timeout, shared_buffer=load_buf, phase="load", conv=load_conv)
     finally:
         stop_load(stop_evt, threads)
     load_stats = compute_stats(load_values)
     print(printable_stats("Under Load Summary", load_stats))
+    if load_conv is not None:
+        print(f"Precision  : {load_conv.describe('load avg')}\n")
+    REC.summary(probe_host, dict(stats_metrics(load_stats), **(load_conv.metrics() if load_conv else {})),
+                phase="load")
 
     score, expl = decide_score(base_stats, load_stats)
+    record_score(probe_host, base_stats, load_stats, score)
     print(f">>> Bufferbloat score: {score}")
     print(expl)
     print("Test complete.")
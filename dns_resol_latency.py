@@ -1,18 +1,59 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, re, time, shutil, socket, subprocess
+# DNS sorguları süreç içinde (oprobe_dns): wire format, ham UDP/TCP soketi, gecikme
+# perf_counter_ns ile sadece gönderim -> yanıt arasında ölçülür (dig/nslookup süreci yok).
+# Sorgular paralel: sunucu x domain işleri ortak bir havuzda koşar, her sunucuya aynı anda en
+# fazla MAX_INFLIGHT_PER_SERVER sorgu gider. Turlar sabit takvimdedir (ROUND_INTERVAL); bir
+# sunucunun önceki turu bitmediyse o sunucu bu tur atlanır, diğerleri beklemez.
+# Yetenek önbelleği: her sunucu için hangi yolun (udp/A, tcp/A, ...) cevap verdiği öğrenilir.
+# Art arda BAD_AFTER kez cevapsız kalan yol NEGATIVE_TTL boyunca atlanır, süre dolunca yeniden
+# denenir (re-probe). Teşhis satırları öğrenilen durumu gösterir.
+# Önbellek atlatma: MISS_ZONE verilirse her turda DOMAINS'in (önbellekten dönen, "hit") yanında
+# bu bölge altında her sorguda benzersiz rastgele etiketli isimler sorulur ("miss"): resolver
+# cevabı önbellekte bulamaz, gerçek özyinelemeli çözümleme süresi ölçülür. Hit ve miss
+# dağılımları sunucu başına ayrı tutulur. Yerel deneme: oprobe_dns_standin.py
+# Şifreli DNS: DoT (RFC 7858) ve DoH (RFC 8484) sunucuları turlar boyunca açık kalan tek bir
+# bağlantıdan sorulur (DoT'ta bir turun sorguları art arda/pipelined gider). El sıkışma (TCP + TLS)
+# sadece bağlantı kurulurken olur ve sorgu gecikmesinden ayrı raporlanır.
+import os, re, math, time, shutil, socket, threading, subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from oprobe_dns import DNS_PORT, DOT_PORT, DoHClient, DoTClient, query as dns_query
+from oprobe_records import RecordStream
+from oprobe_stats import StreamStats
+
 NO_ARTIFACTS = True
 DOMAINS = ["google.com","cloudflare.com","microsoft.com","amazon.com","apple.com","wikipedia.org"]
 QUERY_TIMEOUT_SEC = 2.0
+ROUND_INTERVAL = 5            # saniye; tur başlangıçları sabit ızgarada
+MAX_CONCURRENCY = 16          # toplam eşzamanlı sorgu işi
+MAX_INFLIGHT_PER_SERVER = 2   # bir sunucuya aynı anda en fazla (kendi kendini tıkamamak için)
+
+# Sunucu başına deneme sırası: ilk geçerli yanıt (NOERROR/NXDOMAIN) ölçümdür
+QUERY_PLAN = [("udp", "A"), ("udp", "AAAA"), ("tcp", "A"), ("tcp", "AAAA")]
+NEGATIVE_TTL = 60             # saniye; cevapsız yol bu kadar atlanır, sonra yeniden denenir
+BAD_AFTER = 2                 # bir yolu "bad" saymak için art arda cevapsız sorgu sayısı
+
+# Joker (*.zone) kaydı olan, bizim kontrolümüzdeki bir bölge; boşsa miss sorguları kapalı
+MISS_ZONE = os.environ.get("OPROBE_DNS_MISS_ZONE", "").strip().strip(".") or None
+MISS_QUERIES_PER_ROUND = 2    # sunucu başına tur başına miss sorgusu
+# Virgüllü sunucu listesi (otomatik bulmanın yerine); "ip#port" yazımı yerel test sunucuları için
+SERVERS_OVERRIDE = os.environ.get("OPROBE_DNS_SERVERS", "")
+# Şifreli sunucular (virgüllü, boşsa kapalı); sertifika sistemin CA deposuyla (SSL_CERT_FILE) doğrulanır
+#   OPROBE_DNS_DOT: "ip[#port][@tls-adı]"  ör. 1.1.1.1@cloudflare-dns.com, 127.0.0.1#8853@localhost
+#   OPROBE_DNS_DOH: URL                     ör. https://cloudflare-dns.com/dns-query
+DOT_SERVERS = [s.strip() for s in os.environ.get("OPROBE_DNS_DOT", "").split(",") if s.strip()]
+DOH_URLS = [s.strip() for s in os.environ.get("OPROBE_DNS_DOH", "").split(",") if s.strip()]
 
-DIG = shutil.which("dig")
-NSLOOKUP = shutil.which("nslookup")
 RESOLVECTL = shutil.which("resolvectl")
-GETENT = shutil.which("getent")
+
+REC = RecordStream("dns_resol_latency")
 
 def get_system_dns():
+    if SERVERS_OVERRIDE.strip():
+        return [s.strip() for s in SERVERS_OVERRIDE.split(",") if s.strip()]
     ips = []
     # 1) resolvectl
     if RESOLVECTL:
@@ -45,128 +86,401 @@ def get_system_dns():
     loop=[i for i in uniq if is_loopback(i)]
     return non_loop+loop
 
-def _run(cmd, timeout):
-    try:
-        t0 = time.monotonic()
-        p = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        dt = (time.monotonic()-t0)*1000.0
-        return p.returncode, p.stdout, p.stderr, round(dt,2)
-    except subprocess.TimeoutExpired:
-        return 124, "", "timeout", None
-    except Exception as e:
-        return 125, "", str(e), None
-
-def dig_query(server, domain, use_tcp=False, qtype="A"):
-    if not DIG: return None, "dig_missing"
-    cmd = [DIG, f"@{server}", domain, qtype, "+tries=1", f"+time={int(QUERY_TIMEOUT_SEC)}", "+short"]
-    if use_tcp: cmd.append("+tcp")
-    rc, out, err, dt = _run(cmd, QUERY_TIMEOUT_SEC+0.5)
-    if rc==0 and out.strip():
-        return dt, None
-    if rc==0 and not out.strip():
-        # bazı durumlarda NOERROR ama cevap boş olabilir (dt yine de anlamlı)
-        return dt, "dig_noanswer"
-    if rc==124: return None, "dig_timeout"
-    return None, f"dig_rc{rc}"
-
-def nslookup_query(server, domain):
-    if not NSLOOKUP: return None, "nslookup_missing"
-    cmd = [NSLOOKUP, domain, server]
-    rc, out, err, dt = _run(cmd, QUERY_TIMEOUT_SEC+0.5)
-    if rc==0 and re.search(r"Address:\s", out): return dt, None
-    if rc==124: return None, "nslookup_timeout"
-    return None, f"nslookup_rc{rc}"
+def _split_server(server, default_port=DNS_PORT):
+    # "127.0.0.1#5300" -> ("127.0.0.1", 5300); IPv6 adreslerindeki ':' ile karışmasın diye '#'
+    host, sep, port = server.partition("#")
+    return host, int(port) if sep else default_port
+
+def encrypted_clients():
+    """{label: DoTClient | DoHClient} for DOT_SERVERS and DOH_URLS (labels: 'dot://ip[#port]', the DoH URL)."""
+    clients = {}
+    for spec in DOT_SERVERS:
+        addr, _, tls_name = spec.partition("@")
+        host, port = _split_server(addr, DOT_PORT)
+        clients[f"dot://{addr}"] = DoTClient(host, port, server_name=tls_name or None, timeout=QUERY_TIMEOUT_SEC)
+    for url in DOH_URLS:
+        clients[url] = DoHClient(url, timeout=QUERY_TIMEOUT_SEC)
+    return clients
+
+def miss_name(zone=None):
+    """A fresh random name under ``zone`` (MISS_ZONE), e.g. 'm-5c1f0a9e3b2d.probe.example.net'."""
+    return f"m-{os.urandom(6).hex()}.{zone or MISS_ZONE}"
+
+def native_query(server, domain, transport="udp", qtype="A"):
+    """(latency_ms, reason, reached) of one in-process query; latency is None on failure.
+
+    ``reached`` says whether the path itself works: the server answered and
+    did not refuse (SERVFAIL or truncation are about the domain, not the path).
+    """
+    host, port = _split_server(server)
+    r = dns_query(host, domain, qtype, transport=transport, timeout=QUERY_TIMEOUT_SEC, port=port)
+    return interpret(r, transport)
+
+def interpret(r, transport):
+    """(latency_ms, reason, reached) from an oprobe_dns result; see native_query."""
+    if not r["ok"]:
+        return None, f"{transport}_{r['error'].split(':', 1)[0]}", False
+    if r["rcode_name"] == "REFUSED":
+        return None, f"{transport}_refused", False
+    if r["tc"] and transport == "udp":
+        return None, "udp_truncated", True
+    if r["rcode_name"] not in ("NOERROR", "NXDOMAIN"):
+        return None, f"{transport}_{r['rcode_name'].lower()}", True
+    # NOERROR ama boş cevap da bir gidiş-dönüştür (süre anlamlı)
+    return (round(r["latency_ms"], 3), None if r["answers"] or r["rcode_name"] == "NXDOMAIN" else "noanswer",
+            True)
+
+class CapabilityCache:
+    """Per-resolver knowledge of which query paths (transport/qtype) get answers.
+
+    A path that fails ``bad_after`` times in a row is marked bad and skipped
+    until ``negative_ttl`` passes; the next query then re-probes it, and one
+    more failure marks it bad again. Any answer marks it ok. Thread-safe.
+    """
+
+    def __init__(self, negative_ttl=NEGATIVE_TTL, bad_after=BAD_AFTER):
+        self.negative_ttl = negative_ttl
+        self.bad_after = bad_after
+        self._lock = threading.Lock()
+        self._caps = {}   # sunucu -> {(transport, qtype): {"state", "fails", "reason", "until"}}
+
+    def usable(self, server, step, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._caps.get(server, {}).get(step)
+            return entry is None or entry["state"] != "bad" or now >= entry["until"]
+
+    def record(self, server, step, reached, reason=None, now=None):
+        """Learn from one outcome; returns the new state if it changed ("ok" / "bad"), else None."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._caps.setdefault(server, {}).setdefault(
+                step, {"state": "unknown", "fails": 0, "reason": None, "until": 0.0})
+            old = entry["state"]
+            if reached:
+                entry.update(state="ok", fails=0, reason=None, until=0.0)
+            else:
+                entry["fails"] += 1
+                entry["reason"] = reason
+                if entry["fails"] >= self.bad_after:
+                    entry.update(state="bad", until=now + self.negative_ttl)
+            return entry["state"] if entry["state"] != old and entry["state"] != "unknown" else None
+
+    def snapshot(self, server, now=None):
+        """{"udp/A": "ok" | "bad:<reason>" | "reprobe" | "unknown", ...} for QUERY_PLAN paths."""
+        now = time.monotonic() if now is None else now
+        out = {}
+        with self._lock:
+            caps = self._caps.get(server, {})
+            for step in QUERY_PLAN:
+                entry = caps.get(step)
+                key = f"{step[0]}/{step[1]}"
+                if entry is None or entry["state"] == "unknown":
+                    out[key] = "unknown"
+                elif entry["state"] == "bad":
+                    out[key] = f"bad:{entry['reason']}" if now < entry["until"] else "reprobe"
+                else:
+                    out[key] = "ok"
+        return out
+
+    def describe(self, server):
+        """'udp/A ok, tcp/A bad(tcp_timeout, retry in 42s)' for the paths that have been tried."""
+        now = time.monotonic()
+        parts = []
+        with self._lock:
+            for step, entry in self._caps.get(server, {}).items():
+                key = f"{step[0]}/{step[1]}"
+                if entry["state"] == "ok":
+                    parts.append(f"{key} ok")
+                elif entry["state"] == "bad":
+                    left = entry["until"] - now
+                    retry = f"retry in {left:.0f}s" if left > 0 else "re-probing"
+                    parts.append(f"{key} bad({entry['reason']}, {retry})")
+        return ", ".join(parts)
+
+CAPS = CapabilityCache()
+
+# Sunucu başına hit / miss gecikme dağılımları (tüm turlar boyunca, sabit bellek)
+_DISTS = {}
+_DISTS_LOCK = threading.Lock()
+
+def distributions(server):
+    """{"hit", "miss", "handshake": StreamStats} for ``server``, created on first use."""
+    with _DISTS_LOCK:
+        return _DISTS.setdefault(server, {"hit": StreamStats(quantiles=(50, 95)),
+                                          "miss": StreamStats(quantiles=(50, 95)),
+                                          "handshake": StreamStats(quantiles=(50, 95))})
 
 def system_resolver_query(domain):
-    # En güvenlisi: socket.getaddrinfo süre ölçümü
-    t0 = time.monotonic()
+    # Sunucu bilinmiyorsa: işletim sisteminin çözümleyicisi (önbellek dahil)
+    t0 = time.perf_counter_ns()
     try:
         socket.getaddrinfo(domain, None, proto=socket.IPPROTO_TCP)
-        dt = (time.monotonic()-t0)*1000.0
-        return round(dt,2), None
+        return round((time.perf_counter_ns() - t0) / 1e6, 3), None
     except socket.gaierror:
-        # yedek: getent hosts
-        if GETENT:
-            rc, out, err, dt = _run([GETENT,"hosts",domain], QUERY_TIMEOUT_SEC+0.5)
-            if rc==0 and out.strip(): return dt, None
-            if rc==124: return None, "getent_timeout"
         return None, "resolver_error"
 
-def normalize_ipv6_scope_for_tool(server, tool="dig"):
-    # dig @fe80::1%eth0 destekler; nslookup genelde etmez. nslookup için %iface'i düşür.
-    if "%" in server and tool=="nslookup":
-        return server.split("%",1)[0]
-    return server
-
-def measure_server(server, domains):
-    diags = []  # kısaca neden başarısız oldu
-    lats = []
-    for d in domains:
-        # Önce dig UDP A, sonra AAAA, sonra dig TCP, sonra nslookup, en sonda sistem resolver
-        val=None; reason=None
-
-        if DIG:
-            # UDP A
-            val, reason = dig_query(server, d, use_tcp=False, qtype="A")
-            if val is None:
-                # UDP AAAA
-                val, reason = dig_query(server, d, use_tcp=False, qtype="AAAA")
-            if val is None:
-                # TCP A
-                val, reason = dig_query(server, d, use_tcp=True, qtype="A")
-            if val is None:
-                # TCP AAAA
-                val, reason = dig_query(server, d, use_tcp=True, qtype="AAAA")
-
-        if val is None and NSLOOKUP:
-            srv = normalize_ipv6_scope_for_tool(server, tool="nslookup")
-            val, reason = nslookup_query(srv, d)
-
-        if val is None:
-            # sistem resolver
-            val, reason = system_resolver_query(d)
-
-        if val is None and reason:
-            diags.append(reason)
-        lats.append(val)
+def query_domain(server, d, kind="hit"):
+    """(latency_ms, reason) for ``d`` on ``server`` following QUERY_PLAN; records a sample or diagnostic.
+
+    With ``kind="miss"`` ``d`` is a zone and every attempt asks a fresh random
+    name under it, so the answer cannot come from the resolver's cache.
+    """
+    # UDP A, UDP AAAA, TCP A, TCP AAAA (QUERY_PLAN); bilinen kötü yollar atlanır. Hiçbiri
+    # olmazsa teşhis kaydedilir: sistem resolver'a düşmek onun gecikmesini bu sunucuya yazardı
+    miss = kind == "miss"
+    val=None; reason=None
+    for step in QUERY_PLAN:
+        if not CAPS.usable(server, step):
+            reason = reason or "known_bad"
+            continue
+        name = miss_name(d) if miss else d
+        val, reason, reached = native_query(server, name, transport=step[0], qtype=step[1])
+        # Miss'te zaman aşımı yavaş özyinelemeden de olabilir: yol sadece cevap gelince öğrenilir
+        changed = CAPS.record(server, step, reached, reason) if reached or not miss else None
+        if changed:
+            msg = f"{step[0]}/{step[1]} -> {changed}" + (f" ({reason})" if changed == "bad" else "")
+            print(f"DNS {server}: capability {msg}", flush=True)
+            REC.diagnostic(server, "capability", msg, path=f"{step[0]}/{step[1]}", state=changed)
+        if val is not None:
+            break
+
+    if val is None:
+        reason = reason or "failed"
+        REC.diagnostic(server, reason, domain=d, mode=kind)
+    else:
+        REC.sample(server, {"latency_ms": val}, domain=d, mode=kind)
+    return val, reason
+
+def _fmt_dist(st):
+    if not st.n:
+        return "N/A"
+    return f"p50={st.quantile(50):.2f} p95={st.quantile(95):.2f} ms (n={st.n})"
+
+def report_server(server, round_no, results, transport=None, handshakes=None):
+    """Print and record one server's round from its [(kind, latency_ms, reason), ...] list.
+
+    Encrypted resolvers pass their ``transport`` ("dot" / "doh") and the
+    connection ``handshakes`` made during the round, reported on their own.
+    """
+    lats = [v for k, v, _ in results if k == "hit"]
     ok = [x for x in lats if x is not None]
     avg = round(sum(ok)/len(ok),2) if ok else None
-    # en yaygın hata kodunu kısa bilgi olarak dönelim
-    hint = max(set(diags), key=diags.count) if diags else None
-    return avg, lats, hint
+    miss_lats = [v for k, v, _ in results if k == "miss"]
+    miss_ok = [x for x in miss_lats if x is not None]
+    dists = distributions(server)
+    for x in ok:
+        dists["hit"].add(x)
+    for x in miss_ok:
+        dists["miss"].add(x)
+    metrics = {"avg_ms": avg, "ok": len(ok), "failed": len(lats) - len(ok)}
+    if miss_lats:
+        metrics.update(miss_avg_ms=round(sum(miss_ok)/len(miss_ok),2) if miss_ok else None,
+                       miss_ok=len(miss_ok), miss_failed=len(miss_lats) - len(miss_ok))
+    if transport is None:
+        # Öğrenilen yetenek durumu (çoğunluk oyu yerine): hangi yol çalışıyor, hangisi atlanıyor
+        caps = CAPS.snapshot(server)
+        REC.summary(server, metrics, round=round_no, caps=caps)
+        degraded = any(v != "ok" and v != "unknown" for v in caps.values())
+        hint_s = f"  [caps: {CAPS.describe(server)}]" if degraded or len(ok) < len(lats) else ""
+    else:
+        # El sıkışma sorgu gecikmesine karışmaz: ayrı metrik, ayrı dağılım
+        hs_ok = [h for h in handshakes or () if h["ok"]]
+        for h in hs_ok:
+            dists["handshake"].add(h["handshake_ms"])
+        metrics["handshakes"] = len(hs_ok)
+        if hs_ok:
+            metrics.update(handshake_ms=round(sum(h["handshake_ms"] for h in hs_ok)/len(hs_ok),3),
+                           tcp_ms=round(sum(h["tcp_ms"] for h in hs_ok)/len(hs_ok),3),
+                           tls_ms=round(sum(h["tls_ms"] for h in hs_ok)/len(hs_ok),3))
+        REC.summary(server, metrics, round=round_no, transport=transport)
+        if hs_ok:
+            h = hs_ok[-1]
+            hint_s = (f"  [{transport}, new connection: tcp {h['tcp_ms']:.2f} + tls {h['tls_ms']:.2f} ms"
+                      + (" resumed" if h["resumed"] else "") + "]")
+        elif handshakes:
+            hint_s = f"  [{transport}, connect failed: {handshakes[-1]['error']}]"
+        else:
+            hint_s = f"  [{transport}, reused connection]"
+    # Birikmiş dağılımlar: hit ve miss ayrı kayıtlar (mode etiketiyle)
+    for kind, st in dists.items():
+        if st.n:
+            REC.summary(server, dict(st.summary(), n=st.n), round=round_no, mode=kind, scope="dist",
+                        transport=transport)
+    if avg is None:
+        print(f"DNS {server} (#{round_no}): avg=N/A -> {lats}{hint_s}", flush=True)
+    else:
+        print(f"DNS {server} (#{round_no}): avg={avg:.2f} ms -> {lats}{hint_s}", flush=True)
+    if miss_lats:
+        m_avg = metrics["miss_avg_ms"]
+        print(f"DNS {server} (#{round_no}): miss avg={f'{m_avg:.2f} ms' if m_avg is not None else 'N/A'} "
+              f"-> {miss_lats} | hit {_fmt_dist(dists['hit'])}, miss {_fmt_dist(dists['miss'])}", flush=True)
+    if transport is not None and metrics["handshakes"]:
+        print(f"DNS {server} (#{round_no}): handshake {_fmt_dist(dists['handshake'])}", flush=True)
+
+def round_queries():
+    """[(kind, name), ...] for one server round: cached DOMAINS plus cache-busting misses."""
+    queries = [("hit", d) for d in DOMAINS]
+    if MISS_ZONE:
+        queries += [("miss", MISS_ZONE)] * MISS_QUERIES_PER_ROUND
+    return queries
+
+class ServerRound:
+    """One server's queries for one round, dispatched at most ``limit`` at a time.
+
+    Queued domains are submitted from completion callbacks rather than by
+    workers blocking on a semaphore, so a dead resolver holds at most
+    ``limit`` pool threads and never starves the healthy ones.
+    """
+
+    def __init__(self, pool, server, queries, round_no, limit=MAX_INFLIGHT_PER_SERVER):
+        self.pool = pool
+        self.server = server
+        self.round_no = round_no
+        self.limit = max(1, limit)
+        self.results = [None] * len(queries)
+        self.done = threading.Event()
+        self._queue = deque(enumerate(queries))
+        self._running = 0
+        self._remaining = len(queries)
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not self._remaining:
+            self.done.set()
+        self._dispatch()
+        return self
+
+    def _dispatch(self):
+        with self._lock:
+            batch = []
+            while self._running < self.limit and self._queue:
+                batch.append(self._queue.popleft())
+                self._running += 1
+        for idx, q in batch:
+            self.pool.submit(self._run, idx, q)
+
+    def _run(self, idx, q):
+        kind, d = q
+        try:
+            res = query_domain(self.server, d, kind)
+        except Exception as e:   # bir sorgunun hatası turu kilitlemesin
+            res = (None, f"error_{type(e).__name__}")
+        with self._lock:
+            self.results[idx] = (kind,) + tuple(res)
+            self._running -= 1
+            self._remaining -= 1
+            finished = self._remaining == 0
+        if finished:
+            report_server(self.server, self.round_no, self.results)
+            self.done.set()
+        else:
+            self._dispatch()
+
+class EncryptedRound:
+    """One round of an encrypted resolver on its persistent DoTClient / DoHClient.
+
+    The round's queries go out as one batch (pipelined on DoT, back to back
+    on the keep-alive connection on DoH), so the whole round is a single pool
+    task. A dropped connection is re-established by the client; its
+    handshake is reported apart from the query latencies.
+    """
+
+    def __init__(self, pool, label, client, queries, round_no):
+        self.pool = pool
+        self.label = label
+        self.client = client
+        self.queries = queries
+        self.round_no = round_no
+        self.done = threading.Event()
+
+    def start(self):
+        self.pool.submit(self._run)
+        return self
+
+    def _run(self):
+        transport = self.client.transport
+        try:
+            names = [(miss_name(d) if kind == "miss" else d, "A") for kind, d in self.queries]
+            answers = self.client.query_many(names)
+            handshakes = self.client.take_handshakes()
+            for h in handshakes:
+                if h["ok"]:
+                    REC.sample(self.label, {k: h[k] for k in ("tcp_ms", "tls_ms", "handshake_ms")},
+                               scope="handshake", transport=transport, resumed=h["resumed"])
+                else:
+                    REC.diagnostic(self.label, f"{transport}_handshake", h["error"], transport=transport)
+            results = []
+            for (kind, d), r in zip(self.queries, answers):
+                val, reason, _ = interpret(r, transport)
+                if val is None:
+                    REC.diagnostic(self.label, reason, domain=d, mode=kind, transport=transport)
+                else:
+                    REC.sample(self.label, {"latency_ms": val}, domain=d, mode=kind, transport=transport)
+                results.append((kind, val, reason))
+            report_server(self.label, self.round_no, results, transport=transport, handshakes=handshakes)
+        except Exception as e:   # bir turun hatası sonraki turları kilitlemesin
+            print(f"DNS {self.label} (#{self.round_no}): error {type(e).__name__}: {e}", flush=True)
+            REC.diagnostic(self.label, f"error_{type(e).__name__}", str(e), round=self.round_no)
+        finally:
+            self.done.set()
 
 def main():
     os.environ["PYTHONUNBUFFERED"] = "1"
     servers = get_system_dns()
+    encrypted = encrypted_clients()
     print("=== DNS Resolver Latency Test (auto-detect) ===")
     print(f"Detected DNS servers: {', '.join(servers) if servers else '(none)'}")
     print(f"Domains: {', '.join(DOMAINS)}")
+    if MISS_ZONE:
+        print(f"Cache-busting: {MISS_QUERIES_PER_ROUND} random names under {MISS_ZONE} per server per round")
+    if encrypted:
+        print(f"Encrypted (persistent connections): {', '.join(encrypted)}")
     print(f"(NO_ARTIFACTS={NO_ARTIFACTS}, timeout={QUERY_TIMEOUT_SEC}s per query)")
     print("="*70)
 
+    workers = max(1, min(MAX_CONCURRENCY, len(servers) * MAX_INFLIGHT_PER_SERVER + len(encrypted)))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dns")
+    inflight = {}   # sunucu -> ServerRound (henüz bitmemiş olabilir)
+    t0 = time.monotonic()
     n=1
     while True:
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"\n--- Test #{n} @ {ts} ---")
         if servers:
             for srv in servers:
-                avg, lst, hint = measure_server(srv, DOMAINS)
-                hint_s = f"  [diag:{hint}]" if hint else ""
-                if avg is None:
-                    print(f"DNS {srv}: avg=N/A -> {lst}{hint_s}")
-                else:
-                    print(f"DNS {srv}: avg={avg:.2f} ms -> {lst}{hint_s}")
+                prev = inflight.get(srv)
+                if prev is not None and not prev.done.is_set():
+                    # Önceki tur sürüyor (ör. ölü resolver): üst üste bindirme, bu turu atla
+                    print(f"DNS {srv} (#{n}): skipped, round #{prev.round_no} still running", flush=True)
+                    REC.diagnostic(srv, "busy", f"round {prev.round_no} still running", round=n)
+                    continue
+                inflight[srv] = ServerRound(pool, srv, round_queries(), n).start()
         else:
             # hiç server bulunamadı, sadece sistem resolver
             vals=[]; det=[]
             for d in DOMAINS:
                 v, r = system_resolver_query(d)
                 vals.append(v); det.append(v)
+                if v is None:
+                    REC.diagnostic("system", r, domain=d)
+                else:
+                    REC.sample("system", {"latency_ms": v}, domain=d)
             oks=[x for x in vals if x is not None]
             avg = round(sum(oks)/len(oks),2) if oks else None
+            REC.summary("system", {"avg_ms": avg, "ok": len(oks), "failed": len(vals)-len(oks)}, round=n)
             print(f"System resolver: avg={avg if avg is not None else 'N/A'} -> {det}")
-        n+=1
-        time.sleep(5)
+        for label, client in encrypted.items():
+            prev = inflight.get(label)
+            if prev is not None and not prev.done.is_set():
+                print(f"DNS {label} (#{n}): skipped, round #{prev.round_no} still running", flush=True)
+                REC.diagnostic(label, "busy", f"round {prev.round_no} still running", round=n)
+                continue
+            inflight[label] = EncryptedRound(pool, label, client, round_queries(), n).start()
+        # Sabit takvim: tur n+1, t0 + n * ROUND_INTERVAL'da başlar (kaçırılan başlangıçlar atlanır)
+        now = time.monotonic()
+        n = max(n + 1, math.ceil((now - t0) / ROUND_INTERVAL) + 1)
+        time.sleep(max(0.0, t0 + (n - 1) * ROUND_INTERVAL - now))
 
 if __name__=="__main__":
     main()
@@ -1,7 +1,15 @@
-import requests
 import time
 import os
+import socket
+import threading
 from datetime import datetime
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from oprobe_http import PHASES, HttpProber, connection_kind, format_phases
+from oprobe_records import RecordStream
+from oprobe_stats import Welford, convergence_from_env
+from oprobe_targets import RotatingSchedule, load_targets, shard
 
 # Dosya/klasör üretimini kapat
 NO_ARTIFACTS = True
@@ -17,58 +25,200 @@ HTTPS_LIST = [
     "https://www.espn.com", "https://www.spotify.com"
 ]
 
+# Büyük hedef listesi (oprobe_targets): CSV/JSON dosyası verilirse HTTPS_LIST yerine kullanılır.
+# Hedefler turlara döner alt kümeler halinde dağıtılır; OPROBE_AGENTS virgüllü ajan
+# listesiyse her ajan tutarlı hash ile kendi payını ölçer (ajan adı: OPROBE_AGENT_ID ya da hostname).
+TARGETS_FILE = os.environ.get("OPROBE_HTTPS_TARGETS") or None
+SHARD_AGENTS = [a.strip() for a in os.environ.get("OPROBE_AGENTS", "").split(",") if a.strip()]
+AGENT_ID = os.environ.get("OPROBE_AGENT_ID") or socket.gethostname()
+# Orkestratör altında her çalıştırma tek tur ölçüp öldürülür: tur aralığı testin gerçek
+# çalıştırma aralığıdır (OPROBE_ROUND_SECONDS) ve tur sayacı OPROBE_STATE_DIR'de saklanır.
+# İkisi de çalışma anında okunur (warm pool modülü ortam verilmeden önce yükler).
+ROUND_SECONDS = None        # None: OPROBE_ROUND_SECONDS, o da yoksa ROUND_INTERVAL
+STATE_DIR = None            # None: OPROBE_STATE_DIR, o da yoksa sayaç sadece bellekte
+ROTATION_STATE_FILE = ".https_rotation.json"
+
 TIMEOUT = 5  # saniye
+MAX_CONCURRENCY = 8  # aynı anda ölçülen URL sayısı (1: sıralı); bir tur ≈ en yavaş hedef kadar sürer
+MAX_PER_HOST = 1     # aynı host'a aynı anda en fazla bu kadar bağlantı
+ROUND_INTERVAL = 60  # turlar arası bekleme (saniye); convergence modunda turlar art arda koşar
+
+# Bağlantı türleri (oprobe_http): her URL her turda önce tek bir soğuk bağlantıyla ölçülür
+# (yeni TCP + tam TLS; "cold", HTTPS Avg bu türden gelir). Bu bağlantı açık tutulur ve aynı turda
+# listedeki ek ölçümler onun üzerinden alınır:
+#   resumed: yeni TCP + soğuk bağlantının TLS oturumunun devamı | warm: aynı keep-alive bağlantı
+# Böylece tur başına URL başına tek tam el sıkışma olur ve orkestratör ilk turdan sonra
+# süreci öldürse de resumed/warm örnekleri üretilir. () verilirse sadece cold ölçülür.
+CONNECTION_MODES = ("resumed", "warm")
+AVG_KIND = "cold"   # "Average Latency" / summary("all").avg_ms hep bu türden (karışık ortalama yok)
+
+# Gövde modu (oprobe_http): ölçüm nerede biter, tur başına ne kadar veri harcanır?
+#   full: tüm ana sayfa indirilir (yüzlerce KB; gecikme bant genişliğine bağlanır)
+#   head: HEAD, ölçüm başlıklarla biter (keep-alive ile uyumlu; en düşük trafik)
+#   first-byte: GET, ilk gövde parçasından sonra bağlantı kapatılır (HEAD'i reddeden siteler için;
+#               her seferinde yeni bağlantı açtığından warm ölçüm üretmez)
+BODY_MODE = "head"
+
+REC = RecordStream("https_latency")
+
+# (URL, bağlantı türü) başına faz ortalamaları (çalışma boyunca, tur tur güncellenir)
+_phase_stats = {}
+_probers = {}
+_sessions = {}   # proberlar arası ortak TLS oturum deposu
+_schedule = None
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+def _host_slot(url):
+    """Semaphore limiting concurrent connections to the URL's host."""
+    host = (urlsplit(url).hostname or url).lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return slot
+
+def _prober(mode):
+    if mode not in _probers:
+        _probers[mode] = HttpProber(mode, timeout=TIMEOUT, body=BODY_MODE, sessions=_sessions)
+    return _probers[mode]
 
 def measure_latency(url):
-    start_time = time.time()
-    try:
-        r = requests.get(url, timeout=TIMEOUT)
-        elapsed = (time.time() - start_time) * 1000  # ms
-        if r.status_code == 200:
-            return elapsed
-        else:
-            return None
-    except requests.exceptions.RequestException:
-        return None
-
-def perform_https_test():
-    latencies = []
-    for url in HTTPS_LIST:
-        try:
-            latency = measure_latency(url)
-            if latency is not None:
-                latencies.append(latency)
-            else:
-                latencies.append(None)
-        except requests.exceptions.RequestException:
-            latencies.append(None)
-    return latencies
+    """Phase-timed probes of ``url``: one cold probe, then one per CONNECTION_MODES entry on its back.
 
-def summarize_results(test_number, latencies):
-    values = [lat for lat in latencies if lat is not None]
-    avg_latency = sum(values) / len(values) if values else float('nan')
+    The cold probe's connection stays in the warm pool and its TLS session
+    in the shared store, so the resumed and warm probes that follow cost no
+    further full handshake. Latency is ``total_ms``.
+    """
+    # Saat, host slotu alındıktan sonra başlar: kuyrukta bekleme gecikmeye eklenmez
+    with _host_slot(url):
+        primer = _prober("warm")
+        primer.drop_idle(url)   # önceki turun bağlantısı değil: her tur tek bir soğuk el sıkışmayla başlar
+        results = [primer.probe(url)]
+        for mode in CONNECTION_MODES:
+            if mode != "cold":
+                results.append(_prober(mode).probe(url))
+        return results
+
+def round_targets():
+    """Targets due this round: all of HTTPS_LIST, or this agent's share of TARGETS_FILE."""
+    global _schedule
+    if TARGETS_FILE is None:
+        return [{"url": url, "tags": ()} for url in HTTPS_LIST]
+    if _schedule is None:
+        round_s = float(ROUND_SECONDS or os.environ.get("OPROBE_ROUND_SECONDS") or ROUND_INTERVAL)
+        targets = load_targets(TARGETS_FILE, default_interval=round_s)
+        mine = shard(targets, AGENT_ID, SHARD_AGENTS)
+        state_dir = STATE_DIR or os.environ.get("OPROBE_STATE_DIR")
+        state = os.path.join(state_dir, ROTATION_STATE_FILE) if state_dir else None
+        _schedule = RotatingSchedule(mine, round_s, state_path=state)
+        print(f"Targets: {len(mine)}/{len(targets)} from {TARGETS_FILE} (agent {AGENT_ID}), "
+              f"~{_schedule.expected_per_round():.1f} per {round_s:.0f}s round")
+    return _schedule.due()
+
+def perform_https_test(targets):
+    """Probe every target URL, up to MAX_CONCURRENCY at a time; results keep list order."""
+    urls = [t["url"] for t in targets]
+    if MAX_CONCURRENCY <= 1 or len(urls) <= 1:
+        return [measure_latency(url) for url in urls]
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY, len(urls)),
+                            thread_name_prefix="https") as pool:
+        return list(pool.map(measure_latency, urls))
+
+def summarize_results(test_number, targets, results):
+    by_kind = {}   # bağlantı türü -> başarılı probe sonuçları
+    failed = 0
+    bytes_in = bytes_out = 0
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # Ekrana yaz (dosya yok / klasör yok)
     print(f"\n=== HTTPS Latency Test #{test_number} ===")
     print(f"Timestamp: {timestamp}")
-    for url, latency in zip(HTTPS_LIST, latencies):
-        print(f"{url}: {latency if latency is not None else 'Timeout'} ms")
+    print(f"Targets: {len(targets)}")
+    for target, probes in zip(targets, results):
+        url = target["url"]
+        tags = {"tags": list(target["tags"])} if target.get("tags") else {}
+        for res in probes:
+            bytes_in += res["bytes_in"]
+            bytes_out += res["bytes_out"]
+            if res["ok"]:
+                kind = connection_kind(res)
+                latency = res["total_ms"]
+                by_kind.setdefault(kind, []).append(res)
+                print(f"{url}: {latency:.2f} ms [{kind}]  ({format_phases(res)})")
+                REC.sample(url, dict({"latency_ms": latency, "bytes_in": res["bytes_in"]},
+                                     **{k: res[k] for k in PHASES}),
+                           round=test_number, status=res["status"], mode=kind, body=res["body"], **tags)
+                stats = _phase_stats.setdefault((url, kind), {k: Welford() for k in PHASES})
+                for k in PHASES:
+                    if res[k] is not None:
+                        stats[k].add(res[k])
+                REC.summary(url, dict({k: w.mean for k, w in stats.items() if w.n},
+                                      samples=stats["ttfb_ms"].n), scope="phases", mode=kind)
+            else:
+                failed += 1
+                reason = f"HTTP {res['status']}" if res["status"] is not None else (res["error"] or "failed")
+                print(f"{url}: Timeout ms [{res['mode']}]  [{reason}]")
+                REC.diagnostic(url, "timeout" if "timed out" in (res["error"] or "") else "failed", reason,
+                               round=test_number, mode=res["mode"], **tags)
+
+    ok = sum(len(rs) for rs in by_kind.values())
+    values = [r["total_ms"] for r in by_kind.get(AVG_KIND, ())]
+    avg_latency = sum(values) / len(values) if values else float('nan')
+    REC.summary("all", {"avg_ms": avg_latency if values else None, "ok": ok,
+                        "failed": failed, "bytes_in": bytes_in, "bytes_out": bytes_out},
+                round=test_number, body=BODY_MODE, kind=AVG_KIND)
+    # Bağlantı türü başına: el sıkışma maliyeti (cold/resumed) ile kararlı RTT (warm) ayrı görünür
+    for kind in ("cold", "resumed", "warm"):
+        rs = by_kind.get(kind)
+        if not rs:
+            continue
+        kavg = sum(r["total_ms"] for r in rs) / len(rs)
+        REC.summary("all", {"avg_ms": kavg, "ok": len(rs)}, round=test_number, mode=kind)
+        # Faz ortalamaları: yavaşlık DNS'te mi, TCP/TLS'te mi, sunucuda mı?
+        phase_avgs = {}
+        for k in PHASES:
+            vals = [r[k] for r in rs if r[k] is not None]
+            if vals:
+                phase_avgs[k] = sum(vals) / len(vals)
+        print(f"{kind.capitalize():<8} avg {kavg:.2f} ms (n={len(rs)})  phases: "
+              + "  ".join(f"{k[:-3]}={v:.1f}" for k, v in phase_avgs.items()))
+    # Testin kendi trafiği (HTTP katmanı; TLS/TCP ek yükü hariç)
+    print(f"Transferred: {bytes_in / 1024.0:.1f} KB in / {bytes_out / 1024.0:.1f} KB out "
+          f"(body mode: {BODY_MODE})")
     if values:
-        print(f"Average Latency: {avg_latency:.2f} ms")
+        print(f"Average Latency: {avg_latency:.2f} ms ({AVG_KIND})")
     else:
         print("Average Latency: N/A (no successful responses)")
     print("=" * 50)
     return avg_latency
 
 def main():
+    # OPROBE_CONVERGE=1: tur ortalamalarının güven aralığı daralınca dur
+    conv = convergence_from_env()
+    # Yakınsama turları aynı çalıştırmanın parçası: rotasyon sayacı bir kez ilerler ve güven
+    # aralığı hep aynı hedef kümesinin tur ortalamaları üzerinden hesaplanır
+    targets = round_targets() if conv is not None else None
     test_number = 1
     while True:
         print(f"Starting Test #{test_number}")
-        latencies = perform_https_test()
-        summarize_results(test_number, latencies)
+        if conv is None:
+            targets = round_targets()
+        results = perform_https_test(targets)
+        avg_latency = summarize_results(test_number, targets, results)
         test_number += 1
-        time.sleep(60)  # 1 dakika bekle
+        if conv is not None:
+            if avg_latency == avg_latency:  # NaN değilse
+                conv.add(avg_latency)
+            if conv.done():
+                print(f"HTTPS convergence: {conv.describe('round avg')}")
+                REC.summary("all", dict(conv.metrics(), avg_ms=conv.stats.mean if conv.stats.n else None),
+                            scope="convergence")
+                break
+            continue
+        # Bir sonraki tur sınırına kadar bekle (sabit ızgara, kaymaz)
+        time.sleep(ROUND_INTERVAL - time.time() % ROUND_INTERVAL)
 
 if __name__ == "__main__":
     # unbuffered çıktı (orkestratör toplayabilsin diye)
@@ -4,134 +4,254 @@
 jitter_test.py
 - Hedef URL için periyodik HTTP HEAD isteği atarak gecikmeleri (ms) ölçer.
 - Jitter metrikleri: stddev, IPDV (ardışık farkların ort. mutlak değeri), p95-p5 aralığı.
+- İstatistikler akış halinde tutulur (oprobe_stats.StreamStats, P² yüzdelikleri): örnekler
+  saklanmaz, bellek ve özet süresi test ne kadar uzun sürerse sürsün sabittir.
 - Hiç dosya/klasör üretmez; sadece stdout'a yazar.
 - Orkestratörün 30 sn sonra göndereceği SIGTERM'i yakalayıp özet basar.
+- Bağlantı modu (CONNECTION_MODE) açıkça seçilir; istatistiğe sadece o moda ait örnekler girer
+  (ör. warm modunda ilk, bağlantı kuran örnek ekrana basılır ama jitter'a katılmaz).
+- PROBE_MODE = "udp": HTTP yerine oprobe_reflector'a sabit hızda (20-100 pps) sıra numaralı
+  UDP paketleri gönderilir (oprobe_udpjitter). RFC 3550 jitter, IPDV, kayıp, sıra dışı ve
+  çift paketler ölçülür; alış zamanları çekirdekten (SO_TIMESTAMPNS) alınır. Ağ jitter'ını
+  sunucu/HTTP yığını gürültüsü olmadan ölçer. Yansıtıcı: python3 oprobe_reflector.py
+- Ara özetler: her WINDOW_REPORT_EVERY saniyede son WINDOW_SECONDS saniyenin istatistikleri
+  tek satır ve scope="window" summary kaydı olarak yayınlanır (oprobe_stats.SlidingWindow;
+  değerler pencereye girip çıktıkça artımlı güncellenir). Test SIGKILL ile ölse ya da saatlerce
+  sürse de panolar canlı veri görür.
+- OPROBE_CONVERGE=1 ise IPDV'nin güven aralığı daraldığında kendiliğinden biter.
 """
 
 import os
 import time
 import signal
-import math
-from statistics import mean, pstdev
 from datetime import datetime
-import requests
+
+from oprobe_records import RecordStream
+from oprobe_http import HttpProber, connection_kind
+from oprobe_stats import SlidingWindow, StreamStats, convergence_from_env
+from oprobe_udpjitter import UdpJitterProbe
 
 # === AYARLAR ===
+PROBE_MODE = "http"             # "http": HEAD istekleri | "udp": oprobe_reflector'a paket akışı
 TARGET_URL = "https://www.microsoft.com"
 METHOD = "HEAD"                 # GET de yapabilirsin ama HEAD daha hafif
 REQUEST_TIMEOUT = 3.0           # saniye
 SAMPLE_PERIOD = 0.5             # iki ölçüm arası bekleme (saniye)
 USER_AGENT = "Oprobe-Jitter/1.0"
+# cold: her örnek yeni TCP + tam TLS | resumed: yeni TCP + TLS oturum devamı | warm: keep-alive bağlantı
+# warm, istek/yanıt RTT'sinin oynaklığını ölçer; cold/resumed el sıkışma maliyetini de içerir.
+CONNECTION_MODE = "warm"
+
+# UDP modu (PROBE_MODE = "udp")
+UDP_REFLECTOR = "127.0.0.1"     # oprobe_reflector.py çalışan host
+UDP_PORT = 8623
+UDP_RATE_PPS = 50               # 20-100 pps: ses/video akışlarına benzer
+UDP_PACKET_SIZE = 172           # bayt
+
+# Kayan pencere ara özetleri
+WINDOW_SECONDS = 60             # pencere uzunluğu (saniye)
+WINDOW_REPORT_EVERY = 10        # kaç saniyede bir yayınlanır (0: kapalı)
+
+REC = RecordStream("jitter_test")
 
 # Global durum (signal handler için)
-_samples_ms = []     # float ms; timeout/başarısızlık için None ekleyeceğiz
-_total = 0
+_stats = StreamStats(quantiles=(5, 95))   # başarılı örneklerin RTT'si (ms), sabit bellek
+_total = 0           # sayılan örnekler (başarılı + başarısız)
 _timeouts = 0
+_connects = 0        # CONNECTION_MODE dışında kalan (ör. bağlantı kuran) örnek sayısı
+_window = SlidingWindow(WINDOW_SECONDS)
 _running = True
-
-def percentile(data_sorted, p):
-    """Basit yüzdelik hesap (0..100), data_sorted: başarı ms listesi sıralı."""
-    if not data_sorted:
-        return None
-    if p <= 0: return data_sorted[0]
-    if p >= 100: return data_sorted[-1]
-    k = (len(data_sorted)-1) * (p/100.0)
-    f = math.floor(k); c = math.ceil(k)
-    if f == c:
-        return data_sorted[int(k)]
-    d0 = data_sorted[f] * (c - k)
-    d1 = data_sorted[c] * (k - f)
-    return d0 + d1
-
-def ipdv_mean_abs(rtts):
-    """RFC 5481'e yakın: ardışık örnekler arası mutlak farkların ortalaması."""
-    if len(rtts) < 2:
-        return None
-    diffs = [abs(rtts[i] - rtts[i-1]) for i in range(1, len(rtts))]
-    return mean(diffs)
+_conv = None         # ConvergenceTracker (IPDV), sadece convergence modunda
 
 def print_summary():
     """Program sonlanırken özet istatistikleri stdout'a yaz."""
-    successes = [x for x in _samples_ms if x is not None]
-    fail_count = sum(1 for x in _samples_ms if x is None)
-    n = len(_samples_ms)
+    n, fail_count, ok = _total, _timeouts, _stats.n
 
     print("\n=== Jitter Summary ===")
     print(f"Target     : {TARGET_URL}")
     print(f"Method     : {METHOD}")
+    print(f"Mode       : {CONNECTION_MODE} ({_connects} other-kind samples excluded)")
     print(f"Samples    : {n}")
-    print(f"Success    : {len(successes)}")
-    print(f"Timeouts   : {fail_count} ({(fail_count/n*100):.1f}% if n>0 else 0.0)")
-    if successes:
-        mu = mean(successes)
-        sd = pstdev(successes) if len(successes) > 1 else 0.0
-        ipdv = ipdv_mean_abs(successes)
-        srt = sorted(successes)
-        p95 = percentile(srt, 95)
-        p5  = percentile(srt, 5)
-        spread = (p95 - p5) if (p95 is not None and p5 is not None) else None
-        print(f"Avg (ms)   : {mu:.2f}")
-        print(f"StdDev (ms): {sd:.2f}")
+    print(f"Success    : {ok}")
+    print(f"Timeouts   : {fail_count} ({(fail_count / n * 100) if n else 0.0:.1f}%)")
+    if ok:
+        st = _stats.summary()
+        p5, p95, ipdv = st["p5_ms"], st["p95_ms"], st["ipdv_ms"]
+        print(f"Avg (ms)   : {st['avg_ms']:.2f}")
+        print(f"StdDev (ms): {st['stddev_ms']:.2f}")
         print(f"IPDV  (ms) : {ipdv:.2f}" if ipdv is not None else "IPDV  (ms) : N/A")
-        if spread is not None:
-            print(f"p95-p5 (ms): {spread:.2f}  (p5={p5:.2f}, p95={p95:.2f})")
-        else:
-            print("p95-p5 (ms): N/A")
-        print(f"Min/Max (ms): {min(successes):.2f} / {max(successes):.2f}")
+        print(f"p95-p5 (ms): {p95 - p5:.2f}  (p5={p5:.2f}, p95={p95:.2f}, P² estimate)")
+        print(f"Min/Max (ms): {st['min_ms']:.2f} / {st['max_ms']:.2f}")
+        conv = {}
+        if _conv is not None:
+            print(f"Precision  : {_conv.describe('IPDV')}")
+            conv = _conv.metrics()
+        REC.summary(TARGET_URL, dict(st, samples=n, success=ok, timeouts=fail_count, excluded=_connects,
+                                     **conv), mode=CONNECTION_MODE)
     else:
         print("No successful samples.")
+        REC.summary(TARGET_URL, {"samples": n, "success": 0, "timeouts": fail_count, "excluded": _connects},
+                    mode=CONNECTION_MODE)
+    print("=" * 50)
+
+def report_window(target, mode, **extra):
+    """Print and record the sliding-window summary (scope="window")."""
+    st = _window.summary()
+    if st["n"]:
+        line = (f"n={st['n']} avg={st['avg_ms']:.2f} p50={st['p50_ms']:.2f} p95={st['p95_ms']:.2f} "
+                f"sd={st['stddev_ms']:.2f} ipdv={st['ipdv_ms'] if st['ipdv_ms'] is not None else float('nan'):.2f}")
+    else:
+        line = "n=0"
+    line += f" loss={st['loss_pct']:.1f}%"
+    for key, val in extra.items():
+        line += f" {key}={val:.2f}"
+    print(f"[window {WINDOW_SECONDS:g}s] {line}", flush=True)
+    REC.summary(target, dict(st, **extra), scope="window", window_s=WINDOW_SECONDS, mode=mode)
+
+def print_udp_summary(st):
+    """Summary of a UDP probe stream (UdpJitterProbe.summary())."""
+    target = f"udp://{UDP_REFLECTOR}:{UDP_PORT}"
+    print("\n=== Jitter Summary (UDP) ===")
+    print(f"Target     : {target}")
+    print(f"Rate       : {st['rate_pps']:.0f} pps, {UDP_PACKET_SIZE} B, "
+          f"{'kernel' if st['kernel_ts'] else 'user-space'} receive timestamps")
+    print(f"Packets    : {st['sent']} sent / {st['received']} received")
+    print(f"Loss       : {st['lost']} ({st['loss_pct']:.2f}%)")
+    print(f"Reordered  : {st['reordered']}   Duplicates: {st['duplicates']}")
+    if st["received"]:
+        jitter, ipdv = st["jitter_ms"], st["ipdv_ms"]
+        print(f"RTT Avg (ms): {st['avg_ms']:.3f}  (p50={st['p50_ms']:.3f}, p95={st['p95_ms']:.3f})")
+        print(f"Jitter (ms): {jitter:.3f}  (RFC 3550)" if jitter is not None else "Jitter (ms): N/A")
+        print(f"IPDV  (ms) : {ipdv:.3f}" if ipdv is not None else "IPDV  (ms) : N/A")
+        print(f"StdDev (ms): {st['stddev_ms']:.3f}")
+        print(f"Min/Max (ms): {st['min_ms']:.3f} / {st['max_ms']:.3f}")
+    else:
+        print("No packets came back (is oprobe_reflector.py running?).")
+    conv = {}
+    if _conv is not None:
+        print(f"Precision  : {_conv.describe('IPDV (per-tick mean)')}")
+        conv = _conv.metrics()
+    REC.summary(target, dict(st, **conv), mode="udp")
     print("=" * 50)
 
 def _stop_handler(signum, frame):
     global _running
     _running = False
+    if PROBE_MODE == "udp":
+        return   # UDP: geç paketler toplanınca main() özet basar
     # Özet hemen yazılsın
     print_summary()
 
+def main_udp():
+    """Paced UDP stream to the reflector; one progress line (and sample record) per second."""
+    target = f"udp://{UDP_REFLECTOR}:{UDP_PORT}"
+    probe = UdpJitterProbe(UDP_REFLECTOR, UDP_PORT, rate=UDP_RATE_PPS, size=UDP_PACKET_SIZE, window=_window)
+    print("=== UDP Jitter Test ===")
+    print(f"Target  : {target}")
+    print(f"Rate    : {UDP_RATE_PPS} pps, {UDP_PACKET_SIZE} B packets")
+    if _conv is not None:
+        print(f"Convergence: per-tick mean IPDV 95% CI, tol max({_conv.abs_tol} ms, {_conv.rel_tol:.0%}), "
+              f"min {_conv.min_duration:.0f}s, max {_conv.max_duration:.0f}s")
+    print("=" * 50)
+
+    last = {"i": 1, "n": 0, "sum": 0.0, "sent": 0, "gone": 0, "dn": 0, "dsum": 0.0}
+    next_report = time.monotonic() + WINDOW_REPORT_EVERY
+
+    def on_tick(p):
+        n, total = p.rtt.n, p.rtt.stats.mean * p.rtt.n
+        sent = p.sent - last["sent"]
+        got = n - last["n"]
+        avg = (total - last["sum"]) / got if got else None
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rtt = f"rtt {avg:.3f} ms" if avg is not None else "no replies"
+        print(f"[{last['i']:04d}] {ts}  {got}/{sent} pkts  {rtt}  jitter {p.jitter_ms:.3f} ms", flush=True)
+        REC.sample(target, {"rtt_ms": avg, "jitter_ms": p.jitter_ms, "sent": sent, "received": got},
+                   seq=last["i"], mode="udp")
+        # Yakınsama için tikin ortalama |ΔRTT|'si: RFC 3550 jitter kendinden ilintili (üstel
+        # ortalama) olduğundan tik başına bir kez eklemek güven aralığını yapay olarak daraltır
+        dn, dsum = p.rtt.ipdv.n, p.rtt.ipdv.mean * p.rtt.ipdv.n
+        if _conv is not None and dn > last["dn"]:
+            _conv.add((dsum - last["dsum"]) / (dn - last["dn"]))
+        # Kayıp: sıra dışı ufkunun (REORDER_HORIZON) gerisinde kalıp gelmeyenler; yalnız artar
+        gone = p.missing()
+        _window.add_missing(gone - last["gone"])
+        last.update(i=last["i"] + 1, n=n, sum=total, sent=p.sent, gone=gone, dn=dn, dsum=dsum)
+        nonlocal next_report
+        if WINDOW_REPORT_EVERY and time.monotonic() >= next_report:
+            report_window(target, "udp", jitter_ms=p.jitter_ms)
+            next_report += WINDOW_REPORT_EVERY
+
+    try:
+        st = probe.run(stop=lambda: not _running or (_conv is not None and _conv.done()), on_tick=on_tick)
+    finally:
+        probe.close()
+    print_udp_summary(st)
+
+
 def main():
+    global _conv, _connects, _total, _timeouts
     os.environ["PYTHONUNBUFFERED"] = "1"
     signal.signal(signal.SIGTERM, _stop_handler)
     signal.signal(signal.SIGINT, _stop_handler)
 
-    s = requests.Session()
-    s.headers.update({"User-Agent": USER_AGENT})
+    _conv = convergence_from_env()
+    if PROBE_MODE == "udp":
+        main_udp()
+        return
+
+    prober = HttpProber(CONNECTION_MODE, timeout=REQUEST_TIMEOUT)
 
     print("=== HTTP Jitter Test ===")
     print(f"Target  : {TARGET_URL}")
-    print(f"Method  : {METHOD}, timeout={REQUEST_TIMEOUT}s, period={SAMPLE_PERIOD}s")
+    print(f"Method  : {METHOD}, timeout={REQUEST_TIMEOUT}s, period={SAMPLE_PERIOD}s, mode={CONNECTION_MODE}")
+    if _conv is not None:
+        print(f"Convergence: IPDV 95% CI, tol max({_conv.abs_tol} ms, {_conv.rel_tol:.0%}), "
+              f"min {_conv.min_duration:.0f}s, max {_conv.max_duration:.0f}s")
     print("="*50)
 
     i = 1
+    last_ok = None
+    next_report = time.monotonic() + WINDOW_REPORT_EVERY
     while _running:
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        t0 = time.perf_counter()
-        ok = True
-        try:
-            if METHOD.upper() == "HEAD":
-                r = s.head(TARGET_URL, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-            else:
-                r = s.get(TARGET_URL, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-            # sadece bağlantı kurup ilk bayta kadar geçen süreyi ölçmek istiyorsan stream=True + read(1) yapılabilir.
-            status_ok = (200 <= r.status_code < 400)
-        except requests.RequestException:
-            ok = False
-            status_ok = False
-
-        dt_ms = (time.perf_counter() - t0) * 1000.0
-
-        if ok and status_ok:
-            _samples_ms.append(dt_ms)
+        # Yönlendirme izlenmez: 3xx de başarılı yanıttır
+        res = prober.probe(TARGET_URL, method=METHOD.upper(), headers={"User-Agent": USER_AGENT})
+        dt_ms = res["total_ms"]
+        kind = connection_kind(res)
+
+        if res["ok"] and kind != CONNECTION_MODE:
+            # Bağlantı kuran örnek (ör. warm modunun ilki): farklı bir şey ölçer, jitter'a katılmaz
+            _connects += 1
+            print(f"[{i:04d}] {ts}  {dt_ms:.2f} ms  ({kind}, excluded)", flush=True)
+            REC.sample(TARGET_URL, {"rtt_ms": dt_ms}, seq=i, mode=kind, excluded=True)
+        elif res["ok"]:
+            _total += 1
+            _stats.add(dt_ms)
+            _window.add(dt_ms)
             print(f"[{i:04d}] {ts}  {dt_ms:.2f} ms", flush=True)
+            REC.sample(TARGET_URL, {"rtt_ms": dt_ms}, seq=i, mode=kind)
+            if _conv is not None and last_ok is not None:
+                _conv.add(abs(dt_ms - last_ok))
+            last_ok = dt_ms
         else:
-            _samples_ms.append(None)
+            _total += 1
+            _timeouts += 1
+            _window.add_missing()
             print(f"[{i:04d}] {ts}  timeout/fail", flush=True)
+            REC.diagnostic(TARGET_URL, "timeout", res["error"] or f"HTTP {res['status']}", seq=i)
 
+        if WINDOW_REPORT_EVERY and time.monotonic() >= next_report:
+            report_window(TARGET_URL, CONNECTION_MODE)
+            next_report += WINDOW_REPORT_EVERY
         i += 1
+        if _conv is not None and _conv.done():
+            break
         time.sleep(SAMPLE_PERIOD)
 
     # Eğer SIGTERM yerine normal çıkış olursa yine özet verelim
     if _running:  # değişmedi ise…
         print_summary()
+    prober.close()
 
 if __name__ == "__main__":
     main()
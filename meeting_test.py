@@ -3,9 +3,11 @@ import time
 import subprocess
 import platform
 import re
-import matplotlib.pyplot as plt
 from datetime import datetime
 
+from oprobe_records import RecordStream
+from oprobe_stats import convergence_from_env
+
 # Dosya/klasör üretimini kapat
 NO_ARTIFACTS = True
 
@@ -19,6 +21,11 @@ TARGET_SERVERS = {
 # Klasör/rapor isimleri artık kullanılmıyor
 REPORT_DIR = None
 
+REC = RecordStream("meeting_test")
+
+PING_INTERVAL = 5            # saniye
+CONVERGE_PING_INTERVAL = 1   # convergence modunda daha sık örnekle
+
 def ensure_directory_exists(directory):
     # NO_ARTIFACTS True ise hiçbir şey yapma
     if not NO_ARTIFACTS and directory and not os.path.exists(directory):
@@ -44,7 +51,7 @@ def parse_latency(ping_output):
     else:
         return None
 
-def save_text_report(results):
+def save_text_report(results, trackers=None):
     """Eskiden dosyaya yazıyordu; şimdi sadece stdout'a döküyoruz."""
     print("\n=== Meeting Latency Text Report ===")
     print(f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
@@ -56,6 +63,12 @@ def save_text_report(results):
             print(f"Average Latency: {avg:.2f} ms")
         else:
             print("Average Latency: N/A")
+        conv = {}
+        if trackers:
+            print(f"Precision: {trackers[server].describe('RTT')}")
+            conv = trackers[server].metrics()
+        REC.summary(server, dict({"avg_ms": avg if vals else None, "samples": len(data['latencies']),
+                                  "timeouts": len(data['latencies']) - len(vals)}, **conv))
         print("Details:")
         for ts, latency in zip(data['timestamps'], data['latencies']):
             print(f"  {ts} - {('%.2f ms' % latency) if latency is not None else 'Timeout'}")
@@ -69,6 +82,9 @@ def save_graph(results):
         print("(Graph generation skipped: NO_ARTIFACTS=True)")
         return
 
+    # matplotlib sadece grafik gerçekten üretilecekse yüklenir (import maliyeti yüksek)
+    import matplotlib.pyplot as plt
+
     ensure_directory_exists(REPORT_DIR)
     plt.figure(figsize=(10, 6))
     for server, data in results.items():
@@ -89,6 +105,12 @@ def main():
     results = {
         name: {"timestamps": [], "latencies": []} for name in TARGET_SERVERS.keys()
     }
+    # OPROBE_CONVERGE=1: her sunucunun ortalama RTT güven aralığı daralınca dur
+    trackers = None
+    interval = PING_INTERVAL
+    if convergence_from_env() is not None:
+        trackers = {name: convergence_from_env() for name in TARGET_SERVERS}
+        interval = CONVERGE_PING_INTERVAL
 
     try:
         while True:
@@ -98,10 +120,22 @@ def main():
                 results[name]["timestamps"].append(now_str)
                 results[name]["latencies"].append(latency)
                 print(f"[{now_str}] {name} ({host}) -> {('%.2f ms' % latency) if latency is not None else 'Timeout'}")
-            time.sleep(5)
+                if latency is not None:
+                    REC.sample(name, {"rtt_ms": latency}, host=host)
+                    if trackers:
+                        trackers[name].add(latency)
+                else:
+                    REC.diagnostic(name, "timeout", host=host)
+            if trackers and all(t.done() for t in trackers.values()):
+                print("\nAll servers converged or reached max duration. Generating final summary to stdout...")
+                save_text_report(results, trackers)
+                save_graph(results)
+                print("Summary printed. Exiting.")
+                break
+            time.sleep(interval)
     except KeyboardInterrupt:
         print("\nLatency test interrupted. Generating final summary to stdout...")
-        save_text_report(results)
+        save_text_report(results, trackers)
         save_graph(results)
         print("Summary printed. Exiting.")
 
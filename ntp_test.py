@@ -4,6 +4,10 @@ import ntplib
 from time import time, ctime
 from datetime import datetime
 
+from oprobe_records import RecordStream
+
+REC = RecordStream("ntp_test")
+
 def run_ntp_test(server='pool.ntp.org'):
     ntp_client = ntplib.NTPClient()
     print(f"\n[ NTP Test Started ]")
@@ -19,6 +23,7 @@ def run_ntp_test(server='pool.ntp.org'):
         print(f"NTP Time        : {ntp_time}")
         print(f"Round Trip Delay: {delay_ms:.3f} ms")
         print(f"Clock Offset    : {offset_ms:.3f} ms")
+        REC.summary(server, {"delay_ms": delay_ms, "offset_ms": offset_ms})
 
         # Optional thresholds
         if abs(offset_ms) > 500:
@@ -28,6 +33,7 @@ def run_ntp_test(server='pool.ntp.org'):
 
     except Exception as e:
         print(f"❌ NTP Test Failed: {e}")
+        REC.diagnostic(server, "failed", str(e))
 
 if __name__ == "__main__":
     run_ntp_test()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+oprobe.py — Oprobe komut satırı giriş noktası.
+
+  python3 oprobe.py query --status skipped --test wificheck
+  python3 oprobe.py query --test ntp --status failed --since 2026-10-01
+  python3 oprobe.py query --metric "Bloat Load (ms)" --gt 200
+  python3 oprobe.py query --metric avg_ms --test dns --target 8.8.8.8 --lt 5
+  python3 oprobe.py reindex
+
+query, results/ altındaki raporların artımlı indeksini (oprobe_index) önce günceller
+(yalnızca yeni/değişen dosyalar), sonra indeksten cevap verir.
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime
+
+import oprobe_index
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+
+
+def _parse_when(text):
+    if text is None:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(text, fmt).timestamp())
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid date: {text!r} (use YYYY-MM-DD[ HH:MM[:SS]])")
+
+
+def _fmt_ts(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def cmd_query(args):
+    conn = oprobe_index.connect(args.results)
+    oprobe_index.update_index(args.results, conn)
+    since, until = _parse_when(args.since), _parse_when(args.until)
+
+    if args.metric:
+        rows = oprobe_index.find_metrics(conn, args.metric, test=args.test, target=args.target,
+                                         gt=args.gt, lt=args.lt, since=since, until=until)
+        for ts, file, test, target, name, value in rows:
+            tgt = f"  target={target}" if target else ""
+            print(f"{_fmt_ts(ts)}  {test:<22} {name}={value:.2f}{tgt}  [{file}]")
+    else:
+        rows = oprobe_index.find_runs(conn, test=args.test, status=args.status, since=since, until=until)
+        for ts, file, test, status, rc, stop, duration in rows:
+            extra = f"rc={rc}" if rc is not None else ""
+            if stop:
+                extra += f" stop={stop}"
+            if duration is not None:
+                extra += f" {duration:.1f}s"
+            print(f"{_fmt_ts(ts)}  {test:<22} {status.upper():<8} {extra.strip()}  [{file}]")
+    print(f"({len(rows)} matches)", file=sys.stderr)
+    return 0
+
+
+def cmd_reindex(args):
+    path = os.path.join(args.results, oprobe_index.INDEX_NAME)
+    if args.full and os.path.exists(path):
+        os.remove(path)
+    indexed, removed = oprobe_index.update_index(args.results)
+    print(f"indexed {indexed} file(s), dropped {removed}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="oprobe", description="Oprobe command line")
+    parser.add_argument("--results", default=RESULTS_DIR, help="results directory (default: %(default)s)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    q = sub.add_parser("query", help="search past runs through the results index")
+    q.add_argument("--test", help="test name (substring, e.g. 'ntp' or 'bufferbloat')")
+    q.add_argument("--status", choices=("ok", "failed", "error", "skipped"))
+    q.add_argument("--metric", help="metric name, e.g. 'Bloat Load (ms)' or a record metric like 'avg_ms'")
+    q.add_argument("--target", help="target substring (record metrics only)")
+    q.add_argument("--gt", type=float, help="metric value greater than")
+    q.add_argument("--lt", type=float, help="metric value less than")
+    q.add_argument("--since", help="YYYY-MM-DD[ HH:MM[:SS]]")
+    q.add_argument("--until", help="YYYY-MM-DD[ HH:MM[:SS]]")
+    q.set_defaults(func=cmd_query)
+
+    r = sub.add_parser("reindex", help="update the results index now")
+    r.add_argument("--full", action="store_true", help="drop the index and rebuild from scratch")
+    r.set_defaults(func=cmd_reindex)
+
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.results):
+        print(f"results directory not found: {args.results}", file=sys.stderr)
+        return 1
+    try:
+        return args.func(args)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
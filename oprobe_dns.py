@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_dns.py
+- Süreç içi DNS istemcisi: dig/nslookup çalıştırmadan, RFC 1035 wire formatında
+  A / AAAA sorgusu kurar, UDP ya da TCP (2 bayt uzunluk önekli) ile gönderir, yanıtı ayrıştırır.
+- Gecikme perf_counter_ns ile sadece gönderim ve yanıtın alınması arasında ölçülür; TCP'de
+  bağlantı kurma süresi ayrıca raporlanır (connect_ms).
+- UDP'de kimliği ya da sorusu eşleşmeyen paketler yok sayılır, süre dolana kadar beklenir.
+  Yanıt kesikse (TC) sonuç tc=True döner; TCP ile yeniden denemek çağırana kalmıştır.
+- EDNS0 OPT kaydı (UDP yük boyutu EDNS_UDP_SIZE) eklenir; 0 verilirse eklenmez.
+- Şifreli DNS, kalıcı bağlantıyla (sürekli kullanımdaki maliyet ölçülsün diye):
+    DoTClient : DNS-over-TLS (RFC 7858), tek TLS bağlantısında art arda (pipelined) sorgular;
+                yanıtlar kimlikle eşlenir, sıra beklenmez.
+    DoHClient : DNS-over-HTTPS (RFC 8484), keep-alive HTTP/1.1 bağlantısında POST
+                application/dns-message (HTTP/1.1'de çoklama yok: sorgular sırayla).
+  El sıkışma (TCP + TLS) sadece bağlantı kurulurken olur ve sorgu gecikmesinden ayrı raporlanır;
+  kapanan bağlantı bir sonraki sorguda (TLS oturumu yeniden kullanılarak) kendiliğinden yenilenir.
+"""
+
+import os
+import ssl
+import time
+import socket
+import struct
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+DNS_PORT = 53
+DOT_PORT = 853
+DOH_PATH = "/dns-query"
+DOH_TYPE = "application/dns-message"
+TIMEOUT = 2.0
+EDNS_UDP_SIZE = 1232
+QTYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "PTR": 12, "MX": 15, "TXT": 16, "AAAA": 28, "OPT": 41}
+QTYPE_NAMES = {v: k for k, v in QTYPES.items()}
+RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+CLASS_IN = 1
+
+_HEADER = struct.Struct("!HHHHHH")
+_RR = struct.Struct("!HHIH")
+
+
+class DNSFormatError(ValueError):
+    """A response that cannot be parsed as a DNS message."""
+
+
+def encode_name(name):
+    out = bytearray()
+    for label in name.rstrip(".").split("."):
+        if not label:
+            continue
+        raw = label.encode("idna") if not label.isascii() else label.encode("ascii")
+        if len(raw) > 63:
+            raise ValueError(f"label too long in {name!r}")
+        out.append(len(raw))
+        out += raw
+    out.append(0)
+    if len(out) > 255:
+        raise ValueError(f"name too long: {name!r}")
+    return bytes(out)
+
+
+def build_query(name, qtype="A", qid=None, rd=True, edns_size=EDNS_UDP_SIZE):
+    """Return (id, wire bytes) of a standard query for ``name``/``qtype``."""
+    qid = int.from_bytes(os.urandom(2), "big") if qid is None else qid
+    flags = 0x0100 if rd else 0
+    code = QTYPES[qtype] if isinstance(qtype, str) else int(qtype)
+    msg = _HEADER.pack(qid, flags, 1, 0, 0, 1 if edns_size else 0)
+    msg += encode_name(name) + struct.pack("!HH", code, CLASS_IN)
+    if edns_size:
+        msg += b"\x00" + _RR.pack(QTYPES["OPT"], edns_size, 0, 0)
+    return qid, msg
+
+
+def _read_name(data, pos):
+    labels = []
+    end = None
+    hops = 0
+    while True:
+        if pos >= len(data):
+            raise DNSFormatError("name runs past end of message")
+        length = data[pos]
+        if length & 0xC0 == 0xC0:
+            if pos + 1 >= len(data):
+                raise DNSFormatError("truncated compression pointer")
+            if end is None:
+                end = pos + 2
+            pos = ((length & 0x3F) << 8) | data[pos + 1]
+            hops += 1
+            if hops > 64:
+                raise DNSFormatError("compression loop")
+            continue
+        if length & 0xC0:
+            raise DNSFormatError("unsupported label type")
+        pos += 1
+        if length == 0:
+            break
+        labels.append(data[pos:pos + length].decode("ascii", "replace"))
+        pos += length
+    return ".".join(labels) + ".", (end if end is not None else pos)
+
+
+def _rdata(rtype, data, pos, length):
+    raw = data[pos:pos + length]
+    if rtype == 1 and length == 4:
+        return socket.inet_ntop(socket.AF_INET, raw)
+    if rtype == 28 and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, raw)
+    if rtype in (2, 5, 12):
+        return _read_name(data, pos)[0]
+    return raw.hex()
+
+
+def parse_response(data):
+    """Parse a DNS response into a dict: id, rcode, rcode_name, tc, aa, ra, question, answers.
+
+    ``answers`` is a list of (name, type name, ttl, value) from the answer
+    section. Raises DNSFormatError on malformed input.
+    """
+    if len(data) < _HEADER.size:
+        raise DNSFormatError("short message")
+    qid, flags, qd, an, _, _ = _HEADER.unpack_from(data)
+    if not flags & 0x8000:
+        raise DNSFormatError("not a response")
+    pos = _HEADER.size
+    question = None
+    try:
+        for _ in range(qd):
+            qname, pos = _read_name(data, pos)
+            qtype, _ = struct.unpack_from("!HH", data, pos)
+            pos += 4
+            question = question or (qname.lower(), qtype)
+        answers = []
+        for _ in range(an):
+            rname, pos = _read_name(data, pos)
+            rtype, _, ttl, rdlen = _RR.unpack_from(data, pos)
+            pos += _RR.size
+            if pos + rdlen > len(data):
+                raise DNSFormatError("record runs past end of message")
+            answers.append((rname, QTYPE_NAMES.get(rtype, str(rtype)), ttl, _rdata(rtype, data, pos, rdlen)))
+            pos += rdlen
+    except struct.error:
+        raise DNSFormatError("truncated record") from None
+    rcode = flags & 0x000F
+    return {"id": qid, "rcode": rcode, "rcode_name": RCODES.get(rcode, f"RCODE{rcode}"),
+            "tc": bool(flags & 0x0200), "aa": bool(flags & 0x0400), "ra": bool(flags & 0x0080),
+            "question": question, "answers": answers}
+
+
+def _server_addr(server, port, sock_type):
+    info = socket.getaddrinfo(server, port, type=sock_type, flags=socket.AI_NUMERICHOST)[0]
+    return info[0], info[4]
+
+
+def _recv_exact(sock, n, deadline):
+    buf = bytearray()
+    while len(buf) < n:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout("timed out")
+        sock.settimeout(remaining)
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed by server")
+        buf += chunk
+    return bytes(buf)
+
+
+def _result(server, name, qtype, transport):
+    return {"ok": False, "server": server, "name": name, "qtype": qtype, "transport": transport,
+            "latency_ms": None, "connect_ms": None, "rcode": None, "rcode_name": None, "tc": False,
+            "answers": [], "error": None}
+
+
+def query(server, name, qtype="A", transport="udp", timeout=TIMEOUT, port=DNS_PORT, rd=True):
+    """Send one query to ``server`` (an IP literal, IPv6 scope allowed) and time the exchange.
+
+    Returns a dict: ok (a well-formed answer arrived), server, name, qtype,
+    transport, latency_ms (send -> response), connect_ms (TCP only), rcode,
+    rcode_name, tc, answers and error ("timeout", "refused", "format", ...).
+    Any rcode counts as ok; the caller decides what SERVFAIL means to it.
+    """
+    res = _result(server, name, qtype, transport)
+    qid, msg = build_query(name, qtype, rd=rd, edns_size=EDNS_UDP_SIZE if transport == "udp" else 0)
+    expect = (name.rstrip(".").lower() + ".", QTYPES[qtype] if isinstance(qtype, str) else int(qtype))
+    deadline = time.monotonic() + timeout
+    sock = None
+    try:
+        if transport == "tcp":
+            family, addr = _server_addr(server, port, socket.SOCK_STREAM)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            t_c = time.perf_counter_ns()
+            sock.connect(addr)
+            res["connect_ms"] = (time.perf_counter_ns() - t_c) / 1e6
+            t0 = time.perf_counter_ns()
+            sock.sendall(struct.pack("!H", len(msg)) + msg)
+            while True:
+                (length,) = struct.unpack("!H", _recv_exact(sock, 2, deadline))
+                data = _recv_exact(sock, length, deadline)
+                t1 = time.perf_counter_ns()
+                parsed = parse_response(data)
+                if parsed["id"] == qid:
+                    break
+        else:
+            family, addr = _server_addr(server, port, socket.SOCK_DGRAM)
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.connect(addr)
+            t0 = time.perf_counter_ns()
+            sock.send(msg)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("timed out")
+                sock.settimeout(remaining)
+                data = sock.recv(65535)
+                t1 = time.perf_counter_ns()
+                try:
+                    parsed = parse_response(data)
+                except DNSFormatError:
+                    continue   # sahte/bozuk paket: doğru yanıtı beklemeye devam
+                if parsed["id"] == qid and parsed["question"] in (expect, None):
+                    break
+        res["latency_ms"] = (t1 - t0) / 1e6
+        res.update(ok=True, rcode=parsed["rcode"], rcode_name=parsed["rcode_name"], tc=parsed["tc"],
+                   answers=parsed["answers"])
+    except socket.timeout:
+        res["error"] = "timeout"
+    except ConnectionRefusedError:
+        res["error"] = "refused"
+    except DNSFormatError as e:
+        res["error"] = f"format: {e}"
+    except socket.gaierror:
+        res["error"] = "bad_server"
+    except OSError as e:
+        res["error"] = type(e).__name__ if not str(e) else f"{type(e).__name__}: {e}"
+    finally:
+        if sock is not None:
+            sock.close()
+    return res
+
+
+def _error(e):
+    if isinstance(e, socket.timeout):
+        return "timeout"
+    if isinstance(e, ConnectionRefusedError):
+        return "refused"
+    if isinstance(e, ssl.SSLCertVerificationError):
+        return f"tls_verify: {e.verify_message}"
+    if isinstance(e, ssl.SSLError):
+        return f"tls: {e.reason or e}"
+    if isinstance(e, DNSFormatError):
+        return f"format: {e}"
+    if isinstance(e, socket.gaierror):
+        return "bad_server"
+    return type(e).__name__ if not str(e) else f"{type(e).__name__}: {e}"
+
+
+_default_context = None
+_default_context_lock = threading.Lock()
+
+
+def default_context():
+    """Shared verifying TLS context (built once, so CA loading is never inside a timed phase)."""
+    global _default_context
+    with _default_context_lock:   # iki iş parçacığı iki bağlam kurmasın: oturumlar bağlama bağlıdır
+        if _default_context is None:
+            _default_context = ssl.create_default_context()
+        return _default_context
+
+
+class _EncryptedClient:
+    """Connection bookkeeping shared by DoT and DoH: handshake timing and TLS session reuse."""
+
+    transport = None
+
+    def __init__(self, host, port, server_name, timeout, context):
+        self.host = host
+        self.port = port
+        self.server_name = server_name or host
+        self.timeout = timeout
+        self.context = context or default_context()
+        self.handshakes = []   # her yeni bağlantı: {"tcp_ms", "tls_ms", "handshake_ms", "resumed", "ok", "error"}
+        self._sock = None
+        self._session = None
+
+    def _handshake(self):
+        """Open TCP + TLS to the server; appends (and returns) the timing record."""
+        rec = {"tcp_ms": None, "tls_ms": None, "handshake_ms": None, "resumed": False, "ok": False, "error": None}
+        self.handshakes.append(rec)
+        sock = None
+        try:
+            # DoH URL'si isim taşıyabilir: çözümleme ölçülen el sıkışmanın dışında kalır
+            info = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)[0]
+            family, addr = info[0], info[4]
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            t0 = time.perf_counter_ns()
+            sock.connect(addr)
+            t1 = time.perf_counter_ns()
+            sock = self.context.wrap_socket(sock, server_hostname=self.server_name, session=self._session)
+            t2 = time.perf_counter_ns()
+        except (OSError, ValueError) as e:
+            if sock is not None:
+                sock.close()
+            rec["error"] = _error(e)
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        rec.update(tcp_ms=(t1 - t0) / 1e6, tls_ms=(t2 - t1) / 1e6, handshake_ms=(t2 - t0) / 1e6,
+                   resumed=bool(sock.session_reused), ok=True)
+        self._sock = sock
+        self._keep_session()
+        return rec
+
+    def _keep_session(self):
+        # Oturum soket açıkken alınır: kapandıktan sonra (ör. HTTP will_close) okunamaz. TLS 1.3'te
+        # bilet el sıkışmadan sonra, ilk yanıtla gelir; bu yüzden her başarılı yanıttan sonra da
+        if self._sock is None:
+            return
+        try:
+            session = self._sock.session
+        except (AttributeError, OSError, ssl.SSLError):
+            return
+        if session is not None:
+            self._session = session
+
+    def take_handshakes(self):
+        """Handshake records since the last call (so a caller can report them once)."""
+        out, self.handshakes = self.handshakes, []
+        return out
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def query(self, name, qtype="A"):
+        """One query over the persistent connection; same result dict as ``query()``."""
+        return self.query_many([(name, qtype)])[0]
+
+
+class DoTClient(_EncryptedClient):
+    """Persistent DNS-over-TLS connection; ``query_many`` pipelines a batch on it.
+
+    Every query of a batch is written before any answer is read, and answers
+    are matched by id in whatever order they arrive. ``latency_ms`` runs from
+    the batch write to that query's answer, so it includes queueing behind
+    earlier queries, as steady-state pipelined use would. Handshakes are kept
+    in ``handshakes`` and never counted in ``latency_ms``.
+    """
+
+    transport = "dot"
+
+    def __init__(self, server, port=DOT_PORT, server_name=None, timeout=TIMEOUT, context=None):
+        super().__init__(server, port, server_name, timeout, context)
+
+    def query_many(self, questions):
+        results = [_result(self.host, name, qtype, self.transport) for name, qtype in questions]
+        for attempt in (0, 1):
+            reused = self._sock is not None
+            pending = {}
+            try:
+                if self._sock is None:
+                    self._handshake()
+                wire = b""
+                for i, (name, qtype) in enumerate(questions):
+                    qid, msg = build_query(name, qtype, edns_size=0)
+                    while qid in pending:
+                        qid, msg = build_query(name, qtype, edns_size=0)
+                    pending[qid] = i
+                    wire += struct.pack("!H", len(msg)) + msg
+                deadline = time.monotonic() + self.timeout
+                t0 = time.perf_counter_ns()
+                self._sock.sendall(wire)
+                while pending:
+                    (length,) = struct.unpack("!H", _recv_exact(self._sock, 2, deadline))
+                    data = _recv_exact(self._sock, length, deadline)
+                    t1 = time.perf_counter_ns()
+                    parsed = parse_response(data)
+                    i = pending.pop(parsed["id"], None)
+                    if i is None:
+                        continue
+                    results[i]["latency_ms"] = (t1 - t0) / 1e6
+                    results[i].update(ok=True, rcode=parsed["rcode"], rcode_name=parsed["rcode_name"],
+                                      tc=parsed["tc"], answers=parsed["answers"])
+                self._keep_session()
+                return results
+            except (OSError, ValueError) as e:
+                self.close()
+                answered = len(pending) < len(questions)
+                if reused and attempt == 0 and not answered and not isinstance(e, socket.timeout):
+                    continue   # sunucu boştaki bağlantıyı kapatmış: yeni bağlantıyla bir kez daha
+                for i in pending.values():
+                    results[i]["error"] = _error(e)
+                if not pending:
+                    for r in results:
+                        r["error"] = _error(e)
+                return results
+        return results
+
+
+class DoHClient(_EncryptedClient):
+    """Persistent DNS-over-HTTPS (RFC 8484 POST) connection, queries one after another.
+
+    ``latency_ms`` is request write to full response; the HTTP status must be
+    200 with an application/dns-message body for ``ok``.
+    """
+
+    transport = "doh"
+
+    def __init__(self, url, server=None, timeout=TIMEOUT, context=None):
+        parts = urlsplit(url)
+        if parts.scheme != "https" or not parts.hostname:
+            raise ValueError(f"DoH URL must be https://host[:port]/path, got {url!r}")
+        host = server or parts.hostname
+        super().__init__(host, parts.port or 443, parts.hostname, timeout, context)
+        self.url = url
+        self.path = (parts.path or DOH_PATH) + (f"?{parts.query}" if parts.query else "")
+        self._netloc = parts.netloc
+        self._conn = None
+
+    def _handshake(self):
+        rec = super()._handshake()
+        self._conn = http.client.HTTPConnection(self._netloc, timeout=self.timeout)
+        self._conn.sock = self._sock
+        return rec
+
+    def close(self):
+        self._conn = None
+        super().close()
+
+    def _exchange(self, name, qtype, res):
+        _, msg = build_query(name, qtype, qid=0, edns_size=0)   # RFC 8484: id 0 (HTTP önbelleği dostu)
+        t0 = time.perf_counter_ns()
+        self._conn.request("POST", self.path, body=msg,
+                           headers={"Content-Type": DOH_TYPE, "Accept": DOH_TYPE, "Host": self._netloc})
+        resp = self._conn.getresponse()
+        data = resp.read()
+        t1 = time.perf_counter_ns()
+        self._keep_session()
+        if resp.will_close:
+            self.close()
+        if resp.status != 200:
+            res["error"] = f"http_{resp.status}"
+            return
+        if resp.getheader("Content-Type", "").split(";")[0].strip() != DOH_TYPE:
+            raise DNSFormatError("response is not application/dns-message")
+        parsed = parse_response(data)
+        res["latency_ms"] = (t1 - t0) / 1e6
+        res.update(ok=True, rcode=parsed["rcode"], rcode_name=parsed["rcode_name"], tc=parsed["tc"],
+                   answers=parsed["answers"])
+
+    def query_many(self, questions):
+        results = [_result(self.host, name, qtype, self.transport) for name, qtype in questions]
+        for (name, qtype), res in zip(questions, results):
+            for attempt in (0, 1):
+                reused = self._conn is not None
+                try:
+                    if self._conn is None:
+                        self._handshake()
+                    self._exchange(name, qtype, res)
+                    break
+                except (OSError, ValueError, http.client.HTTPException) as e:
+                    self.close()
+                    if reused and attempt == 0 and isinstance(
+                            e, (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine,
+                                ssl.SSLEOFError)):
+                        continue   # keep-alive bağlantı kapanmış (close_notify'sız da): yeni bağlantıyla bir kez daha
+                    res["error"] = _error(e)
+                    break
+        return results
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 3:
+        print("usage: oprobe_dns.py SERVER|DOH-URL NAME [A|AAAA] [udp|tcp|dot|doh]")
+        sys.exit(2)
+    qt = sys.argv[3] if len(sys.argv) > 3 else "A"
+    tr = sys.argv[4] if len(sys.argv) > 4 else "udp"
+    if tr in ("dot", "doh"):
+        if tr == "dot":
+            host, _, port = sys.argv[1].partition("#")   # "127.0.0.1#8853"
+            client = DoTClient(host, int(port) if port else DOT_PORT)
+        else:
+            client = DoHClient(sys.argv[1])
+        runs = [client.query(sys.argv[2], qt) for _ in range(2)]   # ilki el sıkışmalı, ikincisi kalıcı bağlantıda
+        for hs in client.take_handshakes():
+            print(f"handshake: tcp {hs['tcp_ms'] or 0:.3f} ms + tls {hs['tls_ms'] or 0:.3f} ms"
+                  + (" (resumed)" if hs["resumed"] else "") + (f" failed: {hs['error']}" if hs["error"] else ""))
+        client.close()
+    else:
+        runs = [query(sys.argv[1], sys.argv[2], qt, tr)]
+    for r in runs:
+        if r["ok"]:
+            print(f"{r['rcode_name']} in {r['latency_ms']:.3f} ms via {r['transport']}"
+                  + (f" (connect {r['connect_ms']:.3f} ms)" if r["connect_ms"] is not None else "")
+                  + (" [TC]" if r["tc"] else ""))
+            for rr in r["answers"]:
+                print(f"  {rr[0]} {rr[2]} {rr[1]} {rr[3]}")
+        else:
+            print(f"failed: {r['error']}")
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+oprobe_dns_standin.py — DNS testleri için yerel yetkili (authoritative) + özyinelemeli
+(recursive) sunucu taklidi. İnternete çıkmaz.
+
+  python3 oprobe_dns_standin.py                          # 127.0.0.1#5300, bölge oprobe.test
+  python3 oprobe_dns_standin.py --port 5300 --zone oprobe.test --auth-delay-ms 40
+  OPROBE_DNS_SERVERS=127.0.0.1#5300 OPROBE_DNS_MISS_ZONE=oprobe.test python3 dns_resol_latency.py
+
+- Yetkili sunucu (port + 1): bölge altındaki her isme joker A/AAAA cevabı verir, her cevaptan
+  önce --auth-delay-ms bekler (gerçek özyinelemenin yukarı akış maliyetini taklit eder).
+  Bölge dışını REFUSED ile reddeder.
+- Özyinelemeli sunucu (port): önbellekli çözümleyici. Bölge içindeki isimler önbellekte yoksa
+  yetkili sunucuya sorulur ve TTL süresince saklanır (miss -> hit). Bölge dışındaki isimler
+  (ör. google.com) sıcak önbellekteymiş gibi hemen cevaplanır.
+- UDP ve TCP (uzunluk önekli, aynı bağlantıda art arda sorgular) desteklenir.
+- Şifreli uçlar (--cert/--key ya da --self-signed verilirse), aynı özyinelemeli çözümleyiciye:
+    DoT (--dot-port): TLS üzerinden TCP, art arda sorgular aynı bağlantıda
+    DoH (--doh-port): HTTPS, keep-alive HTTP/1.1, POST ve GET ?dns= (RFC 8484), yol /dns-query
+  --self-signed: openssl ile geçici bir sertifika (CN/SAN localhost + 127.0.0.1) üretir;
+  istemcinin güvenmesi için SSL_CERT_FILE olarak verilecek dosya ekrana yazılır.
+
+  python3 oprobe_dns_standin.py --self-signed --dot-port 8853 --doh-port 8443
+  SSL_CERT_FILE=/tmp/.../cert.pem OPROBE_DNS_DOT=127.0.0.1#8853@localhost \
+      OPROBE_DNS_DOH=https://localhost:8443/dns-query python3 dns_resol_latency.py
+"""
+
+import os
+import ssl
+import sys
+import time
+import base64
+import shutil
+import socket
+import struct
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from oprobe_dns import DOH_PATH, DOH_TYPE, QTYPES, DNSFormatError, _read_name, query as dns_query
+
+DEFAULT_PORT = 5300
+DEFAULT_ZONE = "oprobe.test"
+ANSWER_TTL = 60
+CACHE_SIZE = 10000
+UPSTREAM_TIMEOUT = 2.0
+IDLE_TIMEOUT = 10.0   # saniye; boşta kalan TCP/DoT/DoH bağlantısı kapatılır
+DEFAULT_DOT_PORT = 8853
+DEFAULT_DOH_PORT = 8443
+
+_HEADER = struct.Struct("!HHHHHH")
+RCODE_NOERROR, RCODE_FORMERR, RCODE_SERVFAIL, RCODE_NXDOMAIN, RCODE_REFUSED = 0, 1, 2, 3, 5
+
+
+def parse_query(data):
+    """(id, flags, qname, qtype, question bytes) of a query; raises DNSFormatError."""
+    if len(data) < _HEADER.size:
+        raise DNSFormatError("short message")
+    qid, flags, qd, _, _, _ = _HEADER.unpack_from(data)
+    if flags & 0x8000 or qd != 1:
+        raise DNSFormatError("not a single-question query")
+    qname, pos = _read_name(data, _HEADER.size)
+    if pos + 4 > len(data):
+        raise DNSFormatError("truncated question")
+    qtype, _ = struct.unpack_from("!HH", data, pos)
+    return qid, flags, qname.lower(), qtype, data[_HEADER.size:pos + 4]
+
+
+def build_response(qid, flags, question, rcode=RCODE_NOERROR, answers=(), aa=False, ra=True):
+    """Response to a query; ``answers`` are (type, ttl, rdata bytes) owned by the question name."""
+    rflags = 0x8000 | (flags & 0x0100) | (0x0400 if aa else 0) | (0x0080 if ra else 0) | rcode
+    msg = _HEADER.pack(qid, rflags, 1, len(answers), 0, 0) + question
+    for rtype, ttl, rdata in answers:
+        msg += b"\xc0\x0c" + struct.pack("!HHIH", rtype, 1, ttl, len(rdata)) + rdata
+    return msg
+
+
+def synth_rdata(name, qtype):
+    """Deterministic documentation-range address for ``name`` (A: 192.0.2.x, AAAA: 2001:db8::x)."""
+    h = hashlib.sha1(name.encode("utf-8")).digest()
+    if qtype == QTYPES["A"]:
+        return bytes([192, 0, 2, 1 + h[0] % 254])
+    if qtype == QTYPES["AAAA"]:
+        return bytes.fromhex("20010db8") + bytes(10) + h[:2]
+    return None
+
+
+def in_zone(name, zone):
+    zone = zone.rstrip(".").lower() + "."
+    return name == zone or name.endswith("." + zone)
+
+
+class _Server:
+    """UDP + TCP listener that hands each query to ``handle(bytes) -> bytes | None``.
+
+    With a server-side ``context`` it is TCP only and every connection is
+    TLS-wrapped (DNS-over-TLS).
+    """
+
+    def __init__(self, bind, port, handle, name, context=None):
+        self.bind = bind
+        self.port = port
+        self.handle = handle
+        self.name = name
+        self.context = context
+        self._stop = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix=name)
+        self._udp = self._tcp = None
+        self._threads = []
+
+    def start(self):
+        family = socket.AF_INET6 if ":" in self.bind else socket.AF_INET
+        targets = [self._serve_tcp]
+        if self.context is None:
+            self._udp = socket.socket(family, socket.SOCK_DGRAM)
+            self._udp.bind((self.bind, self.port))
+            self.port = self._udp.getsockname()[1]
+            self._udp.settimeout(0.5)
+            targets.append(self._serve_udp)
+        self._tcp = socket.socket(family, socket.SOCK_STREAM)
+        self._tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._tcp.bind((self.bind, self.port))
+        self.port = self._tcp.getsockname()[1]
+        self._tcp.listen(64)
+        self._tcp.settimeout(0.5)
+        for target in targets:
+            t = threading.Thread(target=target, name=self.name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def _answer_udp(self, data, addr):
+        try:
+            resp = self.handle(data)
+            if resp is not None:
+                self._udp.sendto(resp, addr)
+        except OSError:
+            pass
+
+    def _serve_udp(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self._udp.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stop.is_set():
+                    return
+                continue
+            self._pool.submit(self._answer_udp, data, addr)
+
+    def _serve_conn(self, conn):
+        # Aynı bağlantıda art arda (pipelined) sorgular; yanıtlar geldiği sırayla yazılır
+        lock = threading.Lock()
+        conn.settimeout(IDLE_TIMEOUT)
+        # Art arda yanıtlar Nagle + gecikmeli ACK yüzünden ~40 ms beklemesin
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.context is not None:
+            try:
+                conn = self.context.wrap_socket(conn, server_side=True)
+            except (OSError, ssl.SSLError):
+                conn.close()
+                return
+
+        def answer(data):
+            resp = self.handle(data)
+            if resp is not None:
+                with lock:
+                    try:
+                        conn.sendall(struct.pack("!H", len(resp)) + resp)
+                    except OSError:
+                        pass
+
+        try:
+            with conn:
+                buf = b""
+                while not self._stop.is_set():
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        break
+                    buf += chunk
+                    while len(buf) >= 2:
+                        (n,) = struct.unpack_from("!H", buf)
+                        if len(buf) < 2 + n:
+                            break
+                        self._pool.submit(answer, buf[2:2 + n])
+                        buf = buf[2 + n:]
+        except OSError:
+            pass
+
+    def _serve_tcp(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._tcp.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stop.is_set():
+                    return
+                continue
+            threading.Thread(target=self._serve_conn, args=(conn,), daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=2)
+        for sock in (self._udp, self._tcp):
+            if sock is not None:
+                sock.close()
+        self._pool.shutdown(wait=False)
+
+
+class Authoritative:
+    """Wildcard authoritative server for ``zone`` with an artificial per-answer delay."""
+
+    def __init__(self, zone=DEFAULT_ZONE, delay_ms=40.0):
+        self.zone = zone
+        self.delay_ms = delay_ms
+        self.queries = 0
+
+    def handle(self, data):
+        try:
+            qid, flags, qname, qtype, question = parse_query(data)
+        except DNSFormatError:
+            return None
+        self.queries += 1
+        if not in_zone(qname, self.zone):
+            return build_response(qid, flags, question, RCODE_REFUSED, ra=False)
+        if self.delay_ms:
+            time.sleep(self.delay_ms / 1000.0)
+        rdata = synth_rdata(qname, qtype)
+        answers = [(qtype, ANSWER_TTL, rdata)] if rdata else []
+        return build_response(qid, flags, question, answers=answers, aa=True, ra=False)
+
+
+class Recursive:
+    """Caching resolver: zone names are fetched from ``upstream`` on a miss, others are pre-cached."""
+
+    def __init__(self, zone, upstream):
+        self.zone = zone
+        self.upstream = upstream   # (ip, port)
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()   # (qname, qtype) -> (expires, rcode, answers)
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry
+
+    def _store(self, key, rcode, answers):
+        ttl = min((a[1] for a in answers), default=ANSWER_TTL)
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, rcode, answers)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _resolve(self, qname, qtype):
+        r = dns_query(self.upstream[0], qname, qtype, transport="udp", timeout=UPSTREAM_TIMEOUT,
+                      port=self.upstream[1], rd=False)
+        if not r["ok"] or r["rcode_name"] not in ("NOERROR", "NXDOMAIN"):
+            return RCODE_SERVFAIL, None
+        answers = []
+        for _, rtype, ttl, value in r["answers"]:
+            if rtype == "A":
+                answers.append((QTYPES["A"], ttl, socket.inet_pton(socket.AF_INET, value)))
+            elif rtype == "AAAA":
+                answers.append((QTYPES["AAAA"], ttl, socket.inet_pton(socket.AF_INET6, value)))
+        return r["rcode"], answers
+
+    def handle(self, data):
+        try:
+            qid, flags, qname, qtype, question = parse_query(data)
+        except DNSFormatError:
+            return None
+        if not in_zone(qname, self.zone):
+            # Bölge dışı: sıcak önbellek gibi davran
+            self.hits += 1
+            rdata = synth_rdata(qname, qtype)
+            return build_response(qid, flags, question, answers=[(qtype, ANSWER_TTL, rdata)] if rdata else [])
+        key = (qname, qtype)
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return build_response(qid, flags, question, entry[1], entry[2])
+        self.misses += 1
+        rcode, answers = self._resolve(qname, qtype)
+        if answers is None:
+            return build_response(qid, flags, question, rcode)
+        self._store(key, rcode, answers)
+        return build_response(qid, flags, question, rcode, answers)
+
+
+class _DoHHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    disable_nagle_algorithm = True  # başlık ve gövde ayrı yazılır: gecikmeli ACK beklenmesin
+    handle_query = None             # sunucu kurulurken atanır
+
+    def _reply(self, status, body=b"", ctype=DOH_TYPE):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", f"max-age={ANSWER_TTL}" if status == 200 else "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _answer(self, query):
+        resp = type(self).handle_query(query) if query else None
+        if resp is None:
+            self._reply(400, b"bad dns query\n", "text/plain")
+        else:
+            self._reply(200, resp)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if 0 < length <= 65535 else b""
+        if urlsplit(self.path).path != DOH_PATH:
+            self._reply(404, b"not found\n", "text/plain")
+        elif self.headers.get("Content-Type", "").split(";")[0].strip() != DOH_TYPE:
+            self._reply(415, b"unsupported media type\n", "text/plain")
+        else:
+            self._answer(body)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        dns = parse_qs(parts.query).get("dns", [""])[0]
+        if parts.path != DOH_PATH or not dns:
+            self._reply(404 if parts.path != DOH_PATH else 400, b"use ?dns=<base64url query>\n", "text/plain")
+            return
+        try:
+            query = base64.urlsafe_b64decode(dns + "=" * (-len(dns) % 4))
+        except ValueError:
+            query = b""
+        self._answer(query)
+
+    def log_message(self, *args):
+        pass
+
+
+class _DoHServer:
+    """DNS-over-HTTPS endpoint (``DOH_PATH``) in front of ``handle``."""
+
+    def __init__(self, bind, port, handle, context):
+        handler = type("DoHHandler", (_DoHHandler,), {"handle_query": staticmethod(handle),
+                                                      "timeout": IDLE_TIMEOUT})
+        server_cls = type("DoHHTTPServer", (ThreadingHTTPServer,),
+                          {"address_family": socket.AF_INET6 if ":" in bind else socket.AF_INET})
+        self.httpd = server_cls((bind, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True,
+                                                do_handshake_on_connect=False)
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, args=(0.5,), name="dns-doh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_self_signed(directory=None):
+    """(cert, key) paths of a throwaway self-signed certificate for localhost / 127.0.0.1 / ::1."""
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        raise RuntimeError("openssl not found; pass --cert and --key instead")
+    directory = directory or tempfile.mkdtemp(prefix="oprobe-dns-")
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run([openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "7",
+                    "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1,IP:::1",
+                    "-keyout", key, "-out", cert], check=True, capture_output=True, timeout=60)
+    return cert, key
+
+
+def server_context(cert, key):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    return ctx
+
+
+class StandinDNS:
+    """Authoritative + recursive stand-in pair; the recursive one listens on ``port``.
+
+    Given a server-side TLS ``context``, the recursive resolver is also
+    served over DoT on ``dot_port`` and DoH on ``doh_port`` (0: random).
+    """
+
+    def __init__(self, bind="127.0.0.1", port=DEFAULT_PORT, zone=DEFAULT_ZONE, auth_delay_ms=40.0,
+                 context=None, dot_port=DEFAULT_DOT_PORT, doh_port=DEFAULT_DOH_PORT):
+        self.bind = bind
+        self.port = port
+        self.zone = zone
+        self.context = context
+        self.dot_port = dot_port
+        self.doh_port = doh_port
+        self.auth = Authoritative(zone, auth_delay_ms)
+        self.recursive = None
+        self._servers = []
+
+    def start(self):
+        auth_srv = _Server(self.bind, self.port + 1 if self.port else 0, self.auth.handle, "dns-auth").start()
+        self.recursive = Recursive(self.zone, (self.bind, auth_srv.port))
+        rec_srv = _Server(self.bind, self.port, self.recursive.handle, "dns-rec").start()
+        self.port = rec_srv.port
+        self.auth_port = auth_srv.port
+        self._servers = [rec_srv, auth_srv]
+        if self.context is not None:
+            dot_srv = _Server(self.bind, self.dot_port, self.recursive.handle, "dns-dot", self.context).start()
+            doh_srv = _DoHServer(self.bind, self.doh_port, self.recursive.handle, self.context).start()
+            self.dot_port, self.doh_port = dot_srv.port, doh_srv.port
+            self._servers += [dot_srv, doh_srv]
+        return self
+
+    def stop(self):
+        for srv in self._servers:
+            srv.stop()
+        self._servers = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="oprobe_dns_standin", description="Local DNS stand-in for Oprobe tests")
+    parser.add_argument("--bind", default="127.0.0.1", help="listen address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="recursive port; authoritative uses port+1 (default: %(default)s)")
+    parser.add_argument("--zone", default=DEFAULT_ZONE, help="cache-busting zone (default: %(default)s)")
+    parser.add_argument("--auth-delay-ms", type=float, default=40.0,
+                        help="authoritative answer delay, i.e. simulated recursion cost (default: %(default)s)")
+    parser.add_argument("--cert", help="PEM certificate for the DoT/DoH endpoints")
+    parser.add_argument("--key", help="PEM private key for --cert")
+    parser.add_argument("--self-signed", action="store_true",
+                        help="generate a throwaway localhost certificate with openssl")
+    parser.add_argument("--dot-port", type=int, default=DEFAULT_DOT_PORT, help="DoT port (default: %(default)s)")
+    parser.add_argument("--doh-port", type=int, default=DEFAULT_DOH_PORT, help="DoH port (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    context = None
+    if args.self_signed:
+        args.cert, args.key = make_self_signed()
+    if args.cert:
+        context = server_context(args.cert, args.key or args.cert)
+    dns = StandinDNS(args.bind, args.port, args.zone, args.auth_delay_ms, context, args.dot_port,
+                     args.doh_port).start()
+    print(f"Recursive on {args.bind}#{dns.port}, authoritative for {args.zone} on {args.bind}#{dns.auth_port} "
+          f"(delay {args.auth_delay_ms:g} ms)", flush=True)
+    if context is not None:
+        print(f"DoT on {args.bind}#{dns.dot_port}, DoH on https://{args.bind}:{dns.doh_port}{DOH_PATH} "
+              f"(trust with SSL_CERT_FILE={args.cert})", flush=True)
+    stop = threading.Event()
+    try:
+        import signal
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    dns.stop()
+    print(f"Stopped: {dns.recursive.hits} hits, {dns.recursive.misses} misses, "
+          f"{dns.auth.queries} authoritative queries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_exporter.py
+- Orkestratörün içinde çalışan isteğe bağlı OpenMetrics (Prometheus) uç noktası: GET /metrics
+- Değerler bellekteki durumdan gelir; durum, testlerin yapısal kayıtlarıyla (sample /
+  summary / run / resource) güncellenir. Scrape hiçbir ölçüm tetiklemez; çıktı metni
+  durum değişmedikçe önbellekten döner.
+- Eşleme:
+    summary  -> gauge      oprobe_<test>_<metric>{target=..., phase=...}
+    sample   -> histogram  (ms metrikleri, saniyeye çevrilerek) / gauge (diğerleri, ör. rssi_dbm)
+    run      -> gauge      oprobe_run_duration_seconds, oprobe_run_exit_code
+    resource -> gauge      oprobe_resource_<metric>{test=...}
+  "_ms" ile biten metrikler OpenMetrics birim kuralı gereği saniye olarak yayınlanır.
+"""
+
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+TEXT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LABEL_FIELDS = ("phase", "mode", "scope", "transport")   # target dışında etikete dönüşen kayıt alanları
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _family(*parts):
+    return _NAME_RE.sub("_", "_".join(p for p in parts if p)).lower()
+
+
+def _unit(metric):
+    """('latency', 'seconds', 0.001) for 'latency_ms'; (metric, None, 1) otherwise."""
+    if metric.endswith("_ms"):
+        return metric[:-3], "seconds", 0.001
+    if metric.endswith("_s"):
+        return metric[:-2], "seconds", 1.0
+    return metric, None, 1.0
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _num(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsState:
+    """Latest gauge values and cumulative histograms fed by ``add_record()``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}   # name -> {"type", "unit", "help", "series": {labels: value | _Histogram}}
+        self._version = 0
+        self._rendered = (None, b"")
+
+    def _series(self, name, mtype, unit, help_text):
+        fam = self._families.get(name)
+        if fam is None:
+            fam = self._families[name] = {"type": mtype, "unit": unit, "help": help_text, "series": {}}
+        elif fam["type"] != mtype:
+            return None   # aynı isim farklı tipte: ilk gelen kazanır
+        return fam["series"]
+
+    def _gauge(self, name, unit, help_text, labels, value):
+        series = self._series(name, "gauge", unit, help_text)
+        if series is not None:
+            series[labels] = float(value)
+
+    def _observe(self, name, unit, help_text, labels, value):
+        series = self._series(name, "histogram", unit, help_text)
+        if series is not None:
+            series.setdefault(labels, _Histogram()).observe(float(value))
+
+    def add_record(self, rec):
+        rtype, test = rec.get("type"), str(rec.get("test") or "")
+        if rtype not in ("sample", "summary", "run", "resource") or not test:
+            return
+        labels = []
+        if rec.get("target") is not None:
+            labels.append(("target", str(rec["target"])))
+        labels.extend((k, str(rec[k])) for k in LABEL_FIELDS if rec.get(k) is not None)
+        labels = tuple(labels)
+
+        with self._lock:
+            if rtype == "run":
+                tl = (("test", test),)
+                if rec.get("duration_s") is not None:
+                    self._gauge("oprobe_run_duration_seconds", "seconds", "Duration of the last run", tl,
+                                rec["duration_s"])
+                if isinstance(rec.get("rc"), int):
+                    self._gauge("oprobe_run_exit_code", None, "Exit code of the last run", tl, rec["rc"])
+            else:
+                for metric, value in (rec.get("metrics") or {}).items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    base, unit, scale = _unit(str(metric))
+                    if rtype == "resource":
+                        self._gauge(_family("oprobe_resource", base, unit), unit,
+                                    f"Resource usage of the last run: {metric}", (("test", test),), value * scale)
+                    elif rtype == "sample" and unit == "seconds":
+                        self._observe(_family("oprobe", test, base, unit), unit,
+                                      f"{test} {metric} samples", labels, value * scale)
+                    else:
+                        self._gauge(_family("oprobe", test, base, unit), unit,
+                                    f"{test} {metric} (latest {rtype})", labels, value * scale)
+            if rec.get("ts"):
+                self._gauge("oprobe_last_update_timestamp_seconds", "seconds", "Time of the last record per test",
+                            (("test", test),), rec["ts"])
+            self._version += 1
+
+    def render(self):
+        """OpenMetrics text of the current state (cached until the next update)."""
+        with self._lock:
+            if self._rendered[0] == self._version:
+                return self._rendered[1]
+            out = []
+            for name in sorted(self._families):
+                fam = self._families[name]
+                out.append(f"# TYPE {name} {fam['type']}")
+                if fam["unit"]:
+                    out.append(f"# UNIT {name} {fam['unit']}")
+                out.append(f"# HELP {name} {_escape(fam['help'])}")
+                for labels, value in sorted(fam["series"].items()):
+                    if fam["type"] == "histogram":
+                        cum = 0
+                        for bound, count in zip(BUCKETS, value.counts):
+                            cum += count
+                            out.append(f"{name}_bucket{_labels(labels + (('le', _num(bound)),))} {cum}")
+                        out.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {value.count}")
+                        out.append(f"{name}_count{_labels(labels)} {value.count}")
+                        out.append(f"{name}_sum{_labels(labels)} {_num(value.sum)}")
+                    else:
+                        out.append(f"{name}{_labels(labels)} {_num(value)}")
+            out.append("# EOF")
+            body = ("\n".join(out) + "\n").encode("utf-8")
+            self._rendered = (self._version, body)
+            return body
+
+
+class MetricsExporter:
+    """Serve a MetricsState at ``http://<bind>:<port>/metrics`` from a background thread."""
+
+    def __init__(self, port, bind="127.0.0.1", state=None):
+        self.state = state or MetricsState()
+        self.port = port
+        self.bind = bind
+        self._server = None
+        self._thread = None
+
+    def add_record(self, rec):
+        self.state.add_record(rec)
+
+    def start(self):
+        state = self.state
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = state.render()
+                accept = self.headers.get("Accept", "")
+                ctype = OPENMETRICS_TYPE if "application/openmetrics-text" in accept else TEXT_TYPE
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass   # her scrape için konsola satır basma
+
+        self._server = ThreadingHTTPServer((self.bind, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+oprobe_forkserver.py
+- Test modüllerini (ve requests/ntplib gibi ağır bağımlılıkları) bir kez yükleyip
+  her test için önceden ısınmış bir kopya fork eden kalıcı sunucu.
+- run_all_tests.py, USE_WARM_POOL=True iken her turda "python3 -u" başlatmak yerine
+  buradan fork edilen işçileri kullanır; kill/timeout davranışı aynı kalır
+  (işçi kendi process group'unda çalışır, killpg ile durdurulur).
+- Protokol: AF_UNIX soket, her spawn için ayrı bağlantı; istek JSON satırı +
+  SCM_RIGHTS ile stdout/stderr pipe uçları. Cevaplar: {"event":"started","pid":..}
+  ve süreç bitince {"event":"exit","rc":..,"usage":{..}} (CPU, tepe RSS, I/O sayaçları).
+"""
+
+import os
+import sys
+import json
+import array
+import signal
+import socket
+import argparse
+import importlib
+import selectors
+import threading
+import traceback
+import subprocess
+
+from oprobe_resources import reap_with_usage
+
+MAX_FDS = 8
+MSG_LIMIT = 64 * 1024
+
+
+def _send_msg(sock, obj, fds=()):
+    data = (json.dumps(obj) + "\n").encode("utf-8")
+    if fds:
+        anc = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        sock.sendmsg([data], anc)
+    else:
+        sock.sendall(data)
+
+
+def _recv_msg(sock):
+    """Receive one JSON line plus any passed fds. Returns (obj, fds) or (None, [])."""
+    fds = array.array("i")
+    data, anc, _flags, _addr = sock.recvmsg(MSG_LIMIT, socket.CMSG_LEN(MAX_FDS * fds.itemsize))
+    for level, ctype, cdata in anc:
+        if level == socket.SOL_SOCKET and ctype == socket.SCM_RIGHTS:
+            fds.frombytes(cdata[:len(cdata) - (len(cdata) % fds.itemsize)])
+    if not data:
+        return None, list(fds)
+    return json.loads(data.decode("utf-8").splitlines()[0]), list(fds)
+
+
+# ------------------------------------------------------
+# Sunucu tarafı
+# ------------------------------------------------------
+def _run_child(req, fds, modules):
+    """Runs inside the forked worker; never returns."""
+    code = 0
+    try:
+        os.setpgid(0, 0)
+    except OSError:
+        pass
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    try:
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1], 2)
+        for fd in fds[:2]:
+            if fd > 2:
+                os.close(fd)
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+        os.environ.update(req.get("env") or {})
+        if len(fds) > 2 and req.get("fd_env"):
+            # ek kanal (ör. JSONL kayıtları) fd numarasıyla birlikte bildirilir
+            os.environ[req["fd_env"]] = str(fds[2])
+        sys.argv = list(req.get("argv") or [req["module"]])
+        mod = modules.get(req["module"]) or importlib.import_module(req["module"])
+        getattr(mod, req["entry"])()
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except KeyboardInterrupt:
+        # "python3 -u" ile aynı sonuç: SIGINT ile ölmüş gibi çık
+        sys.stdout.flush()
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGINT)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+    os._exit(code)
+
+
+def serve(sock_path, preload):
+    modules = {}
+    for name in preload:
+        try:
+            modules[name] = importlib.import_module(name)
+        except Exception as e:
+            sys.stderr.write(f"[forkserver] preload {name} failed: {e}\n")
+
+    if os.path.exists(sock_path):
+        os.unlink(sock_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(sock_path)
+    listener.listen(16)
+
+    running = True
+
+    def _stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    # SIGCHLD geldiğinde select hemen uyansın (self-pipe)
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    sel = selectors.DefaultSelector()
+    sel.register(listener, selectors.EVENT_READ)
+    sel.register(wake_r, selectors.EVENT_READ)
+    children = {}   # pid -> conn
+    print(f"READY {sock_path}", flush=True)
+
+    while running:
+        for key, _ in sel.select(timeout=1.0):
+            if key.fileobj == wake_r:
+                try:
+                    os.read(wake_r, 4096)
+                except OSError:
+                    pass
+                continue
+            if key.fileobj is listener:
+                conn, _ = listener.accept()
+                sel.register(conn, selectors.EVENT_READ)
+                continue
+            conn = key.fileobj
+            sel.unregister(conn)
+            try:
+                req, fds = _recv_msg(conn)
+            except Exception:
+                req, fds = None, []
+            if req is None or len(fds) < 2:
+                for fd in fds:
+                    os.close(fd)
+                conn.close()
+                continue
+            pid = os.fork()
+            if pid == 0:
+                signal.set_wakeup_fd(-1)
+                os.close(wake_r)
+                os.close(wake_w)
+                listener.close()
+                conn.close()
+                for c in children.values():
+                    c.close()
+                # Seçicinin epoll fd'si ve henüz isteği okunmamış bağlantılar da işçiye geçmesin
+                for k in list(sel.get_map().values()):
+                    if k.fileobj is not listener and k.fileobj != wake_r:
+                        k.fileobj.close()
+                sel.close()
+                _run_child(req, fds, modules)
+            try:
+                os.setpgid(pid, pid)   # killpg yarışına karşı ebeveyn de ayarlar
+            except OSError:
+                pass
+            for fd in fds:
+                os.close(fd)
+            children[pid] = conn
+            try:
+                _send_msg(conn, {"event": "started", "pid": pid})
+            except OSError:
+                pass
+
+        # Biten işçileri topla (I/O sayaçları zombi toplanmadan okunur)
+        while children:
+            try:
+                info = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            except ChildProcessError:
+                break
+            if info is None or not info.si_pid:
+                break
+            pid = info.si_pid
+            try:
+                rc, usage = reap_with_usage(pid)
+            except ChildProcessError:
+                continue
+            conn = children.pop(pid, None)
+            if conn is not None:
+                try:
+                    _send_msg(conn, {"event": "exit", "pid": pid, "rc": rc, "usage": usage})
+                except OSError:
+                    pass
+                conn.close()
+
+    for pid in list(children):
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    listener.close()
+    try:
+        os.unlink(sock_path)
+    except OSError:
+        pass
+
+
+# ------------------------------------------------------
+# İstemci tarafı (orkestratör)
+# ------------------------------------------------------
+class WarmProcess:
+    """Popen-like handle for a worker forked by the fork-server."""
+
+    def __init__(self, conn, pid, stdout, stderr, pending=b""):
+        self._conn = conn
+        self._pending = pending
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self.usage = {}
+        self._done = threading.Event()
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        buf = self._pending
+        try:
+            while b"\n" not in buf:
+                chunk = self._conn.recv(4096)
+                if not chunk:
+                    break
+                buf += chunk
+            msg = json.loads(buf.decode("utf-8").splitlines()[0]) if buf.strip() else {}
+            self.returncode = msg.get("rc", -1)
+            self.usage = msg.get("usage") or {}
+        except Exception:
+            self.returncode = -1
+        finally:
+            self._conn.close()
+            self._done.set()
+
+    def poll(self):
+        return self.returncode if self._done.is_set() else None
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(str(self.pid), timeout)
+        return self.returncode
+
+    def terminate(self):
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+
+class WarmPool:
+    """Start and talk to a fork-server subprocess that has the test modules preloaded."""
+
+    def __init__(self, base_dir, modules, sock_path=None):
+        self.base_dir = base_dir
+        self.modules = list(modules)
+        self.sock_path = sock_path or os.path.join(base_dir, "results", f".forkserver-{os.getpid()}.sock")
+        self.proc = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.sock_path), exist_ok=True)
+        cmd = [sys.executable, "-u", os.path.abspath(__file__), "--socket", self.sock_path,
+               "--preload", *self.modules]
+        self.proc = subprocess.Popen(cmd, cwd=self.base_dir, stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline()
+        if not line.startswith("READY"):
+            self.stop()
+            raise RuntimeError("fork-server failed to start")
+        return self
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def spawn(self, module, entry, argv=None, env=None, extra_fd=None, fd_env=None):
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        fds = (out_w, err_w) if extra_fd is None else (out_w, err_w, extra_fd)
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self.sock_path)
+            _send_msg(conn, {"module": module, "entry": entry, "argv": argv, "env": env or {},
+                             "fd_env": fd_env}, fds=fds)
+        except OSError:
+            conn.close()
+            for fd in (out_r, out_w, err_r, err_w):
+                os.close(fd)
+            raise
+        finally:
+            for fd in (out_w, err_w):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        buf = b""
+        while b"\n" not in buf:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            buf += chunk
+        line, _, rest = buf.partition(b"\n")
+        msg = json.loads(line.decode("utf-8")) if line.strip() else {}
+        if msg.get("event") != "started":
+            conn.close()
+            os.close(out_r)
+            os.close(err_r)
+            raise RuntimeError("fork-server did not start the worker")
+        # "exit" mesajı "started" ile aynı pakette gelmiş olabilir → rest
+        return WarmProcess(conn, msg["pid"],
+                           os.fdopen(out_r, "r", encoding="utf-8", errors="replace"),
+                           os.fdopen(err_r, "r", encoding="utf-8", errors="replace"),
+                           pending=rest)
+
+    def stop(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.terminate()
+            self.proc.wait(timeout=5)
+        except Exception:
+            try:
+                self.proc.kill()
+            except Exception:
+                pass
+        self.proc = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oprobe warm worker fork-server")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--preload", nargs="*", default=[])
+    args = parser.parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    serve(args.socket, args.preload)
+
+
+if __name__ == "__main__":
+    main()
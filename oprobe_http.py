@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_http.py
+- Faz bazlı HTTP(S) zamanlama probu: DNS çözümleme, TCP bağlantı, TLS el sıkışma,
+  ilk bayta kadar geçen süre (TTFB) ve gövde aktarımı ayrı ayrı ölçülür.
+- Her faz perf_counter_ns ile, kendi adımının etrafında ölçülür. Soket önceden
+  bağlanır ve http.client'a verilir. İlk bayt anı, yanıt okuyan ham soket
+  sarmalayıcısında yakalanır (TLS 1.3 oturum biletleri uygulama verisi sayılmaz).
+- Yönlendirmeler izlenmez: ölçülen, listedeki host'un kendi yanıtıdır (3xx başarılı sayılır).
+- Bağlantı modları (HttpProber):
+    cold    : her ölçümde yeni TCP + tam TLS el sıkışma
+    resumed : yeni TCP, TLS oturumu (session ticket) yeniden kullanılır
+    warm    : keep-alive bağlantı havuzu; DNS/TCP/TLS fazı yoktur, sadece istek/yanıt RTT'si
+  Oturum deposu (sessions) proberlar arasında paylaşılabilir: warm prober'ın açtığı bağlantının
+  TLS oturumu resumed prober tarafından sürdürülür (tek tam el sıkışmayla üç tür ölçüm).
+- Gövde modları (body):
+    full       : yanıt gövdesi sonuna kadar okunur (aktarım süresi bant genişliğine bağlıdır)
+    head       : HEAD isteği; ölçüm başlıklarla biter, bağlantı keep-alive için uygundur
+    first-byte : GET, gövdenin ilk parçası okunur ve bağlantı kapatılır (yeniden kullanılmaz)
+- Her sonuç okunan/gönderilen bayt sayısını taşır (bytes_in / bytes_out: HTTP katmanı,
+  TLS ve TCP ek yükü hariç; first-byte modunda kapanış anında yolda olan veri sayılmaz).
+"""
+
+import io
+import ssl
+import time
+import socket
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+TIMEOUT = 5.0
+USER_AGENT = "Oprobe-HTTP/1.0"
+PHASES = ("dns_ms", "tcp_ms", "tls_ms", "ttfb_ms", "transfer_ms")
+MODES = ("cold", "resumed", "warm")
+BODY_MODES = ("full", "head", "first-byte")
+FIRST_CHUNK = 16384   # first-byte modunda okunan en fazla gövde (bayt)
+
+
+class _TimedReader(io.RawIOBase):
+    """Raw reader over a socket that notes when the first response byte arrives."""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self.first_byte_ns = None
+        self.bytes_in = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        n = self._sock.recv_into(buf)
+        if n and self.first_byte_ns is None:
+            self.first_byte_ns = time.perf_counter_ns()
+        self.bytes_in += n
+        return n
+
+
+class _TimedSocket:
+    """The part of the socket API http.client uses, with a timed response reader."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = _TimedReader(sock)
+        self.bytes_out = 0
+
+    def makefile(self, mode="rb", *args, **kwargs):
+        # Her yanıt yeni bir ölçüm (ve HTTPResponse bittiğinde okuyucuyu kapatır)
+        self.reader = _TimedReader(self.sock)
+        return io.BufferedReader(self.reader)
+
+    def sendall(self, data):
+        self.sock.sendall(data)
+        self.bytes_out += len(data)
+
+    def close(self):
+        self.sock.close()
+
+
+def _ms(t0, t1):
+    return (t1 - t0) / 1e6 if t0 is not None and t1 is not None else None
+
+
+_default_context = None
+_default_context_lock = threading.Lock()
+
+
+def default_context():
+    """Shared verifying TLS context (built once, so CA loading is never inside a timed phase)."""
+    global _default_context
+    with _default_context_lock:   # iki iş parçacığı iki bağlam kurmasın: oturumlar bağlama bağlıdır
+        if _default_context is None:
+            _default_context = ssl.create_default_context()
+        return _default_context
+
+
+def _new_result(mode, body):
+    return {"ok": False, "status": None, "error": None, "remote": None, "bytes_in": 0, "bytes_out": 0,
+            "mode": mode, "body": body, "reused": False, "resumed": False, "dns_ms": None, "tcp_ms": None, "tls_ms": None,
+            "ttfb_ms": None, "transfer_ms": None, "total_ms": None}
+
+
+class HttpProber:
+    """Phase-timed HTTP(S) probes in one connection mode (see MODES).
+
+    ``resumed`` keeps the last TLS session per origin and offers it on the
+    next handshake. ``warm`` keeps idle keep-alive connections per origin and
+    reuses them; a connection the server has dropped is replaced transparently
+    (that probe then reports the connect phases). ``body`` (see BODY_MODES)
+    decides how much of the response is read; ``first-byte`` closes every
+    connection, so it never yields warm probes. ``sessions`` is an optional
+    dict shared with other probers: every prober stores the TLS sessions it
+    gets there, and a ``resumed`` prober offers them. Safe to share between
+    threads.
+    """
+
+    def __init__(self, mode="cold", timeout=TIMEOUT, context=None, body="full", sessions=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown connection mode: {mode!r} (use one of {', '.join(MODES)})")
+        if body not in BODY_MODES:
+            raise ValueError(f"unknown body mode: {body!r} (use one of {', '.join(BODY_MODES)})")
+        self.mode = mode
+        self.body = body
+        self.timeout = timeout
+        self.context = context
+        self._lock = threading.Lock()
+        self._sessions = {} if sessions is None else sessions   # origin -> ssl.SSLSession
+        self._idle = {}       # origin -> [(HTTPConnection, _TimedSocket)]
+
+    # --- bağlantı kurma (DNS, TCP, TLS) ---
+    def _connect(self, host, port, https, origin, res):
+        t0 = time.perf_counter_ns()
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        t_dns = time.perf_counter_ns()
+        res["dns_ms"] = _ms(t0, t_dns)
+
+        # TCP (ilk başarılı adres; başarısız denemeler de bu faza dahildir)
+        sock, err = None, None
+        for family, stype, proto, _, addr in infos:
+            sock = None
+            try:
+                sock = socket.socket(family, stype, proto)
+                sock.settimeout(self.timeout)
+                sock.connect(addr)
+                res["remote"] = addr[0]
+                break
+            except OSError as e:
+                # socket() da düşebilir (ör. IPv6'sız hostta AAAA adresi: EAFNOSUPPORT)
+                err = e
+                if sock is not None:
+                    sock.close()
+                sock = None
+        if sock is None:
+            raise err or OSError("no address")
+        t_tcp = time.perf_counter_ns()
+        res["tcp_ms"] = _ms(t_dns, t_tcp)
+
+        if https:
+            ctx = self.context or default_context()
+            session = self._sessions.get(origin) if self.mode == "resumed" else None
+            try:
+                sock = ctx.wrap_socket(sock, server_hostname=host, session=session)
+            except BaseException:
+                sock.close()
+                raise
+            res["tls_ms"] = _ms(t_tcp, time.perf_counter_ns())
+            res["resumed"] = bool(sock.session_reused)
+        conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        timed = _TimedSocket(sock)
+        conn.sock = timed
+        return conn, timed
+
+    def _take_idle(self, origin):
+        with self._lock:
+            pool = self._idle.get(origin)
+            return pool.pop() if pool else None
+
+    def _put_idle(self, origin, pair):
+        with self._lock:
+            self._idle.setdefault(origin, []).append(pair)
+
+    def probe(self, url, method=None, headers=None):
+        """Request ``url`` once and time every phase.
+
+        ``method`` defaults to HEAD in ``head`` body mode and GET otherwise.
+        Returns a dict: ok, status, error, remote, mode, body, reused
+        (keep-alive connection reused), resumed (TLS session resumed), dns_ms,
+        tcp_ms, tls_ms, ttfb_ms, transfer_ms, total_ms, bytes_in and
+        bytes_out. Phases not reached (or skipped on a reused connection) are
+        None. ``ok`` means the server answered with a status below 400.
+        """
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        host = parts.hostname
+        port = parts.port or (443 if https else 80)
+        origin = (parts.scheme, host, port)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        if method is None:
+            method = "HEAD" if self.body == "head" else "GET"
+        early_close = self.body == "first-byte"
+        keep = self.mode == "warm" and not early_close
+        hdrs = {"User-Agent": USER_AGENT, "Accept": "*/*", "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive" if keep else "close"}
+        hdrs.update(headers or {})
+        if https:
+            self.context or default_context()   # CA yüklemesi ölçülen fazlara girmesin
+
+        pair = self._take_idle(origin) if keep else None
+        for attempt in (0, 1):
+            res = _new_result(self.mode, self.body)
+            t_start = time.perf_counter_ns()
+            conn = timed = None
+            try:
+                if pair is not None:
+                    conn, timed = pair
+                    res["reused"] = True
+                else:
+                    conn, timed = self._connect(host, port, https, origin, res)
+                t_req = time.perf_counter_ns()
+                conn.request(method, path, headers=hdrs)
+                resp = conn.getresponse()
+                res["status"] = resp.status
+                res["ttfb_ms"] = _ms(t_req, timed.reader.first_byte_ns)
+                if early_close:
+                    resp.read1(FIRST_CHUNK)   # ilk parça; kalan gövde bağlantıyla birlikte bırakılır
+                else:
+                    resp.read()
+                t_end = time.perf_counter_ns()
+                res["transfer_ms"] = _ms(timed.reader.first_byte_ns, t_end)
+                res["total_ms"] = _ms(t_start, t_end)
+                res["bytes_in"] = timed.reader.bytes_in
+                res["bytes_out"] = timed.bytes_out
+                res["ok"] = resp.status < 400
+                if https and timed.sock.session is not None:
+                    with self._lock:
+                        self._sessions[origin] = timed.sock.session
+                if keep and not resp.will_close and resp.isclosed():
+                    self._put_idle(origin, (conn, timed))
+                    conn = None
+                return res
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                res["error"] = type(e).__name__ if not str(e) else f"{type(e).__name__}: {e}"
+                if pair is not None and attempt == 0 and isinstance(
+                        e, (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine)):
+                    # Sunucu boşta bekleyen bağlantıyı kapatmış: yeni bağlantıyla bir kez daha
+                    pair = None
+                    continue
+                return res
+            finally:
+                if conn is not None:
+                    conn.close()
+        return res
+
+    def drop_idle(self, url):
+        """Close the idle keep-alive connections to ``url``'s origin (the next probe connects)."""
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        origin = (parts.scheme, parts.hostname, parts.port or (443 if https else 80))
+        with self._lock:
+            pool = self._idle.pop(origin, [])
+        for conn, _ in pool:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+            self._sessions.clear()
+        for pool in pools.values():
+            for conn, _ in pool:
+                conn.close()
+
+
+def probe(url, timeout=TIMEOUT, method=None, context=None, headers=None, body="full"):
+    """One cold (new TCP + full TLS) phase-timed probe of ``url``; see HttpProber.probe."""
+    return HttpProber("cold", timeout=timeout, context=context, body=body).probe(url, method=method,
+                                                                               headers=headers)
+
+
+def connection_kind(res):
+    """What a probe actually measured: 'warm' (reused), 'resumed' (TLS resumed) or 'cold'."""
+    if res["reused"]:
+        return "warm"
+    return "resumed" if res["resumed"] else "cold"
+
+
+def format_phases(res):
+    """'dns 1.2 / tcp 10.3 / tls 21.0 / ttfb 40.1 / xfer 3.2 ms' for the phases that were reached."""
+    names = (("dns", "dns_ms"), ("tcp", "tcp_ms"), ("tls", "tls_ms"), ("ttfb", "ttfb_ms"), ("xfer", "transfer_ms"))
+    parts = [f"{label} {res[key]:.1f}" for label, key in names if res.get(key) is not None]
+    return " / ".join(parts) + " ms" if parts else "-"
+
+
+if __name__ == "__main__":
+    import sys
+    for u in sys.argv[1:] or ["https://www.google.com"]:
+        for b in BODY_MODES:
+            r = probe(u, body=b)
+            total = f"{r['total_ms']:.1f} ms" if r["total_ms"] is not None else r["error"]
+            print(f"{u} [{b}]: {total}  ({format_phases(r)})  status={r['status']} "
+                  f"bytes={r['bytes_in']} in / {r['bytes_out']} out")
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_index.py
+- results/ altındaki raporlar için artımlı indeks (SQLite).
+- Her *_all_tests.txt / *_all_tests.jsonl dosyası sadece yeni ya da değişmişse
+  (mtime + boyut) yeniden ayrıştırılır; silinen dosyalar indeksten düşer.
+- İndeks: zaman damgası, test, hedef, durum (ok / failed / error / skipped) ve metrikler.
+"""
+
+import os
+import re
+import json
+import sqlite3
+from datetime import datetime
+
+INDEX_NAME = ".oprobe_index.sqlite"
+REPORT_RE = re.compile(r"^(\d{8}_\d{6})_all_tests\.(txt|jsonl)$")
+BLOCK_RE = re.compile(r"^### (\S+) ###$", re.M)
+NORMAL_RCS = {"0", "-15", "-2", "143", "130"}   # kendi bitti ya da orkestratör durdurdu
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    file TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    test TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rc TEXT,
+    stop TEXT,
+    duration_s REAL
+);
+CREATE INDEX IF NOT EXISTS runs_key ON runs(test, status, ts);
+CREATE INDEX IF NOT EXISTS runs_file ON runs(file);
+CREATE TABLE IF NOT EXISTS metrics (
+    file TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    test TEXT NOT NULL,
+    target TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metrics_key ON metrics(name, value);
+CREATE INDEX IF NOT EXISTS metrics_test ON metrics(test, name, ts);
+CREATE INDEX IF NOT EXISTS metrics_file ON metrics(file);
+"""
+
+
+def connect(results_dir):
+    conn = sqlite3.connect(os.path.join(results_dir, INDEX_NAME), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _batch_epoch(name):
+    m = REPORT_RE.match(name)
+    return int(datetime.strptime(m.group(1), "%Y%m%d_%H%M%S").timestamp()) if m else 0
+
+
+# ------------------------------------------------------
+# .txt raporları
+# ------------------------------------------------------
+def legacy_metrics(base, text):
+    """Metrics for reports written before blocks carried a 'Metrics:' line."""
+    metrics = []
+
+    def find_last_float(pat, flags=0):
+        val = None
+        for m in re.finditer(pat, text, flags):
+            try:
+                val = float(m.group(1))
+            except ValueError:
+                pass
+        return val
+
+    patterns = {
+        "https_latency.py": [("HTTPS Avg (ms)", r"Average Latency:\s*([0-9.]+)\s*ms", 0)],
+        "ntp_test.py": [("NTP RTD (ms)", r"Round Trip Delay:\s*([0-9.]+)\s*ms", 0)],
+        "jitter_test.py": [("Jitter Avg (ms)", r"Avg\s*\(ms\)\s*:\s*([0-9.]+)", 0)],
+        "bufferbloat_like_test.py": [
+            ("Bloat Baseline (ms)", r"===\s*Baseline Summary\s*===.*?Avg\s*\(ms\)\s*:\s*([0-9.]+)", re.S),
+            ("Bloat Load (ms)", r"===\s*Under Load Summary\s*===.*?Avg\s*\(ms\)\s*:\s*([0-9.]+)", re.S),
+        ],
+    }
+    for label, pat, flags in patterns.get(base, []):
+        val = find_last_float(pat, flags)
+        if val is not None:
+            metrics.append((label, val))
+    if base == "dns_resol_latency.py":
+        vals = [float(v) for v in re.findall(r"avg=([0-9.]+) ms", text)]
+        if vals:
+            metrics.append(("DNS Avg (ms)", sum(vals) / len(vals)))
+    elif base == "meeting_test.py":
+        vals = [float(v) for v in re.findall(r"Average Latency:\s*([0-9.]+)\s*ms", text)]
+        if vals:
+            metrics.append(("Meeting Avg (ms)", sum(vals) / len(vals)))
+    return metrics
+
+
+def parse_report(text):
+    """Split a combined .txt report into per-test dicts (test, status, rc, stop, duration, metrics)."""
+    heads = list(BLOCK_RE.finditer(text))
+    out = []
+    for i, m in enumerate(heads):
+        base = m.group(1)
+        body = text[m.end(): heads[i + 1].start() if i + 1 < len(heads) else len(text)]
+        run = {"test": base, "rc": None, "stop": None, "duration_s": None, "metrics": []}
+        rc = re.search(r"Return code:\s*(\S+)", body)
+        run["rc"] = rc.group(1) if rc else None
+        stop = re.search(r"Stop:\s*([^\n|]+)", body)
+        run["stop"] = stop.group(1).strip() if stop else None
+        dur = re.search(r"Duration:\s*([0-9.]+)s", body)
+        run["duration_s"] = float(dur.group(1)) if dur else None
+        stdout = body.split("--- STDOUT ---", 1)[-1].split("--- STDERR ---", 1)[0]
+
+        if re.search(r"^STATUS:\s*SKIPPED", body, re.M):
+            run["status"] = "skipped"
+        elif run["rc"] is None or run["rc"] not in NORMAL_RCS:
+            run["status"] = "error"
+        elif re.search(r"Test Failed|❌", stdout):
+            run["status"] = "failed"
+        else:
+            run["status"] = "ok"
+
+        line = re.search(r"^Metrics:\s*(.+)$", body, re.M)
+        if line:
+            for part in line.group(1).split("  |  "):
+                name, _, val = part.rpartition("=")
+                try:
+                    run["metrics"].append((name.strip(), float(val)))
+                except ValueError:
+                    pass
+        else:
+            run["metrics"] = legacy_metrics(base, stdout)
+        out.append(run)
+    return out
+
+
+# ------------------------------------------------------
+# .jsonl kayıtları (hedef bazlı özetler)
+# ------------------------------------------------------
+def parse_records(fh):
+    """Yield (ts, test, target, metric, value) for every summary metric in a .jsonl file."""
+    for line in fh:
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(rec, dict) or rec.get("type") != "summary":
+            continue
+        target = str(rec.get("target") or "")
+        if rec.get("phase"):
+            target = f"{target}|{rec['phase']}"
+        for name, value in (rec.get("metrics") or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield int(rec.get("ts") or 0), str(rec.get("test") or ""), target, name, float(value)
+
+
+# ------------------------------------------------------
+# Artımlı güncelleme
+# ------------------------------------------------------
+def update_index(results_dir, conn=None):
+    """Reparse new/changed report files only. Returns (indexed, removed) counts."""
+    conn = conn or connect(results_dir)
+    known = {path: (mtime, size) for path, mtime, size in conn.execute("SELECT path, mtime_ns, size FROM files")}
+    seen = set()
+    indexed = 0
+    with conn:
+        for name in sorted(os.listdir(results_dir)):
+            if not REPORT_RE.match(name):
+                continue
+            path = os.path.join(results_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            seen.add(name)
+            if known.get(name) == (st.st_mtime_ns, st.st_size):
+                continue
+            conn.execute("DELETE FROM runs WHERE file=?", (name,))
+            conn.execute("DELETE FROM metrics WHERE file=?", (name,))
+            ts = _batch_epoch(name)
+            with open(path, "r", encoding="utf-8", errors="replace") as fh:
+                if name.endswith(".txt"):
+                    for run in parse_report(fh.read()):
+                        test = os.path.splitext(run["test"])[0]
+                        conn.execute("INSERT INTO runs VALUES (?,?,?,?,?,?,?)",
+                                     (name, ts, test, run["status"], run["rc"], run["stop"], run["duration_s"]))
+                        conn.executemany("INSERT INTO metrics VALUES (?,?,?,?,?,?)",
+                                         [(name, ts, test, "", label, val) for label, val in run["metrics"]])
+                else:
+                    conn.executemany("INSERT INTO metrics VALUES (?,?,?,?,?,?)",
+                                     [(name, rts or ts, test, target, metric, val)
+                                      for rts, test, target, metric, val in parse_records(fh)])
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?)", (name, st.st_mtime_ns, st.st_size))
+            indexed += 1
+        removed = [p for p in known if p not in seen]
+        for name in removed:
+            for table in ("files", "runs", "metrics"):
+                conn.execute(f"DELETE FROM {table} WHERE {'path' if table == 'files' else 'file'}=?", (name,))
+    return indexed, len(removed)
+
+
+def find_runs(conn, test=None, status=None, since=None, until=None):
+    sql = "SELECT ts, file, test, status, rc, stop, duration_s FROM runs WHERE 1=1"
+    args = []
+    if test:
+        sql += " AND test LIKE ?"
+        args.append(f"%{test}%")
+    if status:
+        sql += " AND status=?"
+        args.append(status)
+    if since is not None:
+        sql += " AND ts >= ?"
+        args.append(since)
+    if until is not None:
+        sql += " AND ts < ?"
+        args.append(until)
+    return conn.execute(sql + " ORDER BY ts", args).fetchall()
+
+
+def find_metrics(conn, name, test=None, target=None, gt=None, lt=None, since=None, until=None):
+    sql = "SELECT ts, file, test, target, name, value FROM metrics WHERE name=?"
+    args = [name]
+    for cond, val in (("test LIKE ?", f"%{test}%" if test else None), ("target LIKE ?", f"%{target}%" if target else None),
+                      ("value > ?", gt), ("value < ?", lt), ("ts >= ?", since), ("ts < ?", until)):
+        if val is not None:
+            sql += f" AND {cond}"
+            args.append(val)
+    return conn.execute(sql + " ORDER BY ts", args).fetchall()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_link.py
+- Çıkış (egress) arayüzünü ve bağlantı tipini süreç içinde, bash/ip/iw çalıştırmadan bulur.
+- Varsayılan rota /proc/net/route (IPv4) ve /proc/net/ipv6_route'tan, arayüz bilgisi
+  /sys/class/net/<iface>/ altından okunur (wireless, phy80211, type, speed, operstate).
+- Sonuç önbelleğe alınır; Linux'ta engellemeyen bir netlink soketi (RTMGRP_LINK + rota
+  grupları) rota/link değişikliği gördüğünde önbellek geçersiz olur. Netlink yoksa
+  önbellek CACHE_TTL saniye geçerlidir.
+"""
+
+import os
+import time
+import socket
+import struct
+
+PROC_ROUTE = "/proc/net/route"
+PROC_ROUTE6 = "/proc/net/ipv6_route"
+SYS_NET = "/sys/class/net"
+CACHE_TTL = 30.0   # saniye; netlink olmadığında
+
+RTF_UP = 0x0001
+RTF_REJECT = 0x0200
+ARPHRD_ETHER = 1
+ARPHRD_LOOPBACK = 772
+ARPHRD_NONE = 65534          # tun / wireguard vb.
+
+# linux/rtnetlink.h
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_ROUTE = 0x400
+
+
+def _read(path):
+    try:
+        with open(path, "r") as fh:
+            return fh.read().strip()
+    except (OSError, ValueError):
+        # ör. kablosuz ya da kapalı arayüzde speed okuması EINVAL verir
+        return None
+
+
+def default_route():
+    """Return (iface, gateway, family) of the lowest-metric default route, or (None, None, None).
+
+    IPv4 is preferred; IPv6 is used when there is no IPv4 default route.
+    """
+    best = None
+    try:
+        with open(PROC_ROUTE, "r") as fh:
+            next(fh, None)
+            for line in fh:
+                f = line.split()
+                if len(f) < 8 or f[1] != "00000000" or f[7] != "00000000":
+                    continue
+                flags = int(f[3], 16)
+                if not flags & RTF_UP or flags & RTF_REJECT:
+                    continue
+                metric = int(f[6])
+                if best is None or metric < best[0]:
+                    gw = socket.inet_ntoa(struct.pack("<I", int(f[2], 16)))
+                    best = (metric, f[0], gw, "ipv4")
+    except OSError:
+        pass
+    if best is None:
+        try:
+            with open(PROC_ROUTE6, "r") as fh:
+                for line in fh:
+                    f = line.split()
+                    if len(f) < 10 or f[0] != "0" * 32 or f[1] != "00":
+                        continue
+                    flags = int(f[8], 16)
+                    if not flags & RTF_UP or flags & RTF_REJECT or f[9] == "lo":
+                        continue
+                    metric = int(f[5], 16)
+                    if best is None or metric < best[0]:
+                        gw = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(f[4]))
+                        best = (metric, f[9], gw, "ipv6")
+        except OSError:
+            pass
+    if best is None:
+        return None, None, None
+    return best[1], best[2], best[3]
+
+
+def link_type(iface):
+    """Classify ``iface`` as wifi / ethernet / loopback / virtual / unknown from sysfs."""
+    base = os.path.join(SYS_NET, iface)
+    if not os.path.isdir(base):
+        return "unknown"
+    if os.path.isdir(os.path.join(base, "wireless")) or os.path.exists(os.path.join(base, "phy80211")):
+        return "wifi"
+    try:
+        arphrd = int(_read(os.path.join(base, "type")) or -1)
+    except ValueError:
+        arphrd = -1
+    if arphrd == ARPHRD_LOOPBACK:
+        return "loopback"
+    # Fiziksel aygıtların "device" bağlantısı vardır; veth/bridge/tun/vpn'lerin yoktur
+    if not os.path.exists(os.path.join(base, "device")) or arphrd == ARPHRD_NONE:
+        return "virtual"
+    if arphrd == ARPHRD_ETHER:
+        return "ethernet"
+    return "unknown"
+
+
+def link_info(iface=None):
+    """Describe the egress interface (or ``iface``): iface, type, speed_mbps, operstate, gateway, family."""
+    gateway = family = None
+    if iface is None:
+        iface, gateway, family = default_route()
+    info = {"iface": iface, "type": None, "speed_mbps": None, "operstate": None,
+            "gateway": gateway, "family": family}
+    if not iface:
+        return info
+    info["type"] = link_type(iface)
+    info["operstate"] = _read(os.path.join(SYS_NET, iface, "operstate"))
+    try:
+        speed = int(_read(os.path.join(SYS_NET, iface, "speed")) or -1)
+        info["speed_mbps"] = speed if speed > 0 else None
+    except ValueError:
+        pass
+    return info
+
+
+def describe(info):
+    """One-line text form, e.g. 'eth0 (ethernet, 1000 Mb/s, via 192.0.2.1)'."""
+    if not info.get("iface"):
+        return "no default route"
+    parts = [info.get("type") or "unknown"]
+    if info.get("speed_mbps"):
+        parts.append(f"{info['speed_mbps']} Mb/s")
+    if info.get("gateway"):
+        parts.append(f"via {info['gateway']}")
+    return f"{info['iface']} ({', '.join(parts)})"
+
+
+class LinkDetector:
+    """Cached ``link_info()`` that refreshes only after a route or link change.
+
+    On Linux a non-blocking NETLINK_ROUTE socket subscribed to link and route
+    groups is drained on every ``get()``; any message means the cache is stale.
+    Elsewhere (or if the socket cannot be opened) the cache expires after
+    ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._info = None
+        self._stamp = 0.0
+        self._sock = None
+        if hasattr(socket, "AF_NETLINK"):
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+                sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE))
+                sock.setblocking(False)
+                self._sock = sock
+            except OSError:
+                self._sock = None
+
+    def _changed(self):
+        changed = False
+        while True:
+            try:
+                if not self._sock.recv(65536):
+                    break
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # ENOBUFS: olay kaçırıldı, en güvenlisi yeniden okumak
+                changed = True
+                break
+        return changed
+
+    def get(self):
+        if self._info is not None:
+            if self._sock is not None:
+                if not self._changed():
+                    return self._info
+            elif time.monotonic() - self._stamp < self.ttl:
+                return self._info
+        elif self._sock is not None:
+            self._changed()   # ilk okumadan önceki olaylar önemsiz
+        self._info = link_info()
+        self._stamp = time.monotonic()
+        return self._info
+
+    def invalidate(self):
+        self._info = None
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+if __name__ == "__main__":
+    det = LinkDetector()
+    t0 = time.perf_counter()
+    info = det.get()
+    t1 = time.perf_counter()
+    det.get()
+    t2 = time.perf_counter()
+    print(describe(info))
+    print(info)
+    print(f"first lookup {1e6 * (t1 - t0):.0f} µs, cached {1e6 * (t2 - t1):.0f} µs, "
+          f"netlink={'yes' if det._sock is not None else 'no'}")
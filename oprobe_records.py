@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_records.py
+- Test modüllerinin makine tarafından okunabilir sonuç kanalı (JSON Lines).
+- Orkestratör, OPROBE_RECORD_FD ortam değişkeniyle ek bir pipe fd'si verir;
+  modüller her ölçümü tipli bir kayıt olarak buraya yazar. Değişken yoksa
+  (modül tek başına çalıştırıldığında) kayıtlar sessizce atlanır.
+- Kayıt tipleri:
+    sample     : tek ölçüm      {"metrics": {...}}
+    summary    : özet           {"metrics": {...}}
+    diagnostic : hata/uyarı     {"code": "...", "message": "..."}
+"""
+
+import os
+import json
+import time
+import threading
+
+RECORD_FD_ENV = "OPROBE_RECORD_FD"
+
+
+class RecordStream:
+    """Line-buffered JSONL writer bound to one test module."""
+
+    def __init__(self, test):
+        self.test = test
+        self._fh = None
+        self._pid = None
+        self._lock = threading.RLock()
+
+    def _stream(self):
+        # fork sonrası (warm pool) fd'yi yeniden çöz
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._fh = None
+            fd = os.environ.get(RECORD_FD_ENV)
+            if fd:
+                try:
+                    self._fh = os.fdopen(int(fd), "w", buffering=1, encoding="utf-8", closefd=False)
+                except (OSError, ValueError):
+                    self._fh = None
+        return self._fh
+
+    def emit(self, rtype, target=None, **fields):
+        with self._lock:
+            fh = self._stream()
+            if fh is None:
+                return
+            rec = {"type": rtype, "test": self.test, "ts": round(time.time(), 3)}
+            if target is not None:
+                rec["target"] = str(target)
+            rec.update(fields)
+            try:
+                fh.write(json.dumps(rec, separators=(",", ":"), default=str) + "\n")
+            except (OSError, ValueError):
+                # Okuyan taraf gitti; ölçüm devam etsin
+                self._fh = None
+
+    def sample(self, target, metrics, **extra):
+        self.emit("sample", target, metrics=_clean(metrics), **extra)
+
+    def summary(self, target, metrics, **extra):
+        self.emit("summary", target, metrics=_clean(metrics), **extra)
+
+    def diagnostic(self, target, code, message="", **extra):
+        self.emit("diagnostic", target, code=code, message=message, **extra)
+
+
+def _clean(metrics):
+    """Drop None and NaN values so consumers only see real numbers."""
+    out = {}
+    for k, v in metrics.items():
+        if v is None:
+            continue
+        if isinstance(v, float):
+            if v != v:
+                continue
+            v = round(v, 3)
+        out[k] = v
+    return out
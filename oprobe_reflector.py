@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+oprobe_reflector.py — UDP jitter probu (oprobe_udpjitter) için yansıtıcı.
+
+  python3 oprobe_reflector.py                       # 0.0.0.0:8623
+  python3 oprobe_reflector.py --bind 127.0.0.1      # loopback testi
+  python3 oprobe_reflector.py --bind :: --port 9000
+
+- Sadece probe biçimindeki (MAGIC ile başlayan) paketleri, aynı boyutta ve aynen geri
+  gönderir: yanıt istekten büyük olamaz, yansıtıcı trafik büyütmek için kullanılamaz.
+- Tek iş parçacığı, selectors ile bekler; SIGTERM/SIGINT ile temiz kapanır.
+- Reflector sınıfı aynı yansıtıcıyı bir arka plan iş parçacığında çalıştırır (port 0: rastgele).
+"""
+
+import sys
+import signal
+import socket
+import argparse
+import selectors
+import threading
+
+from oprobe_udpjitter import DEFAULT_PORT, parse_packet
+
+MAX_PACKET = 2048
+
+
+def _bind(bind, port):
+    family = socket.AF_INET6 if ":" in bind else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    if family == socket.AF_INET6:
+        try:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)   # :: üzerinde IPv4 de
+        except (AttributeError, OSError):
+            pass
+    sock.bind((bind, port))
+    sock.setblocking(False)
+    return sock
+
+
+class Reflector:
+    """Echo probe packets on ``bind``:``port`` until ``stop()``."""
+
+    def __init__(self, bind="0.0.0.0", port=DEFAULT_PORT):
+        self.bind = bind
+        self.port = port
+        self.echoed = 0
+        self.dropped = 0
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def open(self):
+        self._sock = _bind(self.bind, self.port)
+        self.port = self._sock.getsockname()[1]
+        return self
+
+    def serve(self):
+        """Run in the calling thread until ``stop()``."""
+        if self._sock is None:
+            self.open()
+        sock = self._sock
+        with selectors.DefaultSelector() as sel:
+            sel.register(sock, selectors.EVENT_READ)
+            while not self._stop.is_set():
+                if not sel.select(0.5):
+                    continue
+                while True:
+                    try:
+                        data, addr = sock.recvfrom(MAX_PACKET)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError:
+                        continue   # ör. önceki bir yanıtın ICMP hatası
+                    if parse_packet(data) is None:
+                        self.dropped += 1
+                        continue
+                    try:
+                        sock.sendto(data, addr)
+                        self.echoed += 1
+                    except OSError:
+                        self.dropped += 1
+        sock.close()
+
+    def start(self):
+        """Serve from a background thread; returns self (``.port`` is the bound port)."""
+        self.open()
+        self._thread = threading.Thread(target=self.serve, name="reflector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="oprobe_reflector", description="UDP echo reflector for the jitter probe")
+    parser.add_argument("--bind", default="0.0.0.0", help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="UDP port (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    refl = Reflector(args.bind, args.port).open()
+    signal.signal(signal.SIGTERM, lambda *_: refl.stop())
+    signal.signal(signal.SIGINT, lambda *_: refl.stop())
+    print(f"Reflecting on {args.bind}:{refl.port}/udp", flush=True)
+    refl.serve()
+    print(f"Stopped: {refl.echoed} echoed, {refl.dropped} dropped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
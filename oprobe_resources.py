@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_resources.py
+- Test başına kaynak muhasebesi: probe'ların paylaşılan makineye maliyetini görünür kılar.
+- CPU (user/sys) ve tepe RSS: çocuk toplanırken wait4() rusage'ından.
+- Okuma/yazma baytları ve syscall sayıları: /proc/<pid>/io; çocuk zombi iken
+  (waitid WNOWAIT) okunur, toplanan alt süreçlerin sayaçları da buna dahildir.
+- Başlatılan alt süreç sayısı: süreç ağacı /proc/<pid>/task/*/children ile örneklenir.
+- Ağ baytları: çıkış arayüzünün /sys/class/net/<iface>/statistics sayaçları
+  (paralel çalışan testler aynı arayüzü paylaşır).
+"""
+
+import os
+import sys
+import threading
+
+SAMPLE_INTERVAL = 0.25   # saniye: alt süreç ağacı örnekleme aralığı
+
+IO_FIELDS = {
+    "rchar": "io_read_bytes",
+    "wchar": "io_write_bytes",
+    "syscr": "syscalls_read",
+    "syscw": "syscalls_write",
+    "read_bytes": "disk_read_bytes",
+    "write_bytes": "disk_write_bytes",
+}
+
+
+def exit_code(status):
+    """Popen-style return code from a wait status (negative signal number if killed)."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return status
+
+
+def rusage_metrics(ru):
+    """CPU seconds and peak RSS (KiB) from a struct_rusage."""
+    maxrss = ru.ru_maxrss
+    if sys.platform == "darwin":
+        maxrss //= 1024   # macOS bayt, Linux KiB döndürür
+    return {"cpu_user_s": ru.ru_utime, "cpu_sys_s": ru.ru_stime, "max_rss_kb": maxrss}
+
+
+def read_proc_io(pid):
+    """/proc/<pid>/io counters under IO_FIELDS names; {} where unavailable."""
+    out = {}
+    try:
+        with open(f"/proc/{pid}/io", "r") as fh:
+            for line in fh:
+                key, _, val = line.partition(":")
+                if key in IO_FIELDS:
+                    out[IO_FIELDS[key]] = int(val)
+    except (OSError, ValueError):
+        pass
+    return out
+
+
+def reap_with_usage(pid):
+    """Wait for child ``pid``, returning (return code, usage dict).
+
+    The I/O counters are read while the child is still a zombie, then it is
+    reaped with wait4() for its rusage. Raises ChildProcessError if someone
+    else already reaped it.
+    """
+    usage = {}
+    try:
+        os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        usage.update(read_proc_io(pid))
+    except (AttributeError, InterruptedError):
+        pass   # waitid yok (ör. bazı BSD'ler): sadece rusage
+    _, status, ru = os.wait4(pid, 0)
+    usage.update(rusage_metrics(ru))
+    return exit_code(status), usage
+
+
+def iface_counters(iface):
+    """(rx_bytes, tx_bytes) of ``iface`` from sysfs, or None."""
+    if not iface:
+        return None
+    base = f"/sys/class/net/{iface}/statistics"
+    try:
+        with open(f"{base}/rx_bytes") as rx, open(f"{base}/tx_bytes") as tx:
+            return int(rx.read()), int(tx.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _children(pid):
+    kids = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return kids
+    for tid in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children", "r") as fh:
+                kids.extend(int(c) for c in fh.read().split())
+        except (OSError, ValueError):
+            pass
+    return kids
+
+
+class ChildSampler:
+    """Count distinct descendants of ``pid`` by walking the /proc tree periodically.
+
+    Children that live shorter than ``interval`` can be missed, so the count
+    is a lower bound. On systems without /proc it stays 0.
+    """
+
+    def __init__(self, pid, interval=SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.seen = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if os.path.isdir(f"/proc/{self.pid}"):
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            stack = [self.pid]
+            while stack:
+                for child in _children(stack.pop()):
+                    self.seen.add(child)
+                    stack.append(child)
+            if self._stop.wait(self.interval):
+                break
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1)
+        return len(self.seen)
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_stats.py
+- Test modüllerinin ortak istatistik yardımcıları.
+- percentile: sıralı listede doğrusal enterpolasyonlu yüzdelik.
+- Welford: sabit bellekte ortalama/varyans.
+- P2Quantile: P² algoritmasıyla (Jain & Chlamtac) örnekleri saklamadan yüzdelik tahmini;
+  ilk EXACT_SAMPLES değerde tam (kısa ölçümlerde P² yayılımı düşük tahmin eder).
+- StreamStats: uzun süreli ölçümler için sabit bellekli özet (ortalama, sapma, min/max,
+  IPDV ve yüzdelikler); özet her an O(1) üretilir.
+- SlidingWindow: son N saniyenin istatistikleri; değerler pencereye girerken ve çıkarken
+  artımlı güncellenir (deque + toplamlar + bisect ile sıralı liste), geçmiş yeniden sıralanmaz.
+- ConvergenceTracker: anahtar metriğin %95 güven aralığı yeterince daraldığında
+  testi erken bitirmek için (adaptive early-stop). Orkestratör ayarları
+  OPROBE_CONVERGE* ortam değişkenleriyle iletir.
+"""
+
+import os
+import math
+import time
+import bisect
+from collections import deque
+
+CONVERGE_ENV = "OPROBE_CONVERGE"
+Z_95 = 1.96
+EXACT_SAMPLES = 200   # P2Quantile: bu kadar değere kadar tam yüzdelik (sıralı tampon)
+
+
+def percentile(data_sorted, p):
+    """Linear-interpolated percentile (0..100) of an already sorted list; None if empty."""
+    if not data_sorted:
+        return None
+    if p <= 0:
+        return data_sorted[0]
+    if p >= 100:
+        return data_sorted[-1]
+    k = (len(data_sorted) - 1) * (p / 100.0)
+    f = math.floor(k)
+    c = math.ceil(k)
+    if f == c:
+        return data_sorted[int(k)]
+    return data_sorted[f] * (c - k) + data_sorted[c] * (k - f)
+
+
+class Welford:
+    """Running count, mean and variance (Welford's algorithm)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self._m2 += d * (x - self.mean)
+
+    def remove(self, x):
+        """Undo an earlier ``add(x)`` (values leaving a sliding window)."""
+        if self.n <= 1:
+            self.n, self.mean, self._m2 = 0, 0.0, 0.0
+            return
+        d = x - self.mean
+        self.n -= 1
+        self.mean -= d / self.n
+        # Kayan nokta artığı sıfırın altına düşürmesin
+        self._m2 = max(0.0, self._m2 - d * (x - self.mean))
+
+    @property
+    def variance(self):
+        """Sample variance (n-1); 0.0 until there are two values."""
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def pvariance(self):
+        return self._m2 / self.n if self.n > 0 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def pstddev(self):
+        return math.sqrt(self.pvariance)
+
+
+class P2Quantile:
+    """Streaming estimate of the ``p``-th percentile (0..100) with the P² algorithm.
+
+    The first ``exact`` values are kept sorted and the percentile is exact
+    (linear-interpolated, like ``percentile``); short runs are where P² is
+    least accurate. After that the buffer seeds the five P² markers and is
+    dropped, so memory stays constant.
+    """
+
+    def __init__(self, p, exact=EXACT_SAMPLES):
+        self.p = p / 100.0
+        self.count = 0
+        self.exact = max(5, int(exact))
+        self._buf = []                  # ilk ``exact`` değer, sıralı
+        self._q = None                  # marker yükseklikleri (tampon bırakılınca)
+        self._n = None                  # gerçek marker konumları (0 tabanlı)
+        self._want = None
+        f = self.p
+        self._step = [0.0, f / 2, f, (1 + f) / 2, 1.0]
+
+    def _seed(self):
+        # Sıralı tampondan markerlar: istenen konumlara en yakın sıra istatistikleri
+        buf, m = self._buf, len(self._buf)
+        self._want = [(m - 1) * s for s in self._step]
+        n = [int(round(w)) for w in self._want]
+        for i in range(1, 5):
+            n[i] = max(n[i], n[i - 1] + 1)
+        n[4] = m - 1
+        for i in (3, 2, 1):
+            n[i] = min(n[i], n[i + 1] - 1)
+        self._n = n
+        self._q = [buf[i] for i in n]
+        self._buf = None
+
+    def add(self, x):
+        self.count += 1
+        if self._buf is not None:
+            bisect.insort(self._buf, x)
+            if self.count > self.exact:
+                self._seed()
+            return
+        q, n = self._q, self._n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._want[i] += self._step[i]
+        for i in (1, 2, 3):
+            d = self._want[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # Parabolik tahmin; marker sırası bozulacaksa doğrusal
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    @property
+    def value(self):
+        """Current estimate, or None before the first value."""
+        if self._buf is not None:
+            return percentile(self._buf, self.p * 100.0)
+        return self._q[2]
+
+
+class StreamStats:
+    """Constant-memory running summary of a series (e.g. RTTs in ms).
+
+    Tracks count, mean, variance, min/max, IPDV (mean absolute difference of
+    consecutive values, RFC 5481 style) and P² estimates of ``quantiles``.
+    ``summary()`` costs the same after ten values or ten million.
+    """
+
+    def __init__(self, quantiles=(5, 95)):
+        self.stats = Welford()
+        self.ipdv = Welford()
+        self.min = None
+        self.max = None
+        self.last = None
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    @property
+    def n(self):
+        return self.stats.n
+
+    def add(self, x):
+        x = float(x)
+        self.stats.add(x)
+        if self.last is not None:
+            self.ipdv.add(abs(x - self.last))
+        self.last = x
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        for sketch in self.quantiles.values():
+            sketch.add(x)
+
+    def quantile(self, p):
+        return self.quantiles[p].value
+
+    def summary(self):
+        """avg_ms, stddev_ms (population), ipdv_ms, min_ms, max_ms and p<q>_ms; {} if empty."""
+        if not self.stats.n:
+            return {}
+        out = {"avg_ms": self.stats.mean, "stddev_ms": self.stats.pstddev,
+               "ipdv_ms": self.ipdv.mean if self.ipdv.n else None, "min_ms": self.min, "max_ms": self.max}
+        for p, sketch in self.quantiles.items():
+            out[f"p{p:g}_ms"] = sketch.value
+        return out
+
+
+class ConvergenceTracker:
+    """Decide when a metric's 95% confidence interval is tight enough to stop.
+
+    Converged once at least ``min_samples`` values and ``min_duration`` seconds
+    are in and the CI half-width is within ``max(abs_tol, rel_tol * |mean|)``.
+    ``expired()`` turns true at ``max_duration`` regardless.
+    """
+
+    def __init__(self, abs_tol=1.0, rel_tol=0.05, min_duration=5.0, max_duration=30.0, min_samples=5):
+        self.abs_tol = float(abs_tol)
+        self.rel_tol = float(rel_tol)
+        self.min_duration = float(min_duration)
+        self.max_duration = float(max_duration)
+        self.min_samples = int(min_samples)
+        self.stats = Welford()
+        self.t0 = time.monotonic()
+
+    def add(self, x):
+        if x is not None:
+            self.stats.add(float(x))
+
+    def elapsed(self):
+        return time.monotonic() - self.t0
+
+    def half_width(self):
+        if self.stats.n < 2:
+            return None
+        return Z_95 * self.stats.stddev / math.sqrt(self.stats.n)
+
+    def tolerance(self):
+        return max(self.abs_tol, self.rel_tol * abs(self.stats.mean))
+
+    def converged(self):
+        hw = self.half_width()
+        if hw is None or self.stats.n < self.min_samples or self.elapsed() < self.min_duration:
+            return False
+        return hw <= self.tolerance()
+
+    def expired(self):
+        return self.elapsed() >= self.max_duration
+
+    def done(self):
+        return self.converged() or self.expired()
+
+    def describe(self, label="mean"):
+        hw = self.half_width()
+        state = "converged" if self.converged() else "not converged"
+        if hw is None:
+            return f"{label}: N/A ({state}, n={self.stats.n}, {self.elapsed():.1f}s)"
+        return (f"{label}: {self.stats.mean:.2f} ± {hw:.2f} ms (95% CI, tol {self.tolerance():.2f} ms, "
+                f"{state}, n={self.stats.n}, {self.elapsed():.1f}s)")
+
+    def metrics(self):
+        return {"ci95_ms": self.half_width(), "converged": int(self.converged()),
+                "conv_samples": self.stats.n, "conv_elapsed_s": self.elapsed()}
+
+
+def convergence_from_env(max_duration=None):
+    """Build a ConvergenceTracker from OPROBE_CONVERGE* variables, or None if disabled.
+
+    ``max_duration`` caps the run when OPROBE_CONVERGE_MAX_S is not set.
+    """
+    if os.environ.get(CONVERGE_ENV, "") not in ("1", "true", "yes"):
+        return None
+
+    def num(name, default):
+        try:
+            return float(os.environ.get(name, default))
+        except ValueError:
+            return float(default)
+
+    return ConvergenceTracker(
+        abs_tol=num("OPROBE_CONVERGE_TOL_MS", 1.0),
+        rel_tol=num("OPROBE_CONVERGE_REL", 0.05),
+        min_duration=num("OPROBE_CONVERGE_MIN_S", 5.0),
+        max_duration=num("OPROBE_CONVERGE_MAX_S", max_duration if max_duration is not None else 30.0),
+        min_samples=int(num("OPROBE_CONVERGE_MIN_SAMPLES", 5)),
+    )
+
+
+class SlidingWindow:
+    """Statistics over the values of the last ``seconds`` (monotonic clock).
+
+    Values are kept in arrival order and in a bisect-sorted list; a Welford
+    accumulator (with removal) and the IPDV sum follow every insert and expiry,
+    so ``summary()`` never re-sorts. Misses
+    (timeouts, lost packets) can be counted too, for a windowed loss ratio.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = float(seconds)
+        self._items = deque()    # (t, x)
+        self._sorted = []
+        self._stats = Welford()  # pencere içi ortalama / varyans (çıkarmalı Welford)
+        self._diffs = deque()    # (t, |x - önceki|)
+        self._dsum = 0.0
+        self._last = None
+        self._misses = deque()   # (t, adet)
+        self._missed = 0
+
+    def _expire(self, now):
+        cutoff = now - self.seconds
+        items = self._items
+        while items and items[0][0] <= cutoff:
+            _, x = items.popleft()
+            self._stats.remove(x)
+            del self._sorted[bisect.bisect_left(self._sorted, x)]
+        while self._diffs and self._diffs[0][0] <= cutoff:
+            self._dsum -= self._diffs.popleft()[1]
+        while self._misses and self._misses[0][0] <= cutoff:
+            self._missed -= self._misses.popleft()[1]
+        if not items:
+            # Kayan nokta birikimini sıfırla
+            self._stats = Welford()
+        if not self._diffs:
+            self._dsum = 0.0
+
+    def add(self, x, now=None):
+        now = time.monotonic() if now is None else now
+        x = float(x)
+        self._expire(now)
+        self._items.append((now, x))
+        bisect.insort(self._sorted, x)
+        self._stats.add(x)
+        if self._last is not None:
+            d = abs(x - self._last)
+            self._diffs.append((now, d))
+            self._dsum += d
+        self._last = x
+
+    def add_missing(self, count=1, now=None):
+        if count <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        self._misses.append((now, count))
+        self._missed += count
+
+    def summary(self, now=None):
+        """n, missed, loss_pct and (if n) avg/stddev/min/p5/p50/p95/max/ipdv in ms for the window."""
+        self._expire(time.monotonic() if now is None else now)
+        n = len(self._sorted)
+        out = {"n": n, "missed": self._missed,
+               "loss_pct": 100.0 * self._missed / (n + self._missed) if n + self._missed else 0.0}
+        if n:
+            mean = self._stats.mean
+            srt = self._sorted
+            out.update(avg_ms=mean, stddev_ms=self._stats.pstddev,
+                       min_ms=srt[0], p5_ms=percentile(srt, 5), p50_ms=percentile(srt, 50),
+                       p95_ms=percentile(srt, 95), max_ms=srt[-1],
+                       ipdv_ms=self._dsum / len(self._diffs) if self._diffs else None)
+        return out
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_targets.py
+- Büyük hedef listeleri: dosyadan yükleme, ajanlar arası paylaştırma ve döner alt kümeler.
+- Hedef dosyası CSV ya da JSON olabilir; her hedefin url, weight, interval ve tags alanı vardır:
+    CSV : url,weight,interval,tags        (başlık satırı zorunlu; tags ';' ile ayrılır, '#' yorum)
+          https://api.example.com/health,2,300,prod;eu
+    JSON: ["https://a.example", {"url": "https://b.example", "weight": 2, "interval": 300,
+                                 "tags": ["prod", "eu"]}]   (ya da {"targets": [...]})
+  interval: hedefin ölçülme periyodu (saniye); weight bu periyodu böler (weight 2 = iki kat sık).
+- shard(): tutarlı hash halkası (ajan başına VNODES sanal düğüm). Her hedef tek bir ajana düşer;
+  ajan eklenip çıkınca sadece ~1/N hedef el değiştirir.
+- RotatingSchedule: round_seconds, çağıranın gerçek tur aralığıdır (ör. daemon'da testin
+  interval'i). Periyodu k tur olan hedef k turdan birinde ölçülür; fazlar hedefler arasında
+  eşit dağıtıldığından tur başına probe sayısı liste büyüdükçe sabit kalır (≈ Σ tur/periyot).
+  Tur numarası bir sayaçtır (duvar saati değil): state_path verilirse dosyada saklanır, her
+  turda bir süreç başlatılıp öldürülse de (orkestratör) döngü kaldığı yerden sürer ve her hedef
+  kendi periyodu içinde en az bir kez ölçülür. Dosya yoksa sayaç duvar saatinden başlar.
+"""
+
+import os
+import csv
+import json
+import tempfile
+import time
+import bisect
+import hashlib
+
+DEFAULT_INTERVAL = 60.0   # saniye; dosyada interval yoksa
+VNODES = 160              # ajan başına halka noktası
+
+
+def _hash(text):
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _tags(value):
+    if value is None or value == "":
+        return ()
+    if isinstance(value, str):
+        return tuple(t.strip() for t in value.split(";") if t.strip())
+    return tuple(str(t) for t in value)
+
+
+def make_target(url, weight=None, interval=None, tags=None, default_interval=DEFAULT_INTERVAL):
+    """Validated target dict: url, weight, interval (seconds), tags (tuple)."""
+    url = str(url or "").strip()
+    if not url:
+        raise ValueError("missing url")
+    weight = float(weight) if weight not in (None, "") else 1.0
+    interval = float(interval) if interval not in (None, "") else float(default_interval)
+    if weight <= 0 or interval <= 0:
+        raise ValueError(f"{url}: weight and interval must be positive")
+    return {"url": url, "weight": weight, "interval": interval, "tags": _tags(tags)}
+
+
+def _load_csv(fh, default_interval):
+    rows = (line for line in fh if line.strip() and not line.lstrip().startswith("#"))
+    reader = csv.DictReader(rows, skipinitialspace=True)
+    if not reader.fieldnames or "url" not in [f.strip().lower() for f in reader.fieldnames]:
+        raise ValueError("CSV target file needs a header row with a 'url' column")
+    out = []
+    for n, row in enumerate(reader, 2):
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items() if k}
+        try:
+            out.append(make_target(row.get("url"), row.get("weight"), row.get("interval"),
+                                   row.get("tags"), default_interval))
+        except ValueError as e:
+            raise ValueError(f"row {n}: {e}") from None
+    return out
+
+
+def _load_json(fh, default_interval):
+    data = json.load(fh)
+    if isinstance(data, dict):
+        data = data.get("targets", [])
+    if not isinstance(data, list):
+        raise ValueError("JSON target file must be a list or an object with a 'targets' list")
+    out = []
+    for n, item in enumerate(data):
+        try:
+            if isinstance(item, str):
+                out.append(make_target(item, default_interval=default_interval))
+            elif isinstance(item, dict):
+                out.append(make_target(item.get("url"), item.get("weight"), item.get("interval"),
+                                       item.get("tags"), default_interval))
+            else:
+                raise ValueError(f"unexpected entry {item!r}")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"entry {n}: {e}") from None
+    return out
+
+
+def load_targets(path, default_interval=DEFAULT_INTERVAL):
+    """Load targets from a .json or CSV file; duplicate URLs keep their first entry.
+
+    Raises ValueError (with the offending row) on malformed input.
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        if os.path.splitext(path)[1].lower() == ".json":
+            targets = _load_json(fh, default_interval)
+        else:
+            targets = _load_csv(fh, default_interval)
+    seen, out = set(), []
+    for t in targets:
+        if t["url"] not in seen:
+            seen.add(t["url"])
+            out.append(t)
+    return out
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to agents."""
+
+    def __init__(self, agents, vnodes=VNODES):
+        agents = sorted(set(a for a in agents if a))
+        if not agents:
+            raise ValueError("hash ring needs at least one agent")
+        points = sorted((_hash(f"{agent}#{i}"), agent) for agent in agents for i in range(vnodes))
+        self._keys = [p[0] for p in points]
+        self._agents = [p[1] for p in points]
+
+    def owner(self, key):
+        i = bisect.bisect(self._keys, _hash(key))
+        return self._agents[i % len(self._agents)]
+
+
+def shard(targets, agent, agents, vnodes=VNODES):
+    """The targets ``agent`` owns among ``agents``; everything if ``agents`` is empty."""
+    agents = [a for a in (agents or ()) if a]
+    if not agents:
+        return list(targets)
+    if agent not in agents:
+        raise ValueError(f"agent {agent!r} is not in the shard list ({', '.join(agents)})")
+    ring = HashRing(agents, vnodes)
+    return [t for t in targets if ring.owner(t["url"]) == agent]
+
+
+class RotatingSchedule:
+    """Spread targets over rounds so every round probes about the same number.
+
+    ``round_seconds`` is how often the caller really runs a round. A target
+    whose effective period (interval / weight) spans ``k`` rounds is due in
+    exactly one of every ``k`` consecutive rounds. Phases are handed out in
+    hash order (grouped by period) with one cursor across all targets, so
+    each round gets an equal share and adding a target moves few others.
+    ``due()`` advances a round counter, kept in ``state_path`` when given so
+    that a process started afresh for every round still walks the cycle.
+    """
+
+    def __init__(self, targets, round_seconds, state_path=None):
+        self.round_seconds = float(round_seconds)
+        self.state_path = state_path
+        self._round = None
+        self._entries = []   # (period in rounds, phase, target)
+        periods = [(max(1, int(round(t["interval"] / t["weight"] / self.round_seconds))), _hash(t["url"]), t)
+                   for t in targets]
+        # Aynı periyottakiler art arda: her grup kendi içinde ±1 dengeli, artanlar dilimlere kayarak dağılır
+        for cursor, (k, _, t) in enumerate(sorted(periods, key=lambda p: p[:2])):
+            self._entries.append((k, cursor % k, t))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def round_index(self, now=None):
+        return int((time.time() if now is None else now) // self.round_seconds)
+
+    def _load_round(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as fh:
+                value = json.load(fh).get("round")
+            return value if isinstance(value, int) and value >= 0 else None
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _save_round(self, value):
+        # Atomik yaz: yarıda öldürülen süreç sayacı bozmasın
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=".rotation-", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"round": value, "round_seconds": self.round_seconds, "targets": len(self)}, fh)
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass   # sayaç yazılamazsa bu süreç içinde yine ilerler
+
+    def next_round(self):
+        """Take the next round number (persisted in ``state_path`` if set)."""
+        if self._round is None:
+            stored = self._load_round() if self.state_path else None
+            self._round = stored if stored is not None else self.round_index()
+        r = self._round
+        self._round += 1
+        if self.state_path:
+            self._save_round(self._round)
+        return r
+
+    def due_in(self, r):
+        """Targets to probe in round number ``r``."""
+        return [t for k, phase, t in self._entries if r % k == phase]
+
+    def due(self):
+        """Targets to probe in the next round (advances the round counter)."""
+        return self.due_in(self.next_round())
+
+    def expected_per_round(self):
+        """Average number of probes per round."""
+        return sum(1.0 / k for k, _, _ in self._entries)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("usage: oprobe_targets.py FILE [ROUND_SECONDS] [AGENT AGENTS,...]")
+        sys.exit(2)
+    tl = load_targets(sys.argv[1])
+    rs = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_INTERVAL
+    if len(sys.argv) > 4:
+        tl = shard(tl, sys.argv[3], sys.argv[4].split(","))
+    sched = RotatingSchedule(tl, rs)
+    start = sched.round_index()
+    counts = [len(sched.due_in(start + i)) for i in range(10)]
+    print(f"{len(tl)} targets, ~{sched.expected_per_round():.1f} per {rs:.0f}s round; next rounds: {counts}")
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+oprobe_tsdb.py
+- Tüm modüllerin sample/summary metrikleri ve test başına kaynak kullanımı için ekleme-odaklı yerel zaman serisi deposu
+  (SQLite, WAL modu). Anahtar: test, target, agent, metric. Kayıttaki etiket alanları
+  (oprobe_exporter.LABEL_FIELDS: phase, mode, scope, transport) hedefe "|alan=değer" olarak
+  eklenir; ör. DNS hit ve miss örnekleri "8.8.8.8|mode=hit|scope=dist" gibi ayrı serilerdir.
+- Arka planda 1 dakika / 1 saat / 1 gün özetleri (count, min, avg, max, p50, p95, p99)
+  üretilir; süresi dolan ham veri, özetleri çıkarıldıktan sonra silinir (downsampling).
+- Sorgular uygun çözünürlüğü kendisi seçer: "son 30 günün resolver başına DNS p95'i"
+  saatlik özet tablosundan indeksle okunur.
+
+Kullanım:
+  python3 oprobe_tsdb.py query --test dns_resol_latency --metric latency_ms --days 30 --stat p95
+  python3 oprobe_tsdb.py query --test dns_resol_latency --metric p95_ms --label mode=miss --label scope=dist
+  python3 oprobe_tsdb.py rollup
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+from oprobe_stats import percentile
+from oprobe_exporter import LABEL_FIELDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(BASE_DIR, "results", "oprobe_tsdb.sqlite")
+
+RESOLUTIONS = (60, 3600, 86400)          # 1 dk, 1 saat, 1 gün
+RAW_RETENTION_S = 7 * 86400              # ham örnekler
+RETENTION_S = {60: 30 * 86400, 3600: 400 * 86400, 86400: None}   # None: sınırsız
+ROLLUP_LAG_S = 30                        # geç gelen kayıtlar için bekleme payı
+RECORD_TYPES = ("sample", "summary", "resource")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    ts REAL NOT NULL,
+    test TEXT NOT NULL,
+    target TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS points_key ON points(test, metric, target, ts);
+CREATE INDEX IF NOT EXISTS points_ts ON points(ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    res INTEGER NOT NULL,
+    test TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    target TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    vmin REAL, vavg REAL, vmax REAL, p50 REAL, p95 REAL, p99 REAL,
+    PRIMARY KEY (res, test, metric, target, agent, kind, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_bucket ON rollups(res, bucket);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL);
+"""
+
+
+def connect(path=DEFAULT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def series_target(rec):
+    """Target plus the record's label fields, so e.g. hit and miss samples never share a series."""
+    target = str(rec.get("target") or "")
+    for k in LABEL_FIELDS:
+        if rec.get(k) is not None:
+            target += f"|{k}={rec[k]}"
+    return target
+
+
+def record_points(rec, agent=None):
+    """Flatten one structured record into (ts, test, target, agent, metric, kind, value) rows."""
+    rtype = rec.get("type")
+    if rtype not in RECORD_TYPES:
+        return []
+    metrics = rec.get("metrics") or {}
+    ts = float(rec.get("ts") or time.time())
+    test = str(rec.get("test") or "")
+    # aynı hedefte farklı faz / mod / kapsam / taşıma (ör. DNS hit/miss, pencere/özet) ayrı seriler olsun
+    target = series_target(rec)
+    agent = str(rec.get("agent") or agent or "")
+    rows = []
+    for name, value in metrics.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        rows.append((ts, test, target, agent, str(name), rtype, float(value)))
+    return rows
+
+
+class TimeSeriesStore:
+    """Buffered writer + background rollups over one SQLite file.
+
+    ``add_record()`` is cheap and thread-safe; rows are committed in batches by
+    the background thread (or an explicit ``flush()``), which also runs rollups
+    and retention every ``rollup_interval`` seconds.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, agent=None):
+        self.path = path
+        self.agent = agent
+        self._lock = threading.Lock()
+        self._rows = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+        return self._conn
+
+    def add_record(self, rec):
+        rows = record_points(rec, self.agent)
+        if rows:
+            with self._lock:
+                self._rows.extend(rows)
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        with self._conn_lock:
+            conn = self._db()
+            with conn:
+                conn.executemany("INSERT INTO points VALUES (?,?,?,?,?,?,?)", rows)
+        return len(rows)
+
+    def maintain(self, now=None):
+        with self._conn_lock:
+            conn = self._db()
+            rollup(conn, now)
+            apply_retention(conn, now)
+
+    def start_background(self, flush_interval=1.0, rollup_interval=60.0):
+        def loop():
+            next_rollup = time.monotonic()
+            while not self._stop.wait(flush_interval):
+                try:
+                    self.flush()
+                    if time.monotonic() >= next_rollup:
+                        self.maintain()
+                        next_rollup = time.monotonic() + rollup_interval
+                except sqlite3.Error as e:
+                    sys.stderr.write(f"[tsdb] {e}\n")
+            self.flush()
+
+        self._thread = threading.Thread(target=loop, name="tsdb", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        else:
+            self.flush()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# ------------------------------------------------------
+# Rollup / retention
+# ------------------------------------------------------
+def _watermark(conn, res):
+    row = conn.execute("SELECT value FROM meta WHERE key=?", (f"rollup_{res}",)).fetchone()
+    if row:
+        return int(row[0])
+    first = conn.execute("SELECT MIN(ts) FROM points").fetchone()[0]
+    return int(first // res * res) if first is not None else None
+
+
+def rollup(conn, now=None):
+    """Aggregate every completed bucket since the last watermark, per resolution."""
+    now = time.time() if now is None else now
+    done = 0
+    for res in RESOLUTIONS:
+        start = _watermark(conn, res)
+        if start is None:
+            continue
+        end = int((now - ROLLUP_LAG_S) // res * res)
+        if end <= start:
+            continue
+        # Tüm geçmişi tek seferde belleğe almamak için pencere pencere ilerle
+        step = max(res, 3600)
+        with conn:
+            for w0 in range(start, end, step):
+                w1 = min(w0 + step, end)
+                cur = conn.execute(
+                    "SELECT test, metric, target, agent, kind, CAST(ts / ? AS INTEGER) * ?, value "
+                    "FROM points WHERE ts >= ? AND ts < ?",
+                    (res, res, w0, w1))
+                groups = {}
+                for test, metric, target, agent, kind, bucket, value in cur:
+                    groups.setdefault((test, metric, target, agent, kind, bucket), []).append(value)
+                rows = []
+                for (test, metric, target, agent, kind, bucket), vals in groups.items():
+                    vals.sort()
+                    rows.append((res, test, metric, target, agent, kind, bucket, len(vals),
+                                 vals[0], sum(vals) / len(vals), vals[-1],
+                                 percentile(vals, 50), percentile(vals, 95), percentile(vals, 99)))
+                conn.executemany("INSERT OR REPLACE INTO rollups VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+                done += len(rows)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES (?,?)", (f"rollup_{res}", end))
+    return done
+
+
+def apply_retention(conn, now=None):
+    """Drop raw points only once every resolution has rolled them up, and expire old rollups."""
+    now = time.time() if now is None else now
+    marks = [_watermark(conn, res) for res in RESOLUTIONS]
+    with conn:
+        if all(m is not None for m in marks):
+            cutoff = min([now - RAW_RETENTION_S] + marks)
+            conn.execute("DELETE FROM points WHERE ts < ?", (cutoff,))
+        for res, keep in RETENTION_S.items():
+            if keep:
+                conn.execute("DELETE FROM rollups WHERE res=? AND bucket < ?", (res, now - keep))
+
+
+# ------------------------------------------------------
+# Sorgu
+# ------------------------------------------------------
+def pick_resolution(span_s):
+    if span_s > 60 * 86400:
+        return 86400
+    if span_s > 2 * 86400:
+        return 3600
+    return 60
+
+
+def _like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def query(conn, test, metric, since, until=None, target=None, agent=None, res=None, kind=None, labels=None):
+    """Rolled-up series as dicts: bucket, target, agent, kind, count, min/avg/max, p50/p95/p99.
+
+    ``target`` matches the full series target; ``labels`` ({"mode": "miss"}) keeps
+    only series carrying every given label.
+    """
+    until = time.time() if until is None else until
+    res = res or pick_resolution(until - since)
+    sql = ("SELECT bucket, target, agent, kind, count, vmin, vavg, vmax, p50, p95, p99 FROM rollups "
+           "WHERE res=? AND test=? AND metric=? AND bucket >= ? AND bucket < ?")
+    args = [res, test, metric, int(since // res * res), until]
+    for col, val in (("target", target), ("agent", agent), ("kind", kind)):
+        if val is not None:
+            sql += f" AND {col}=?"
+            args.append(val)
+    for k, v in (labels or {}).items():
+        pat = _like(f"|{k}={v}")
+        sql += " AND (target LIKE ? ESCAPE '\\' OR target LIKE ? ESCAPE '\\')"
+        args.extend((f"%{pat}", f"%{pat}|%"))
+    sql += " ORDER BY target, agent, bucket"
+    cols = ("bucket", "target", "agent", "kind", "count", "min", "avg", "max", "p50", "p95", "p99")
+    return [dict(zip(cols, row)) for row in conn.execute(sql, args)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oprobe local time-series store")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    q = sub.add_parser("query", help="print a rolled-up series per target")
+    q.add_argument("--test", required=True)
+    q.add_argument("--metric", required=True)
+    q.add_argument("--days", type=float, default=1.0)
+    q.add_argument("--target")
+    q.add_argument("--agent")
+    q.add_argument("--kind", choices=RECORD_TYPES)
+    q.add_argument("--label", action="append", default=[], metavar="FIELD=VALUE",
+                   help=f"only series with this label ({', '.join(LABEL_FIELDS)}); repeatable")
+    q.add_argument("--res", type=int, choices=RESOLUTIONS)
+    q.add_argument("--stat", default="p95", choices=("count", "min", "avg", "max", "p50", "p95", "p99"))
+    sub.add_parser("rollup", help="run rollups and retention now")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.cmd == "rollup":
+        n = rollup(conn)
+        apply_retention(conn)
+        print(f"rolled up {n} buckets")
+        return
+
+    labels = {}
+    for item in args.label:
+        k, sep, v = item.partition("=")
+        if not sep or k not in LABEL_FIELDS:
+            parser.error(f"--label wants FIELD=VALUE with FIELD in {', '.join(LABEL_FIELDS)}, got {item!r}")
+        labels[k] = v
+
+    t0 = time.perf_counter()
+    rows = query(conn, args.test, args.metric, time.time() - args.days * 86400, target=args.target,
+                 agent=args.agent, res=args.res, kind=args.kind, labels=labels)
+    dt_ms = (time.perf_counter() - t0) * 1000.0
+    last = None
+    for row in rows:
+        key = (row["target"], row["agent"], row["kind"])
+        if key != last:
+            print(f"\n# {args.test} {args.metric} target={row['target'] or '-'} agent={row['agent'] or '-'} ({row['kind']})")
+            last = key
+        ts = datetime.fromtimestamp(row["bucket"]).strftime("%Y-%m-%d %H:%M")
+        print(f"{ts}  {args.stat}={row[args.stat]:.2f}  (n={row['count']})")
+    print(f"\n{len(rows)} buckets in {dt_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+oprobe_udpjitter.py
+- UDP jitter probu: sıra numaralı, zaman damgalı paketler sabit hızda (20-100 pps)
+  oprobe_reflector'a gönderilir, yansıyan paketlerden gidiş-dönüş ölçülür.
+- Gönderim zamanları mutlak bir takvimden gelir (t0 + i / pps, monotonic saat);
+  bekleme selectors ile yapılır, yanıtlar beklerken de okunur.
+- Alış zaman damgası çekirdekten gelir (SO_TIMESTAMPNS, CLOCK_REALTIME). Gönderim damgası
+  da aynı saatten (time.time_ns) alınır; çekirdek damgası yoksa alış anında kullanıcı
+  alanında okunur.
+- Metrikler: RFC 3550 interarrival jitter (J += (|D| - J) / 16, D = ardışık transit farkı),
+  IPDV (ardışık RTT farklarının ortalaması), kayıp, sıra dışı gelen ve çift paketler.
+  RTT istatistikleri oprobe_stats.StreamStats ile sabit bellekte tutulur.
+- Paket biçimi (ağ bayt sırası): MAGIC(4) | oturum(4) | sıra(4) | gönderim ns(8) | dolgu
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import selectors
+from collections import deque
+
+from oprobe_stats import StreamStats
+
+MAGIC = b"OPRJ"
+HEADER = struct.Struct("!4sIIQ")
+DEFAULT_PORT = 8623
+DEFAULT_RATE = 50          # paket/saniye
+DEFAULT_SIZE = 172         # bayt (G.711 20 ms yükü + RTP başlığı kadar)
+MIN_RATE, MAX_RATE = 1, 1000
+DUP_WINDOW = 4096          # çift/sıra dışı tespiti için hatırlanan son sıra numarası sayısı
+REORDER_HORIZON = 64       # en yeni yanıtın bu kadar gerisinde kalıp gelmeyen paket kayıp sayılır
+DRAIN_S = 1.0              # gönderim bitince geç paketler için en fazla bekleme (saniye)
+
+# Python her sürümde sabiti vermiyor; Linux'ta (x86/arm) değeri 35'tir
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35 if sys.platform.startswith("linux") else None)
+_TS = {16: struct.Struct("@qq"), 8: struct.Struct("@ii")}   # struct timespec (64 / 32 bit)
+
+
+def build_packet(session, seq, size, tx_ns=None):
+    """Probe packet padded to ``size`` bytes; ``tx_ns`` defaults to now (CLOCK_REALTIME)."""
+    head = HEADER.pack(MAGIC, session, seq, time.time_ns() if tx_ns is None else tx_ns)
+    return head + bytes(max(0, size - HEADER.size))
+
+
+def parse_packet(data):
+    """(session, seq, tx_ns) of a probe packet, or None if ``data`` is not one."""
+    if len(data) < HEADER.size:
+        return None
+    magic, session, seq, tx_ns = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    return session, seq, tx_ns
+
+
+class UdpJitterProbe:
+    """Send a paced packet stream to a reflector and measure what comes back.
+
+    ``run()`` sends at ``rate`` packets per second until ``duration`` elapses
+    or ``stop()`` returns true, then waits briefly for late echoes.
+    ``summary()`` may be called at any time. RTTs are also added to ``window``
+    (an oprobe_stats.SlidingWindow) when one is given, except for packets that
+    come back after ``missing()`` already counted them (``REORDER_HORIZON``).
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, rate=DEFAULT_RATE, size=DEFAULT_SIZE, window=None):
+        if not MIN_RATE <= rate <= MAX_RATE:
+            raise ValueError(f"rate must be between {MIN_RATE} and {MAX_RATE} packets/s")
+        self.host = host
+        self.port = port
+        self.rate = float(rate)
+        self.size = max(int(size), HEADER.size)
+        self.session = int.from_bytes(os.urandom(4), "big")
+        self.kernel_ts = False
+        self.sent = 0
+        self.received = 0          # benzersiz
+        self.duplicates = 0
+        self.reordered = 0
+        self.late = 0              # DUP_WINDOW'dan eski, değerlendirilemeyen
+        self.jitter_ms = 0.0       # RFC 3550
+        self.rtt = StreamStats(quantiles=(5, 50, 95))
+        self.window = window
+        self._max_seq = -1
+        self._settled = 0          # bundan küçük sıra numaraları kesinleşti (geldi ya da kayıp)
+        self._pending = set()      # gelmiş ama henüz kesinleşmemiş sıra numaraları
+        self._missed = 0
+        self._seen = set()
+        self._seen_order = deque()
+        self._last_transit = None
+        self._sock = None
+
+    def _open(self):
+        info = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_DGRAM)[0]
+        sock = socket.socket(info[0], socket.SOCK_DGRAM)
+        if SO_TIMESTAMPNS is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+                self.kernel_ts = True
+            except OSError:
+                self.kernel_ts = False
+        sock.connect(info[4])
+        sock.setblocking(False)
+        self._sock = sock
+        return sock
+
+    def _on_packet(self, data, rx_ns):
+        parsed = parse_packet(data)
+        if parsed is None or parsed[0] != self.session:
+            return
+        _, seq, tx_ns = parsed
+        if seq in self._seen:
+            self.duplicates += 1
+            return
+        if seq <= self._max_seq - DUP_WINDOW:
+            self.late += 1
+            return
+        self._seen.add(seq)
+        self._seen_order.append(seq)
+        while len(self._seen_order) > DUP_WINDOW:
+            self._seen.discard(self._seen_order.popleft())
+        if seq < self._max_seq:
+            self.reordered += 1
+        else:
+            self._max_seq = seq
+        counted_missing = seq < self._settled
+        if not counted_missing:
+            self._pending.add(seq)
+        while self._settled <= self._max_seq - REORDER_HORIZON:
+            if self._settled in self._pending:
+                self._pending.discard(self._settled)
+            else:
+                self._missed += 1
+            self._settled += 1
+        self.received += 1
+        transit_ms = (rx_ns - tx_ns) / 1e6
+        self.rtt.add(transit_ms)
+        if self.window is not None and not counted_missing:
+            # Pencere bu paketi zaten kayıp saydı: RTT'si de eklenirse iki kez sayılır
+            self.window.add(transit_ms)
+        if self._last_transit is not None:
+            self.jitter_ms += (abs(transit_ms - self._last_transit) - self.jitter_ms) / 16.0
+        self._last_transit = transit_ms
+
+    def _drain(self):
+        sock = self._sock
+        while True:
+            try:
+                if self.kernel_ts:
+                    data, anc, _, _ = sock.recvmsg(self.size + 64, socket.CMSG_SPACE(16))
+                    rx_ns = None
+                    for level, ctype, cdata in anc:
+                        if level == socket.SOL_SOCKET and ctype == SO_TIMESTAMPNS and len(cdata) in _TS:
+                            sec, nsec = _TS[len(cdata)].unpack(cdata)
+                            rx_ns = sec * 1_000_000_000 + nsec
+                    if rx_ns is None:
+                        rx_ns = time.time_ns()
+                else:
+                    data = sock.recv(self.size + 64)
+                    rx_ns = time.time_ns()
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionRefusedError:
+                continue   # ICMP port unreachable: reflektör yok, paket kayıp sayılır
+            self._on_packet(data, rx_ns)
+
+    def run(self, duration=None, stop=None, on_tick=None, tick=1.0):
+        """Send until ``duration`` seconds pass or ``stop()`` is true; ``on_tick(self)`` every ``tick`` s."""
+        sock = self._sock or self._open()
+        sel = selectors.DefaultSelector()
+        sel.register(sock, selectors.EVENT_READ)
+        period = 1.0 / self.rate
+        t0 = time.monotonic()
+        end = t0 + duration if duration is not None else None
+        next_send = t0
+        next_tick = t0 + tick
+        drain_until = None
+        try:
+            while True:
+                now = time.monotonic()
+                if drain_until is None:
+                    if (end is not None and now >= end) or (stop is not None and stop()):
+                        # Gönderim bitti: geç gelenler için en fazla DRAIN_S (ya da birkaç RTT) bekle
+                        rtt_max = (self.rtt.max or 0.0) / 1000.0
+                        drain_until = now + min(DRAIN_S, max(0.2, 3 * rtt_max))
+                    elif now >= next_send:
+                        try:
+                            sock.send(build_packet(self.session, self.sent, self.size))
+                        except (BlockingIOError, ConnectionRefusedError):
+                            pass   # gönderilemedi: kayıp sayılır
+                        self.sent += 1
+                        next_send = t0 + self.sent * period
+                        if next_send < now - period:
+                            # Süreç duraklamış (ör. SIGSTOP): patlama yapmadan takvimi yeniden kur
+                            t0 = now - self.sent * period
+                            next_send = now + period
+                        continue
+                elif now >= drain_until:
+                    break
+                if on_tick is not None and now >= next_tick:
+                    on_tick(self)
+                    next_tick += tick
+                wake = drain_until if drain_until is not None else next_send
+                if on_tick is not None:
+                    wake = min(wake, next_tick)
+                if sel.select(max(0.0, wake - time.monotonic())):
+                    self._drain()
+        finally:
+            sel.close()
+        return self.summary()
+
+    def missing(self):
+        """Packets ``REORDER_HORIZON`` or more behind the newest echo that never came back.
+
+        Only grows: a sequence number is judged once, so reordered packets inside
+        the horizon are never counted and a later arrival never has to be undone.
+        """
+        return self._missed
+
+    def summary(self):
+        """Counters, RFC 3550 jitter and RTT statistics so far (O(1))."""
+        lost = max(0, self.sent - self.received)
+        out = {"sent": self.sent, "received": self.received, "lost": lost,
+               "loss_pct": 100.0 * lost / self.sent if self.sent else 0.0,
+               "duplicates": self.duplicates, "reordered": self.reordered, "late": self.late,
+               "jitter_ms": self.jitter_ms if self.received > 1 else None,
+               "rate_pps": self.rate, "kernel_ts": int(self.kernel_ts)}
+        out.update(self.rtt.summary())
+        return out
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
@@ -3,27 +3,109 @@
 
 import os
 import re
+import sys
+import json
+import math
 import time
+import random
 import signal
+import hashlib
+import argparse
+import resource
+import socket
 import subprocess
 import shutil
+import threading
+import codecs
+import selectors
+import traceback
+from collections import deque
 from datetime import datetime
 
+from oprobe_forkserver import WarmPool
+from oprobe_link import LinkDetector, describe as describe_link
+from oprobe_records import RECORD_FD_ENV
+from oprobe_resources import ChildSampler, iface_counters, reap_with_usage, rusage_metrics
+from oprobe_tsdb import TimeSeriesStore
+from oprobe_exporter import MetricsExporter
+
 # === AYARLAR ===
 RUN_DURATION = 30  # saniye: her test modülünü kaç saniye çalıştıracağımız
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
+AGENT_ID = os.environ.get("OPROBE_AGENT_ID") or socket.gethostname()
+
+MAX_PARALLEL = 5  # aynı anda en fazla kaç test modülü çalışabilir
+USE_WARM_POOL = False  # True: modüller bir kez yüklenir, testler ısınmış fork-server işçilerinde koşar
+
+# Yerel zaman serisi deposu (SQLite/WAL): her kayıt ayrıca buraya yazılır, özetler arka planda çıkarılır
+TSDB_ENABLED = True
+TSDB_PATH = os.path.join(RESULTS_DIR, "oprobe_tsdb.sqlite")
+
+# OpenMetrics/Prometheus uç noktası: http://METRICS_BIND:METRICS_PORT/metrics (None: kapalı).
+# Scrape bellekteki son değerleri döner, ölçüm tetiklemez.
+METRICS_PORT = None
+METRICS_BIND = "127.0.0.1"
+
+# Adaptive early-stop: destekleyen testler anahtar metriğin %95 güven aralığı
+# max(CONVERGE_TOL_MS, CONVERGE_REL * ortalama) altına inince kendiliğinden biter.
+# Erken bitenlerin artan süresi sonraki convergence testlerine (en fazla CONVERGE_MAX_BONUS) aktarılır.
+CONVERGENCE_MODE = False
+CONVERGE_TOL_MS = 1.0
+CONVERGE_REL = 0.05
+CONVERGE_MIN_S = 5
+CONVERGE_MAX_BONUS = 30
 
-TESTS = [
-    "dns_resol_latency.py",
-    "https_latency.py",
-    "ntp_test.py",
-    "jitter_test.py",
-    "bufferbloat_like_test.py",
-    "meeting_test.py",
-    "wificheck.py",
+# Çıktı yakalama: bellek sınırlı (ilk N satır + son M satırlık halka), satırlar canlı aktarılır
+CAPTURE_HEAD_LINES = 200
+CAPTURE_TAIL_LINES = 2000
+CAPTURE_MAX_LINE = 4096        # karakter; daha uzun satırlar bölünür
+LIVE_CONSOLE = True            # satırları test çalışırken konsola "[test] ..." olarak bas
+LIVE_OUTPUT_RECORDS = True     # satırları .jsonl dosyasına "output" kaydı olarak ekle
+
+# Periyodik çalıştırma: tüm testler tek tur halinde, sabit bir ızgarada (kayma yok)
+INTERVAL_SECONDS = 10 * 60  # 10 dakika
+
+# Daemon modu (--daemon): her test kendi "interval" periyodunda, mutlak zaman dilimlerine hizalı koşar.
+DAEMON_JITTER = 0.05          # her çalıştırmaya periyodun en fazla bu oranı kadar rastgele gecikme
+DAEMON_SPLAY = True           # agent başına sabit faz kayması: filodaki probe'lar aynı anda ateşlemez
+DAEMON_FILE_PERIOD = 3600     # saniye: daemon sonuçları bu aralıkla yeni dosya çiftine geçer
+STATE_FILE = os.path.join(RESULTS_DIR, ".scheduler_state.json")   # yeniden başlatmada takvim buradan sürer
+
+# Her test: exclusive=True ise tek başına çalışır (ör. hattı doyuran bufferbloat).
+# resources: aynı kaynağı isteyen iki test aynı anda çalışmaz.
+# done_marker: stdout'ta bu regex görülünce test bitmiş sayılır ve slot hemen boşalır.
+# stop_signal: deadline'da gönderilecek sinyal (meeting_test özetini SIGINT ile basar).
+# entry: warm pool modunda fork edilen işçide çağrılacak fonksiyon.
+# converges: CONVERGENCE_MODE'da test kendi güven aralığına göre biter (done_marker kullanılmaz).
+# interval: daemon modunda çalıştırma periyodu (saniye).
+TEST_SPECS = [
+    {"script": "dns_resol_latency.py",     "entry": "main",         "exclusive": False, "resources": ("dns",),
+     "interval": 60},
+    {"script": "https_latency.py",         "entry": "main",         "exclusive": False, "resources": ("http",),
+     "done_marker": r"^=+$", "converges": True, "interval": 300},
+    {"script": "ntp_test.py",              "entry": "run_ntp_test", "exclusive": False, "resources": ("ntp",),
+     "interval": 300},
+    {"script": "jitter_test.py",           "entry": "main",         "exclusive": False, "resources": ("http",),
+     "converges": True, "interval": 300},
+    {"script": "bufferbloat_like_test.py", "entry": "main",         "exclusive": True,  "resources": (),
+     "done_marker": r"^Test complete\.$", "converges": True, "interval": 3600},
+    {"script": "meeting_test.py",          "entry": "main",         "exclusive": False, "resources": ("icmp",),
+     "stop_signal": signal.SIGINT, "converges": True, "interval": 600},
+    {"script": "wificheck.py",             "entry": "main_loop",    "exclusive": False, "resources": ("wifi",),
+     "interval": 300},
 ]
 
+TESTS = [spec["script"] for spec in TEST_SPECS]
+
+# Warm pool'da önceden yüklenecek ortak bağımlılıklar (test modüllerine ek olarak)
+PRELOAD_MODULES = ["requests", "ntplib"]
+
+_warm_pool = None
+_tsdb = None
+_exporter = None
+_shutdown = threading.Event()   # SIGTERM/CTRL+C: yeni test başlatma, koşanları durdur
+
 REMOVE_DIRS = [
     "http_latency_test_result",
     "meeting_test",
@@ -35,42 +117,317 @@ REMOVE_DIRS = [
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
-def safe_kill_process_group(proc):
-    """Try SIGTERM the whole group, fallback to kill, ignore if already gone."""
+def safe_kill_process_group(proc, exited, sig=signal.SIGTERM):
+    """Send ``sig`` (SIGTERM) to the test's whole group, fallback to kill, ignore if already gone.
+
+    Called after every run, also when the test exited by itself: helpers it
+    left behind (ping, iperf, ...) would keep the output pipes open. ``exited``
+    is set by the one thread that reaps ``proc`` (``_wait_exit``); it only
+    decides whether to escalate to SIGKILL, nothing here polls the child.
+    """
+    # Test kendi grubunun lideri (setsid / setpgid): lider toplanmış olsa da grup kimliği pid'dir
+    pgid = proc.pid
     try:
-        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+        os.killpg(pgid, sig)
     except ProcessLookupError:
         return
     except Exception:
+        # Popen.terminate() içeride poll() çağırır: çocuğu _wait_exit'ten önce toplayabilir
         try:
-            proc.terminate()
+            if not exited.is_set():
+                os.kill(proc.pid, sig)
         except Exception:
             pass
     # Give it a moment
+    if not exited.wait(timeout=3):
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except Exception:
+            pass
+
+_console_lock = threading.Lock()
+
+class OutputCapture:
+    """Bounded line buffer: the first ``head`` lines plus a ring of the last ``tail``."""
+
+    def __init__(self, head=CAPTURE_HEAD_LINES, tail=CAPTURE_TAIL_LINES):
+        self.head_max = head
+        self.head = []
+        self.tail = deque(maxlen=max(1, tail))
+        self.dropped = 0
+
+    def append(self, line):
+        if len(self.head) < self.head_max:
+            self.head.append(line)
+            return
+        if len(self.tail) == self.tail.maxlen:
+            self.dropped += 1
+        self.tail.append(line)
+
+    def text(self):
+        lines = list(self.head)
+        if self.dropped:
+            lines.append(f"... [{self.dropped} lines dropped] ...")
+        lines.extend(self.tail)
+        return "\n".join(lines)
+
+def _pump_streams(channels):
+    """Drain several child pipes with one selector, calling ``handler(line)`` per line.
+
+    ``channels`` is a list of (file object, handler). Reads are non-blocking so a
+    chatty child never stalls on a full pipe; returns when every pipe hits EOF.
+    """
+    sel = selectors.DefaultSelector()
+    state = {}
+    for stream, handler in channels:
+        fd = stream.fileno()
+        os.set_blocking(fd, False)
+        sel.register(fd, selectors.EVENT_READ)
+        state[fd] = [stream, handler, codecs.getincrementaldecoder("utf-8")(errors="replace"), ""]
     try:
-        proc.wait(timeout=3)
-    except Exception:
+        while state:
+            for key, _ in sel.select(timeout=1.0):
+                fd = key.fd
+                stream, handler, decoder, partial = state[fd]
+                try:
+                    data = os.read(fd, 65536)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    data = b""
+                text = partial + decoder.decode(data, final=not data)
+                lines = text.split("\n")
+                partial = lines.pop()
+                if not data and partial:
+                    lines.append(partial)
+                    partial = ""
+                while len(partial) > CAPTURE_MAX_LINE:
+                    lines.append(partial[:CAPTURE_MAX_LINE])
+                    partial = partial[CAPTURE_MAX_LINE:]
+                for line in lines:
+                    try:
+                        handler(line)
+                    except Exception:
+                        pass
+                if not data:
+                    sel.unregister(fd)
+                    del state[fd]
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+                else:
+                    state[fd][3] = partial
+    finally:
+        sel.close()
+
+class ResultWriter:
+    """Crash-safe result files for one cycle.
+
+    The ``.txt`` report gets the header immediately and each block as soon as
+    every block before it is done, so it always reads in TEST_SPECS order. The
+    ``.jsonl`` file gets one line per record as it arrives. Both are appended
+    and flushed line by line, so a crash loses at most the line being written.
+    Every record is also handed to each of ``sinks`` (``add_record(rec)``).
+    """
+
+    def __init__(self, txt_path, jsonl_path, head, batch, sinks=()):
+        self.txt_path = txt_path
+        self.jsonl_path = jsonl_path
+        self.batch = batch
+        self.sinks = [sink for sink in sinks if sink is not None]
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next_idx = 0
+        self._seq = 0
+        self._written = 0
+        self._txt = open(txt_path, "a", encoding="utf-8")
+        self._jsonl = open(jsonl_path, "a", encoding="utf-8")
+        self._txt.write(head)
+        self._txt.flush()
+
+    def record(self, rec):
+        rec = dict(rec, batch=self.batch, agent=AGENT_ID)
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=str)
+        with self._lock:
+            self._jsonl.write(line + "\n")
+            self._jsonl.flush()
+        for sink in self.sinks:
+            sink.add_record(rec)
+
+    def _write_block(self, text):
+        if self._written:
+            self._txt.write("\n")
+        self._txt.write(text)
+        self._written += 1
+
+    def block(self, idx, text):
+        with self._lock:
+            if idx < self._next_idx or idx in self._pending:
+                return   # her sıra numarasının ilk bloğu geçerli
+            self._pending[idx] = text
+            while self._next_idx in self._pending:
+                self._write_block(self._pending.pop(self._next_idx))
+                self._next_idx += 1
+            self._txt.flush()
+            os.fsync(self._txt.fileno())
+
+    def append_block(self, text):
+        """Write ``text`` as the next block, for writers without a fixed order (daemon mode)."""
+        with self._lock:
+            idx = self._seq
+            self._seq += 1
+        self.block(idx, text)
+
+    def close(self, footer=None):
+        with self._lock:
+            # Sırası gelmeyen bloklar (önündeki hiç yazılmadıysa) kaybolmasın: sırayla yaz
+            for idx in sorted(self._pending):
+                self._write_block(self._pending.pop(idx))
+            if footer:
+                self._txt.write(footer)
+            for fh in (self._txt, self._jsonl):
+                try:
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                except (OSError, ValueError):
+                    pass
+                fh.close()
+
+def _wait_exit(proc, exited, done_evt, usage):
+    """Reap ``proc`` and put its CPU / peak RSS / I/O counters into ``usage``.
+
+    The only place the child is waited for: wait4() sets ``proc.returncode``
+    and ``exited`` tells everyone else that it is gone.
+    """
+    if isinstance(proc, subprocess.Popen):
+        try:
+            proc.returncode, reaped = reap_with_usage(proc.pid)
+            usage.update(reaped)
+        except OSError:
+            pass
+    else:
+        # warm pool işçisini fork-server toplar ve kullanımını ölçer
         try:
-            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+            proc.wait()
         except Exception:
             pass
+        usage.update(getattr(proc, "usage", None) or {})
+    exited.set()
+    done_evt.set()
 
-def run_single_test(script_path, duration):
-    start_ts = datetime.now()
+def _fmt_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024.0
+    return f"{n:.1f} GB"
+
+def format_resources(m, iface=None):
+    """One report line for a test's ``resource`` metrics."""
+    parts = []
+    if "cpu_user_s" in m:
+        parts.append(f"CPU {m['cpu_user_s']:.2f}s user / {m['cpu_sys_s']:.2f}s sys")
+    if "max_rss_kb" in m:
+        parts.append(f"Peak RSS {m['max_rss_kb'] / 1024.0:.1f} MB")
+    if "children" in m:
+        parts.append(f"Children {m['children']}")
+    if "io_read_bytes" in m:
+        parts.append(f"I/O {_fmt_bytes(m['io_read_bytes'])} read / {_fmt_bytes(m.get('io_write_bytes', 0))} written"
+                     f" ({m.get('syscalls_read', 0)} / {m.get('syscalls_write', 0)} syscalls)")
+    if "net_rx_bytes" in m:
+        parts.append(f"Net {iface or '?'} {_fmt_bytes(m['net_rx_bytes'])} rx / {_fmt_bytes(m['net_tx_bytes'])} tx")
+    return "  |  ".join(parts)
+
+def start_warm_pool():
+    """Start the fork-server with every test module and PRELOAD_MODULES imported once."""
+    global _warm_pool
+    modules = PRELOAD_MODULES + [os.path.splitext(spec["script"])[0] for spec in TEST_SPECS]
+    _warm_pool = WarmPool(BASE_DIR, modules).start()
+    return _warm_pool
+
+def stop_warm_pool():
+    global _warm_pool
+    if _warm_pool is not None:
+        _warm_pool.stop()
+        _warm_pool = None
+
+def start_tsdb():
+    """Open the time-series store and start its background flush/rollup thread."""
+    global _tsdb
+    ensure_dir(RESULTS_DIR)
+    _tsdb = TimeSeriesStore(TSDB_PATH, agent=AGENT_ID).start_background()
+    return _tsdb
+
+def stop_tsdb():
+    global _tsdb
+    if _tsdb is not None:
+        _tsdb.close()
+        _tsdb = None
+
+def start_exporter():
+    """Serve the latest record values as OpenMetrics on METRICS_BIND:METRICS_PORT."""
+    global _exporter
+    _exporter = MetricsExporter(METRICS_PORT, bind=METRICS_BIND).start()
+    print(f"📈 Metrics: http://{METRICS_BIND}:{_exporter.port}/metrics")
+    return _exporter
+
+def stop_exporter():
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
+
+def record_sinks():
+    """Consumers that get every structured record besides the .jsonl file."""
+    return (_tsdb, _exporter)
+
+def _spawn_test(script_path, entry, env_extra, record_fd):
+    """Start a test either in a warm fork-server worker or as a fresh ``python3 -u``.
+
+    ``record_fd`` is the write end of the JSONL side channel; the child finds
+    it through the OPROBE_RECORD_FD environment variable.
+    """
+    if entry and _warm_pool is not None and _warm_pool.alive():
+        module = os.path.splitext(os.path.basename(script_path))[0]
+        try:
+            return _warm_pool.spawn(module, entry, argv=[script_path], env=env_extra,
+                                    extra_fd=record_fd, fd_env=RECORD_FD_ENV)
+        except (OSError, RuntimeError, ValueError):
+            pass  # fork-server cevap vermiyorsa normal yoldan devam
     env = os.environ.copy()
-    env["PYTHONUNBUFFERED"] = "1"
+    env.update(env_extra)
+    env[RECORD_FD_ENV] = str(record_fd)
     cmd = ["python3", "-u", script_path]
+    return subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        cwd=BASE_DIR,
+        pass_fds=(record_fd,),
+        preexec_fn=os.setsid
+    )
+
+def run_single_test(script_path, duration, done_marker=None, stop_signal=signal.SIGTERM, entry=None,
+                    on_record=None, env_extra=None):
+    """Run one test module until it exits, prints its done marker or hits the deadline.
+
+    Whichever comes first releases the slot; the process group is then stopped
+    with ``stop_signal`` (escalating to SIGKILL) if it is still running. A
+    shutdown request (``_shutdown``) stops it early the same way.
+    Structured records from the child are passed to ``on_record`` as they arrive.
+    """
+    start_ts = datetime.now()
+    base = os.path.basename(script_path)
+    iface = current_link().get("iface")
+    net0 = iface_counters(iface)
+    rec_r, rec_w = os.pipe()
     try:
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env=env,
-            cwd=BASE_DIR,
-            preexec_fn=os.setsid
-        )
+        proc = _spawn_test(script_path, entry, dict(env_extra or {}, PYTHONUNBUFFERED="1"), rec_w)
     except FileNotFoundError as e:
+        os.close(rec_r)
+        os.close(rec_w)
         block = []
         block.append(f"### {os.path.basename(script_path)} ###")
         block.append(f"Started: {start_ts.isoformat(timespec='seconds')}  |  Ended: {datetime.now().isoformat(timespec='seconds')}")
@@ -83,20 +440,108 @@ def run_single_test(script_path, duration):
         block.append("")
         return "\n".join(block)
 
+    os.close(rec_w)
     pid = proc.pid
-    time.sleep(duration)
-    safe_kill_process_group(proc)
+    test = os.path.splitext(base)[0]
+    t0 = time.monotonic()
+    marker_re = re.compile(done_marker) if done_marker else None
+    done_evt = threading.Event()
+    exited = threading.Event()   # _wait_exit çocuğu topladı; proc.poll() burada çağrılmaz
+    out_cap, err_cap = OutputCapture(), OutputCapture()
+    records, last_samples = [], {}
+    usage = {}
+    sampler = ChildSampler(pid).start()
+
+    def forward(stream_name, line):
+        if LIVE_CONSOLE:
+            with _console_lock:
+                print(f"[{test}] {line}", flush=True)
+        if LIVE_OUTPUT_RECORDS and on_record is not None:
+            on_record({"type": "output", "test": test, "ts": round(time.time(), 3),
+                       "stream": stream_name, "line": line})
+
+    def on_stdout(line):
+        out_cap.append(line)
+        forward("stdout", line)
+        if marker_re is not None and marker_re.search(line):
+            done_evt.set()
+
+    def on_stderr(line):
+        err_cap.append(line)
+        forward("stderr", line)
+
+    def on_record_line(line):
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(rec, dict):
+            return
+        # Rapor metrikleri için sadece özetler ve hedef başına son örnek tutulur
+        if rec.get("type") == "sample":
+            last_samples[rec.get("target")] = rec
+        elif rec.get("type") == "summary":
+            records.append(rec)
+        if on_record is not None:
+            on_record(rec)
+
+    rec_stream = os.fdopen(rec_r, "rb")
+    pumps = [
+        threading.Thread(target=_pump_streams, daemon=True,
+                         args=([(proc.stdout, on_stdout), (proc.stderr, on_stderr),
+                                (rec_stream, on_record_line)],)),
+        threading.Thread(target=_wait_exit, args=(proc, exited, done_evt, usage), daemon=True),
+    ]
+    for t in pumps:
+        t.start()
+
+    # Süreç çıkışı, özet işareti, deadline veya kapanış isteği: hangisi önce gelirse
+    deadline = t0 + duration
+    while not done_evt.is_set() and not _shutdown.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done_evt.wait(timeout=min(remaining, 0.5))
+    if exited.is_set():
+        stop_reason = "exited"
+    elif done_evt.is_set():
+        stop_reason = "summary printed"
+    elif _shutdown.is_set():
+        stop_reason = "shutdown"
+    else:
+        stop_reason = "deadline"
+    # Lider çıkmış olsa da grup temizlenir: geride kalan torunlar çıktı borularını tutmasın
+    safe_kill_process_group(proc, exited, stop_signal)
+    elapsed = time.monotonic() - t0
     end_ts = datetime.now()
-    try:
-        stdout, stderr = proc.communicate(timeout=5)
-    except Exception:
-        stdout, stderr = "", "process did not exit cleanly"
+    pumps[0].join(timeout=5)
+    pumps[1].join(timeout=5)   # dönüş kodu ve rusage toplayıcıdan gelir
+    stdout, stderr = out_cap.text(), err_cap.text()
+    if pumps[0].is_alive():
+        stderr += "\nprocess did not exit cleanly"
     rc = proc.returncode
 
+    # Kaynak kullanımı: rusage + /proc/<pid>/io + örneklenen alt süreçler + arayüz sayaçları
+    res = dict(usage, children=sampler.stop())
+    net1 = iface_counters(iface)
+    if net0 and net1:
+        res["net_rx_bytes"], res["net_tx_bytes"] = net1[0] - net0[0], net1[1] - net0[1]
+    if on_record is not None:
+        on_record({"type": "run", "test": test, "ts": round(time.time(), 3),
+                   "rc": rc, "stop": stop_reason, "duration_s": round(elapsed, 2),
+                   "lines_dropped": out_cap.dropped + err_cap.dropped})
+        on_record({"type": "resource", "test": test, "ts": round(time.time(), 3),
+                   "iface": iface, "metrics": {k: round(v, 3) if isinstance(v, float) else v
+                                               for k, v in res.items()}})
+    metrics = metrics_from_records(base, records + list(last_samples.values()))
+
     block = []
-    block.append(f"### {os.path.basename(script_path)} ###")
+    block.append(f"### {base} ###")
     block.append(f"Started: {start_ts.isoformat(timespec='seconds')}  |  Ended: {end_ts.isoformat(timespec='seconds')}")
-    block.append(f"PID: {pid}  |  Duration: {duration}s  |  Return code: {rc}")
+    block.append(f"PID: {pid}  |  Duration: {elapsed:.1f}s  |  Return code: {rc}  |  Stop: {stop_reason}")
+    if metrics:
+        block.append("Metrics: " + "  |  ".join(f"{name}={val:.2f}" for name, val in metrics))
+    block.append("Resources: " + format_resources(res, iface))
     block.append("--- STDOUT ---")
     block.append(stdout.rstrip("\n") if stdout and stdout.strip() else "(No output captured)")
     block.append("--- STDERR ---")
@@ -114,107 +559,259 @@ def cleanup_dirs():
             except Exception:
                 pass
 
-# --- Link Type Detection Helpers ---
-def _get_primary_iface():
-    """Return primary egress interface using 'ip route get'."""
-    try:
-        out = subprocess.check_output(
-            ["bash", "-lc", "ip route get 8.8.8.8 | sed -n 's/.* dev \\([^ ]*\\).*/\\1/p'"],
-            stderr=subprocess.STDOUT
-        ).decode().strip()
-        return out if out else None
-    except Exception:
-        return None
+# ------------------------------------------------------
+# Adaptive early-stop yardımcıları
+# ------------------------------------------------------
+def convergence_env(max_duration):
+    """Environment that switches a module into convergence mode (see oprobe_stats)."""
+    return {
+        "OPROBE_CONVERGE": "1",
+        "OPROBE_CONVERGE_TOL_MS": str(CONVERGE_TOL_MS),
+        "OPROBE_CONVERGE_REL": str(CONVERGE_REL),
+        "OPROBE_CONVERGE_MIN_S": str(CONVERGE_MIN_S),
+        # modül kendi kendine bitebilsin diye orkestratör deadline'ından biraz önce
+        "OPROBE_CONVERGE_MAX_S": str(max(CONVERGE_MIN_S, max_duration - 2)),
+    }
 
-def _is_wireless_iface(iface):
-    """Detect wireless by presence of /sys/class/net/<iface>/wireless or iw dev listing."""
-    try:
-        if iface and os.path.isdir(f"/sys/class/net/{iface}/wireless"):
+class TimeBank:
+    """Seconds saved by tests that converged early, lent to later tests in the cycle."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.balance = 0.0
+
+    def deposit(self, seconds):
+        if seconds > 0:
+            with self._lock:
+                self.balance += seconds
+
+    def withdraw(self, limit):
+        with self._lock:
+            amount = min(self.balance, limit)
+            self.balance -= amount
+            return amount
+
+# ------------------------------------------------------
+# Zamanlayıcı: uyumlu testleri paralel, exclusive testleri tek başına çalıştır
+# ------------------------------------------------------
+class TestScheduler:
+    """Admit tests into run slots without resource conflicts.
+
+    Callers take a ticket with ``enqueue()`` (in submission order) and then
+    block in ``acquire()`` until the test may start. An exclusive test starts
+    only after every earlier ticket has started and every running test has
+    finished, and it holds back tests queued after it, so a saturating load
+    never overlaps another measurement. Once ``cancel`` (an Event) is set,
+    waiting tickets give up and ``acquire()`` returns False.
+    """
+
+    def __init__(self, max_parallel=MAX_PARALLEL, cancel=None):
+        self.max_parallel = max(1, int(max_parallel))
+        self.cancel = cancel
+        self._cond = threading.Condition()
+        self._running = {}   # ticket -> spec
+        self._waiting = {}   # ticket -> spec
+        self._next_ticket = 0
+
+    def enqueue(self, spec):
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._waiting[ticket] = spec
+            return ticket
+
+    def _can_start(self, ticket, spec):
+        running = list(self._running.values())
+        if any(r.get("exclusive") for r in running):
+            return False
+        # Önce sıraya girmiş bir exclusive test varsa arkasındakiler bekler
+        for t, w in self._waiting.items():
+            if t < ticket and w.get("exclusive"):
+                return False
+        if spec.get("exclusive"):
+            # Exclusive test, kendinden önce sıraya girenlerin hepsi başlayınca ve hat boşalınca başlar
+            return not running and all(t > ticket for t in self._waiting if t != ticket)
+        if len(running) >= self.max_parallel:
+            return False
+        needed = set(spec.get("resources", ()))
+        for r in running:
+            if needed & set(r.get("resources", ())):
+                return False
+        return True
+
+    def acquire(self, ticket):
+        with self._cond:
+            spec = self._waiting[ticket]
+            while not self._can_start(ticket, spec):
+                if self.cancel is not None and self.cancel.is_set():
+                    del self._waiting[ticket]
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(timeout=0.5 if self.cancel is not None else None)
+            del self._waiting[ticket]
+            self._running[ticket] = spec
             return True
-    except Exception:
-        pass
-    try:
-        out = subprocess.check_output(["iw", "dev"], stderr=subprocess.STDOUT).decode()
-        if iface:
-            if f"Interface {iface}\n" in out:
-                return True
-            if re.search(r"Interface\s+%s\b" % re.escape(iface), out):
-                return True
-        # If there is at least one wireless interface listed
-        return bool(out.strip())
-    except Exception:
-        return False
+
+    def release(self, ticket):
+        with self._cond:
+            self._running.pop(ticket, None)
+            self._cond.notify_all()
+
+def run_batch(specs, run_fn, scheduler=None):
+    """Run ``run_fn(spec)`` for every spec under the scheduler's rules.
+
+    Non-exclusive tests are queued first so they can overlap; exclusive ones
+    follow. Results are returned in the order of ``specs`` regardless of
+    completion order.
+    """
+    scheduler = scheduler or TestScheduler(cancel=_shutdown)
+    results = [None] * len(specs)
+    order = sorted(range(len(specs)), key=lambda i: bool(specs[i].get("exclusive")))
+    threads = []
+
+    def worker(idx, ticket):
+        if not scheduler.acquire(ticket):
+            return
+        try:
+            results[idx] = run_fn(specs[idx])
+        finally:
+            scheduler.release(ticket)
+
+    for idx in order:
+        ticket = scheduler.enqueue(specs[idx])
+        t = threading.Thread(target=worker, args=(idx, ticket), daemon=True)
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    return results
+
+# --- Link Type Detection Helpers ---
+_link = LinkDetector()   # /proc + /sys okur, netlink rota/link olayıyla yenilenir
+
+def current_link():
+    """Egress interface info (iface, type, speed_mbps, ...) from the cached link detector."""
+    return _link.get()
 
 def is_wifi_active():
-    """Return True if the primary route egress interface appears to be Wi-Fi."""
-    iface = _get_primary_iface()
-    if not iface:
-        # No info → default to not Wi-Fi (skip wificheck)
-        return False
-    return _is_wireless_iface(iface)
-
-# (Opsiyonel) metrik çıkarımı – rapor başında özet yapmak istersek kullanılabilir
-def parse_metrics_from_text(base, text):
+    """Return True if the primary route egress interface is Wi-Fi."""
+    # Varsayılan rota yoksa Wi-Fi değil sayılır (wificheck atlanır)
+    return current_link().get("type") == "wifi"
+
+# Yapısal kayıtlardan rapor metrikleri (regex ile stdout kazımak yerine)
+def _last(records, rtype, **match):
+    """Return the last record of ``rtype`` per target (and connection mode) whose fields equal ``match``."""
+    found = {}
+    for rec in records:
+        if rec.get("type") != rtype:
+            continue
+        if any(rec.get(k) != v for k, v in match.items()):
+            continue
+        found[(rec.get("target"), rec.get("mode"))] = rec
+    return list(found.values())
+
+def _mean_metric(recs, key):
+    vals = [r["metrics"][key] for r in recs if key in r.get("metrics", {})]
+    return sum(vals) / len(vals) if vals else None
+
+def metrics_from_records(base, records):
     metrics = []
 
-    def find_last_float(pat, flags=0):
-        val = None
-        for m in re.finditer(pat, text, flags):
-            try:
-                val = float(m.group(1))
-            except Exception:
-                pass
-        return val
+    def add(label, val):
+        if val is not None:
+            metrics.append((label, float(val)))
 
     if base == "dns_resol_latency.py":
-        val = find_last_float(r"Average latency:\s*([0-9.]+)\s*ms")
-        if val is not None:
-            metrics.append(("DNS Avg (ms)", val))
+        add("DNS Avg (ms)", _mean_metric(_last(records, "summary", mode=None, transport=None), "avg_ms"))
+        add("DNS Miss Avg (ms)", _mean_metric(_last(records, "summary", mode=None, transport=None), "miss_avg_ms"))
+        add("DNS DoT Avg (ms)", _mean_metric(_last(records, "summary", transport="dot"), "avg_ms"))
+        add("DNS DoH Avg (ms)", _mean_metric(_last(records, "summary", transport="doh"), "avg_ms"))
+        add("DNS Handshake (ms)", _mean_metric(_last(records, "summary", mode="handshake"), "avg_ms"))
+        add("DNS Miss p95 (ms)", _mean_metric(_last(records, "summary", mode="miss", transport=None), "p95_ms"))
 
     elif base == "https_latency.py":
-        val = find_last_float(r"HTTPS Latency \(avg\):\s*([0-9.]+)\s*ms")
-        if val is not None:
-            metrics.append(("HTTPS Avg (ms)", val))
+        add("HTTPS Avg (ms)", _mean_metric(_last(records, "summary", target="all", mode=None), "avg_ms"))
+        for kind in ("cold", "resumed", "warm"):
+            add(f"HTTPS {kind.capitalize()} (ms)",
+                _mean_metric(_last(records, "summary", target="all", mode=kind), "avg_ms"))
+        add("HTTPS TTFB (ms)", _mean_metric(_last(records, "summary", scope="phases"), "ttfb_ms"))
 
     elif base == "ntp_test.py":
-        val = find_last_float(r"Round Trip Delay:\s*([0-9.]+)\s*ms")
-        if val is not None:
-            metrics.append(("NTP RTD (ms)", val))
+        add("NTP RTD (ms)", _mean_metric(_last(records, "summary"), "delay_ms"))
 
     elif base == "jitter_test.py":
-        val = find_last_float(r"Avg\s*\(ms\)\s*:\s*([0-9.]+)")
-        if val is not None:
-            metrics.append(("Jitter Avg (ms)", val))
+        add("Jitter Avg (ms)", _mean_metric(_last(records, "summary"), "avg_ms"))
+        add("Jitter RFC3550 (ms)", _mean_metric(_last(records, "summary", mode="udp"), "jitter_ms"))
+        add("Jitter Loss (%)", _mean_metric(_last(records, "summary", mode="udp"), "loss_pct"))
 
     elif base == "bufferbloat_like_test.py":
-        b = find_last_float(r"===\s*Baseline Summary\s*===.*?Avg\s*\(ms\)\s*:\s*([0-9.]+)", flags=re.S)
-        if b is not None:
-            metrics.append(("Bloat Baseline (ms)", b))
-        l = find_last_float(r"---\s*Load Summary\s*---.*?Avg\s*\(ms\)\s*:\s*([0-9.]+)", flags=re.S)
-        if l is not None:
-            metrics.append(("Bloat Load (ms)", l))
+        add("Bloat Baseline (ms)", _mean_metric(_last(records, "summary", phase="baseline"), "avg_ms"))
+        add("Bloat Load (ms)", _mean_metric(_last(records, "summary", phase="load"), "avg_ms"))
 
     elif base == "meeting_test.py":
-        vals = [float(m.group(1)) for m in re.finditer(r"Average Latency:\s*([0-9.]+)\s*ms", text)]
-        if vals:
-            metrics.append(("Meeting Avg (ms)", sum(vals)/len(vals)))
+        add("Meeting Avg (ms)", _mean_metric(_last(records, "summary"), "avg_ms"))
 
     elif base == "wificheck.py":
-        # Heuristic: try to capture last SNR in a row line
-        last_row = None
-        for line in text.strip().splitlines():
-            if re.search(r"\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}", line):
-                last_row = line
-        if last_row:
-            m = re.search(r"\bSNR\D*([-+]?\d+\.?\d*)", last_row, re.I)
-            if m:
-                try:
-                    metrics.append(("WiFi SNR (dB)", float(m.group(1))))
-                except Exception:
-                    pass
+        add("WiFi SNR (dB)", _mean_metric(_last(records, "sample")[-1:], "snr_db"))
 
     return metrics
 
+# ------------------------------------------------------
+# Tek bir test (TEST_SPECS girdisi) çalıştır
+# ------------------------------------------------------
+def status_block(test, status, reason):
+    """Report block for a test that produced no run of its own (skipped, failed to run)."""
+    return (
+        f"### {test} ###\n"
+        f"Started: {datetime.now().isoformat(timespec='seconds')}\n"
+        f"STATUS: {status}\n"
+        f"REASON: {reason}\n"
+        + "="*70 + "\n\n"
+    )
+
+def run_spec(spec, writer, wifi_active=None, bank=None, cadence=INTERVAL_SECONDS):
+    """Run one TEST_SPECS entry, sending its records to ``writer``; returns its report block.
+
+    ``wifi_active`` is probed on demand when not given. ``bank`` lends
+    convergence tests the time saved earlier in the same cycle. ``cadence``
+    is how often this test runs (seconds); tests that rotate through large
+    target lists learn it, and where to keep their round counter, from the
+    environment.
+    """
+    test = spec["script"]
+    script_path = os.path.join(BASE_DIR, test)
+    if test == "wificheck.py" and not (is_wifi_active() if wifi_active is None else wifi_active):
+        # Skip Wi-Fi test on BaseT and log a clear block
+        writer.record({"type": "run", "test": "wificheck", "ts": round(time.time(), 3),
+                       "status": "skipped", "reason": "BaseT"})
+        return status_block(test, "SKIPPED", "This agent connection BaseT")
+
+    print(f"Running: {test} ...")
+    duration, done_marker, env_extra = RUN_DURATION, spec.get("done_marker"), {}
+    converges = CONVERGENCE_MODE and spec.get("converges")
+    if converges:
+        if bank is not None:
+            duration += bank.withdraw(CONVERGE_MAX_BONUS)
+        done_marker = None
+        env_extra = convergence_env(duration)
+    env_extra = dict(env_extra, OPROBE_ROUND_SECONDS=str(cadence), OPROBE_STATE_DIR=RESULTS_DIR)
+    elapsed = []
+
+    def on_record(rec):
+        if rec.get("type") == "run":
+            elapsed.append(rec.get("duration_s") or 0.0)
+        writer.record(rec)
+
+    block_text = run_single_test(script_path, duration,
+                                 done_marker=done_marker,
+                                 stop_signal=spec.get("stop_signal", signal.SIGTERM),
+                                 entry=spec.get("entry"),
+                                 on_record=on_record,
+                                 env_extra=env_extra)
+    if converges and bank is not None and elapsed:
+        bank.deposit(duration - elapsed[-1])
+    return block_text
+
 # ------------------------------------------------------
 # Tek bir tur tüm testleri çalıştır ve zaman damgalı dosyaya yaz
 # ------------------------------------------------------
@@ -222,55 +819,314 @@ def run_once():
     ensure_dir(RESULTS_DIR)
     batch_ts = datetime.now().strftime("%Y%m%d_%H%M%S")  # her tur için yeni damga
     result_file = os.path.join(RESULTS_DIR, f"{batch_ts}_all_tests.txt")
+    records_file = os.path.join(RESULTS_DIR, f"{batch_ts}_all_tests.jsonl")
 
-    print(f"SUM {len(TESTS)} tests running... (each tests {RUN_DURATION} sn)")
+    print(f"SUM {len(TESTS)} tests running... (each tests up to {RUN_DURATION} sn, up to {MAX_PARALLEL} in parallel)")
     head = (
         f"# Oprobe Combined Test Results\n"
         f"Generated at {datetime.now().isoformat(timespec='seconds')}\n"
+        f"Link: {describe_link(current_link())}\n"
         + "=" * 70 + "\n\n"
     )
 
-    blocks = []
-    for test in TESTS:
-        script_path = os.path.join(BASE_DIR, test)
-        print(f"Running: {test} ...")
-
-        if test == "wificheck.py" and not is_wifi_active():
-            # Skip Wi-Fi test on BaseT and log a clear block
-            start_ts = datetime.now().isoformat(timespec='seconds')
-            block_text = (
-                "### wificheck.py ###\n"
-                f"Started: {start_ts}\n"
-                "STATUS: SKIPPED\n"
-                "REASON: This agent connection BaseT\n"
-                + "="*70 + "\n\n"
-            )
-        else:
-            block_text = run_single_test(script_path, RUN_DURATION)
+    wifi_active = is_wifi_active()
+    writer = ResultWriter(result_file, records_file, head, batch_ts, sinks=record_sinks())
+    writer.record({"type": "link", "ts": round(time.time(), 3), "link": current_link()})
+    index = {id(spec): i for i, spec in enumerate(TEST_SPECS)}
+    bank = TimeBank()
+
+    def run_one(spec):
+        # Blok her durumda yazılır: eksik bir sıra numarası sonraki tüm blokları bekletirdi
+        block_text = None
+        try:
+            block_text = run_spec(spec, writer, wifi_active=wifi_active, bank=bank)
+        except Exception as e:
+            traceback.print_exc()
+            block_text = status_block(spec["script"], "ERROR", f"{type(e).__name__}: {e}")
+        finally:
+            writer.block(index[id(spec)], block_text if block_text is not None
+                         else status_block(spec["script"], "ERROR", "interrupted"))
+        return block_text
 
-        blocks.append(block_text)
-        cleanup_dirs()
+    self0, kids0 = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    footer = None
+    try:
+        results = run_batch(TEST_SPECS, run_one)
+        for spec, block_text in zip(TEST_SPECS, results):
+            if block_text is None:
+                # Kapanışta sırası hiç gelmeyen test
+                writer.block(index[id(spec)], status_block(spec["script"], "SKIPPED", "shutdown before it started"))
+        # Orkestratörün kendi maliyeti (pipe pompalama, kayıt yazma, zamanlama)
+        self1, kids1 = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        own = dict(rusage_metrics(self1),
+                   cpu_user_s=round(self1.ru_utime - self0.ru_utime, 3),
+                   cpu_sys_s=round(self1.ru_stime - self0.ru_stime, 3),
+                   children_cpu_s=round(kids1.ru_utime + kids1.ru_stime - kids0.ru_utime - kids0.ru_stime, 3))
+        writer.record({"type": "resource", "test": "run_all_tests", "ts": round(time.time(), 3), "metrics": own})
+        footer = f"\nOrchestrator: {format_resources(own)}  |  Test processes CPU {own['children_cpu_s']:.2f}s\n"
+    finally:
+        writer.close(footer)
+    cleanup_dirs()
 
-    with open(result_file, "w", encoding="utf-8") as f:
-        f.write(head)
-        f.write("\n".join(blocks))
+    print(f"✅ Bitti. Tek dosya: {result_file} (+ {os.path.basename(records_file)})")
 
-    print(f"✅ Bitti. Tek dosya: {result_file}")
+# ------------------------------------------------------
+# Periyodik çalıştırma döngüsü (tur modu)
+# ------------------------------------------------------
+def run_cycles(interval=INTERVAL_SECONDS):
+    """Call run_once() on a fixed grid (start + k * interval) so the period never drifts.
+
+    A cycle that overruns its slot skips the missed slots instead of starting
+    the next cycle late.
+    """
+    anchor = time.monotonic()
+    k = 0
+    while not _shutdown.is_set():
+        run_once()
+        k = max(k + 1, math.floor((time.monotonic() - anchor) / interval) + 1)
+        wait = anchor + k * interval - time.monotonic()
+        print(f"⏳ Bir sonraki tur için bekleniyor: {wait:.0f} saniye (CTRL+C ile durdurabilirsiniz)")
+        _shutdown.wait(max(0.0, wait))
 
 # ------------------------------------------------------
-# Periyodik çalıştırma döngüsü
+# Daemon modu: test başına mutlak takvim (cron benzeri)
 # ------------------------------------------------------
+def splay_offset(script, interval):
+    """Per-agent phase offset in [0, interval): stable across restarts, different per agent."""
+    if not DAEMON_SPLAY:
+        return 0.0
+    digest = hashlib.sha256(f"{AGENT_ID}/{script}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % int(interval * 1000) / 1000.0
+
+def next_slot(interval, offset, after):
+    """First wall-clock slot ``k * interval + offset`` strictly after ``after``."""
+    k = math.floor((after - offset) / interval) + 1
+    return k * interval + offset
+
+class DaemonResults:
+    """Result files for daemon mode: one ResultWriter per DAEMON_FILE_PERIOD window.
+
+    Runs take the current writer with ``acquire()`` and give it back with
+    ``release()``; a window's files are closed once its last run is done.
+    """
+
+    def __init__(self, period=DAEMON_FILE_PERIOD):
+        self.period = period
+        self._lock = threading.Lock()
+        self._writers = {}   # pencere başlangıcı -> [writer, kullanan sayısı]
+
+    def _window(self):
+        return int(time.time() // self.period * self.period)
+
+    def acquire(self):
+        start = self._window()
+        with self._lock:
+            entry = self._writers.get(start)
+            if entry is None:
+                batch = datetime.fromtimestamp(start).strftime("%Y%m%d_%H%M%S")
+                result_file = os.path.join(RESULTS_DIR, f"{batch}_all_tests.txt")
+                records_file = os.path.join(RESULTS_DIR, f"{batch}_all_tests.jsonl")
+                head = ""
+                if not os.path.exists(result_file):   # yeniden başlatmada aynı dosyaya devam
+                    head = (
+                        f"# Oprobe Daemon Test Results\n"
+                        f"Generated at {datetime.now().isoformat(timespec='seconds')}\n"
+                        f"Link: {describe_link(current_link())}\n"
+                        + "=" * 70 + "\n\n"
+                    )
+                entry = self._writers[start] = [ResultWriter(result_file, records_file, head, batch, sinks=record_sinks()), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, writer):
+        current = self._window()
+        with self._lock:
+            for start, entry in list(self._writers.items()):
+                if entry[0] is writer:
+                    entry[1] -= 1
+                if entry[1] == 0 and start != current:
+                    entry[0].close()
+                    del self._writers[start]
+
+    def close(self):
+        with self._lock:
+            for writer, _ in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+class TestDaemon:
+    """Run every test on its own absolute schedule until ``_shutdown`` is set.
+
+    Each test fires at ``k * interval + splay`` on the wall clock plus a fresh
+    random jitter. The schedule never drifts with run time. A test still
+    running (or still queued) at its next slot is skipped, not stacked. Slots
+    missed while the daemon was down or the host was asleep are counted and
+    dropped. Resource conflicts go through the shared TestScheduler. The
+    schedule and counters are kept in ``state_path`` so a restart resumes them.
+    """
+
+    def __init__(self, specs=TEST_SPECS, state_path=STATE_FILE):
+        self.specs = [spec for spec in specs if spec.get("interval")]
+        self.state_path = state_path
+        self.scheduler = TestScheduler(cancel=_shutdown)
+        self.results = DaemonResults()
+        self._lock = threading.Lock()
+        self._inflight = {}   # script -> thread
+        self.state = self._load_state()
+
+    # --- durum dosyası ---
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as fh:
+                state = json.load(fh)
+            if isinstance(state, dict) and isinstance(state.get("tests"), dict):
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"version": 1, "tests": {}}
+
+    def _save_state(self):
+        with self._lock:
+            self.state["agent"] = AGENT_ID
+            self.state["saved_at"] = round(time.time(), 3)
+            data = json.dumps(self.state, indent=2, sort_keys=True)
+            tmp = self.state_path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    fh.write(data)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp, self.state_path)
+            except OSError as e:
+                print(f"⚠️  State file not written: {e}", file=sys.stderr)
+
+    def _plan(self, entry, after):
+        """Set the entry's next nominal slot after ``after`` and draw its jitter."""
+        slot = next_slot(entry["interval"], entry["offset"], after)
+        entry["slot"] = round(slot, 3)
+        entry["due"] = round(slot + random.uniform(0, DAEMON_JITTER * entry["interval"]), 3)
+
+    def _prepare(self, now):
+        tests = self.state["tests"]
+        for spec in self.specs:
+            script, interval = spec["script"], float(spec["interval"])
+            offset = round(splay_offset(script, interval), 3)
+            entry = tests.setdefault(script, {"runs": 0, "skipped": 0, "missed": 0})
+            resumable = (entry.get("interval") == interval and entry.get("offset") == offset
+                         and isinstance(entry.get("due"), (int, float)))
+            entry["interval"], entry["offset"] = interval, offset
+            if resumable and entry["due"] >= now:
+                continue   # bekleyen dilim aynen sürer
+            if resumable:
+                entry["missed"] += max(1, math.floor((now - entry["slot"]) / interval) + 1)
+            self._plan(entry, now)
+        # Artık TEST_SPECS'te olmayan testlerin durumu düşer
+        for script in [s for s in tests if s not in {spec["script"] for spec in self.specs}]:
+            del tests[script]
+
+    # --- çalıştırma ---
+    def _fire(self, spec):
+        script = spec["script"]
+        entry = self.state["tests"][script]
+        ticket = self.scheduler.enqueue(spec)
+        if not self.scheduler.acquire(ticket):
+            return
+        writer = self.results.acquire()
+        started = time.time()
+        try:
+            writer.append_block(run_spec(spec, writer, cadence=entry["interval"]))
+        finally:
+            self.scheduler.release(ticket)
+            self.results.release(writer)
+            with self._lock:
+                entry["runs"] += 1
+                entry["last_start"] = round(started, 3)
+                entry["last_duration_s"] = round(time.time() - started, 2)
+                idle = not [t for s, t in self._inflight.items() if s != script and t.is_alive()]
+            if idle:
+                cleanup_dirs()   # başka test koşarken çıktı klasörleri silinmez
+            self._save_state()
+
+    def run(self):
+        ensure_dir(RESULTS_DIR)
+        self._prepare(time.time())
+        self._save_state()
+        by_script = {spec["script"]: spec for spec in self.specs}
+        for script, entry in sorted(self.state["tests"].items(), key=lambda kv: kv[1]["due"]):
+            due = datetime.fromtimestamp(entry["due"]).isoformat(timespec="seconds")
+            print(f"🗓  {script:<26} every {entry['interval']:.0f}s  (splay {entry['offset']:.1f}s)  next: {due}")
+
+        while not _shutdown.is_set():
+            now = time.time()
+            changed = False
+            for script, spec in by_script.items():
+                entry = self.state["tests"][script]
+                if now < entry["due"]:
+                    continue
+                changed = True
+                with self._lock:
+                    busy = script in self._inflight and self._inflight[script].is_alive()
+                    entry["missed"] += max(0, math.floor((now - entry["slot"]) / entry["interval"]))
+                    self._plan(entry, now)
+                    if busy:
+                        entry["skipped"] += 1
+                    else:
+                        t = threading.Thread(target=self._fire, args=(spec,), name=f"daemon-{script}", daemon=True)
+                        self._inflight[script] = t
+                        t.start()
+                if busy:
+                    print(f"⏭  {script} is still running, slot skipped")
+            if changed:
+                self._save_state()
+            wake = min(e["due"] for e in self.state["tests"].values()) - time.time()
+            _shutdown.wait(min(max(wake, 0.05), 1.0))
+
+        # Kapanış: koşan testler _shutdown ile durur, bitmelerini bekle
+        print("⏹  Shutting down, waiting for running tests to stop ...")
+        for t in list(self._inflight.values()):
+            t.join(timeout=15)
+        self.results.close()
+        self._save_state()
+
+def _request_shutdown(signum, frame):
+    if not _shutdown.is_set():
+        print(f"\n⏹  {signal.Signals(signum).name} received, stopping after running tests are stopped.")
+    _shutdown.set()
+
 if __name__ == "__main__":
-    INTERVAL_SECONDS = 10 * 60  # 10 dakika
+    parser = argparse.ArgumentParser(description="Run all Oprobe tests")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--daemon", action="store_true",
+                      help="run each test on its own schedule (TEST_SPECS 'interval') until SIGTERM")
+    mode.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--state-file", default=STATE_FILE, help="daemon schedule state (default: %(default)s)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve OpenMetrics on this port (default: METRICS_PORT, off if unset)")
+    args = parser.parse_args()
+    METRICS_PORT = args.metrics_port
+
+    signal.signal(signal.SIGTERM, _request_shutdown)
+    if args.daemon:
+        signal.signal(signal.SIGINT, _request_shutdown)
 
     try:
-        # İlk tur hemen
-        run_once()
+        if USE_WARM_POOL:
+            start_warm_pool()
+        if TSDB_ENABLED:
+            start_tsdb()
+        if METRICS_PORT is not None:
+            start_exporter()
 
-        # Sonra periyodik
-        while True:
-            print(f"⏳ Bir sonraki tur için bekleniyor: {INTERVAL_SECONDS} saniye (CTRL+C ile durdurabilirsiniz)")
-            time.sleep(INTERVAL_SECONDS)
+        if args.daemon:
+            TestDaemon(state_path=args.state_file).run()
+        elif args.once:
             run_once()
+        else:
+            # İlk tur hemen, sonra sabit ızgarada periyodik
+            run_cycles()
     except KeyboardInterrupt:
         print("\n❌ Program manuel olarak durduruldu (CTRL+C).")
+    finally:
+        stop_warm_pool()
+        stop_exporter()
+        stop_tsdb()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Testler depo kökündeki düz modülleri (oprobe_*.py, *_test.py) doğrudan içe aktarır
+import io
+import json
+import os
+import shutil
+import ssl
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from oprobe_records import RecordStream  # noqa: E402
+
+AUTH_DELAY_MS = 30.0        # stand-in yetkili sunucusunun yanıt gecikmesi
+HANDSHAKE_DELAY_MS = 100.0  # TLS stand-in'de el sıkışmaya eklenen gecikme
+IDLE_TIMEOUT = 0.5          # TLS stand-in'in boştaki bağlantıyı kapatma süresi
+
+
+class CapturedRecords(RecordStream):
+    """RecordStream writing to memory; ``items`` are the records as a reader would parse them."""
+
+    def __init__(self, test):
+        super().__init__(test)
+        self._buf = io.StringIO()
+
+    def _stream(self):
+        return self._buf
+
+    @property
+    def items(self):
+        return [json.loads(line) for line in self._buf.getvalue().splitlines()]
+
+
+@pytest.fixture
+def records(monkeypatch):
+    """``records(module)`` swaps the module's REC for a CapturedRecords and returns it."""
+    def capture(module):
+        rec = CapturedRecords(module.REC.test)
+        monkeypatch.setattr(module, "REC", rec)
+        return rec
+    return capture
+
+
+@pytest.fixture
+def dns_probe(records, monkeypatch):
+    """dns_resol_latency with fresh per-resolver state; returns (module, captured records)."""
+    import dns_resol_latency as drl
+    monkeypatch.setattr(drl, "_DISTS", {})
+    monkeypatch.setattr(drl, "CAPS", drl.CapabilityCache())
+    return drl, records(drl)
+
+
+@pytest.fixture
+def standin():
+    from oprobe_dns_standin import StandinDNS
+    dns = StandinDNS("127.0.0.1", 0, "oprobe.test", AUTH_DELAY_MS).start()
+    yield dns
+    dns.stop()
+
+
+@pytest.fixture
+def tls_cert(tmp_path):
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl needed for the test certificate")
+    from oprobe_dns_standin import make_self_signed
+    return make_self_signed(str(tmp_path))
+
+
+@pytest.fixture
+def tls_standin(tls_cert, monkeypatch):
+    """Stand-in with DoT/DoH on ephemeral ports, a slowed handshake and a short idle timeout."""
+    import oprobe_dns_standin
+    monkeypatch.setattr(oprobe_dns_standin, "IDLE_TIMEOUT", IDLE_TIMEOUT)
+    ctx = oprobe_dns_standin.server_context(*tls_cert)
+    # SNI geri çağrısı el sıkışmanın ortasında çalışır: yalnız handshake_ms uzar
+    ctx.sni_callback = lambda sock, name, c: time.sleep(HANDSHAKE_DELAY_MS / 1000)
+    dns = oprobe_dns_standin.StandinDNS("127.0.0.1", 0, "oprobe.test", 0.0, context=ctx,
+                                        dot_port=0, doh_port=0).start()
+    yield dns
+    dns.stop()
+
+
+@pytest.fixture
+def client_context(tls_cert):
+    return ssl.create_default_context(cafile=tls_cert[0])
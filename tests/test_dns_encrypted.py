@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+from conftest import HANDSHAKE_DELAY_MS, IDLE_TIMEOUT
+from oprobe_dns import DoHClient, DoTClient
+from oprobe_dns_standin import DOH_PATH
+
+
+def _clients(standin, ctx):
+    return {
+        "dot": DoTClient("127.0.0.1", standin.dot_port, server_name="localhost", context=ctx),
+        "doh": DoHClient(f"https://localhost:{standin.doh_port}{DOH_PATH}", server="127.0.0.1", context=ctx),
+    }
+
+
+@pytest.mark.parametrize("kind", ["dot", "doh"])
+def test_connection_is_reused_and_handshake_kept_out_of_latency(tls_standin, client_context, kind):
+    client = _clients(tls_standin, client_context)[kind]
+    try:
+        batch = [("google.com", "A"), ("cloudflare.com", "A")]
+        first = client.query_many(batch)
+        hs = client.take_handshakes()
+        assert len(hs) == 1 and hs[0]["ok"] and not hs[0]["resumed"]
+        assert hs[0]["handshake_ms"] >= HANDSHAKE_DELAY_MS
+        assert all(r["ok"] and r["answers"] for r in first)
+        assert all(r["latency_ms"] < HANDSHAKE_DELAY_MS for r in first)
+
+        second = client.query_many(batch)
+        assert client.take_handshakes() == []
+        assert all(r["ok"] for r in second)
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("kind", ["dot", "doh"])
+def test_reconnects_once_with_resumption_after_idle_close(tls_standin, client_context, kind):
+    client = _clients(tls_standin, client_context)[kind]
+    try:
+        assert client.query("google.com")["ok"]
+        assert len(client.take_handshakes()) == 1
+
+        time.sleep(IDLE_TIMEOUT * 3)   # sunucu boştaki bağlantıyı kapatır
+        r = client.query("cloudflare.com")
+        assert r["ok"] and r["answers"]
+        hs = client.take_handshakes()
+        assert len(hs) == 1 and hs[0]["ok"] and hs[0]["resumed"]
+    finally:
+        client.close()
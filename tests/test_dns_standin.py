@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import socket
+
+from conftest import AUTH_DELAY_MS
+from oprobe_dns import query
+
+
+def test_miss_goes_to_authoritative_then_hits_cache(standin):
+    name = "m-test1.oprobe.test"
+    first = query("127.0.0.1", name, "A", port=standin.port)
+    assert first["ok"] and first["rcode_name"] == "NOERROR" and first["answers"]
+    assert first["latency_ms"] >= AUTH_DELAY_MS
+    assert standin.auth.queries == 1 and standin.recursive.misses == 1
+
+    again = query("127.0.0.1", name, "A", port=standin.port)
+    assert again["ok"] and again["answers"] == first["answers"]
+    assert again["latency_ms"] < AUTH_DELAY_MS
+    assert standin.auth.queries == 1 and standin.recursive.hits == 1
+
+
+def test_out_of_zone_names_are_warm_and_auth_refuses_them(standin):
+    r = query("127.0.0.1", "google.com", "A", port=standin.port)
+    assert r["ok"] and r["answers"] and r["latency_ms"] < AUTH_DELAY_MS
+    assert query("127.0.0.1", "google.com", "A", port=standin.auth_port, rd=False)["rcode_name"] == "REFUSED"
+
+
+def test_tcp_transport(standin):
+    r = query("127.0.0.1", "m-tcp.oprobe.test", "AAAA", transport="tcp", port=standin.port)
+    assert r["ok"] and r["answers"][0][1] == "AAAA"
+
+
+def test_probe_reports_hit_and_miss_separately(standin, dns_probe):
+    drl, records = dns_probe
+    server = f"127.0.0.1#{standin.port}"
+    results = []
+    for d in ("google.com", "cloudflare.com"):
+        results.append(("hit",) + drl.query_domain(server, d, "hit"))
+    for _ in range(2):
+        results.append(("miss",) + drl.query_domain(server, "oprobe.test", "miss"))
+    drl.report_server(server, 1, results)
+
+    # Her miss sorgusu yeni bir isim: hepsi yetkili sunucuya gitti
+    assert standin.auth.queries == 2
+    misses = [r for r in records.items if r["type"] == "sample" and r.get("mode") == "miss"]
+    assert len(misses) == 2 and all(m["metrics"]["latency_ms"] >= AUTH_DELAY_MS for m in misses)
+
+    dists = {r["mode"]: r["metrics"] for r in records.items
+             if r["type"] == "summary" and r.get("scope") == "dist"}
+    assert set(dists) == {"hit", "miss"}
+    assert dists["hit"]["n"] == 2 and dists["miss"]["n"] == 2
+    assert dists["miss"]["p50_ms"] >= AUTH_DELAY_MS > dists["hit"]["p95_ms"]
+
+    rounds = [r for r in records.items if r["type"] == "summary" and r.get("mode") is None]
+    assert rounds[-1]["metrics"]["miss_ok"] == 2 and rounds[-1]["metrics"]["ok"] == 2
+
+
+def test_dead_resolver_reports_no_latency_of_its_own(dns_probe, monkeypatch):
+    drl, records = dns_probe
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    server = f"127.0.0.1#{sock.getsockname()[1]}"
+    sock.close()   # kimse dinlemiyor: UDP ve TCP hemen reddedilir
+
+    def no_system(domain):
+        raise AssertionError("a specific resolver must not fall back to the system resolver")
+
+    monkeypatch.setattr(drl, "system_resolver_query", no_system)
+    for round_no in (1, 2):   # ikinci turda yollar zaten bilinen kötü
+        results = [("hit",) + drl.query_domain(server, "google.com", "hit")]
+        assert results[0][1] is None and results[0][2]
+        drl.report_server(server, round_no, results)
+
+    assert not [r for r in records.items if r["type"] == "sample"]
+    assert drl.distributions(server)["hit"].n == 0
+    failures = [r for r in records.items if r["type"] == "diagnostic" and r.get("domain")]
+    assert len(failures) == 2 and all(r["code"] and r["mode"] == "hit" for r in failures)
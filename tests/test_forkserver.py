@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import os
+
+from oprobe_forkserver import WarmPool
+
+FDCHECK = '''import os
+
+def main():
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            print(os.readlink(f"/proc/self/fd/{fd}"))
+        except OSError:
+            pass
+'''
+
+
+def test_worker_inherits_only_its_own_fds(tmp_path):
+    (tmp_path / "fdcheck.py").write_text(FDCHECK)
+    pool = WarmPool(str(tmp_path), ["fdcheck"], sock_path=str(tmp_path / "fs.sock")).start()
+    try:
+        proc = pool.spawn("fdcheck", "main")
+        assert proc.wait(timeout=10) == 0
+        fds = os.read(proc.stdout.fileno(), 65536).decode().split()
+    finally:
+        pool.stop()
+    # Fork-server'ın epoll fd'si, dinleyici soketi ve diğer bağlantılar işçiye geçmez
+    assert not [fd for fd in fds if "eventpoll" in fd or fd.startswith("socket:")], fds
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import errno
+import socket
+
+import oprobe_http
+from oprobe_http import HttpProber
+
+
+def test_connect_survives_socket_creation_failure(monkeypatch):
+    # İlk adres için socket() EAFNOSUPPORT verir (IPv6'sız host), ikincisi bağlantıyı reddeder
+    infos = [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 9, 0, 0)),
+             (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 9))]
+    monkeypatch.setattr(oprobe_http.socket, "getaddrinfo", lambda *a, **k: infos)
+    real_socket = socket.socket
+
+    def fake_socket(family, *args):
+        if family == socket.AF_INET6:
+            raise OSError(errno.EAFNOSUPPORT, "Address family not supported by protocol")
+        return real_socket(family, *args)
+
+    monkeypatch.setattr(oprobe_http.socket, "socket", fake_socket)
+    res = HttpProber("cold", timeout=1.0).probe("http://dual.example:9/")
+    assert res["ok"] is False
+    assert res["error"] and "AttributeError" not in res["error"]
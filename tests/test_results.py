@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from run_all_tests import ResultWriter
+
+
+def _writer(tmp_path):
+    return ResultWriter(str(tmp_path / "r.txt"), str(tmp_path / "r.jsonl"), "HEAD\n", "b1")
+
+
+def test_blocks_are_written_in_index_order(tmp_path):
+    w = _writer(tmp_path)
+    w.block(1, "one\n")
+    assert (tmp_path / "r.txt").read_text() == "HEAD\n"
+    w.block(0, "zero\n")
+    w.block(0, "zero again\n")   # ilk blok geçerli
+    w.close("FOOT\n")
+    assert (tmp_path / "r.txt").read_text() == "HEAD\nzero\n\none\nFOOT\n"
+
+
+def test_close_flushes_blocks_stuck_behind_a_missing_index(tmp_path):
+    w = _writer(tmp_path)
+    w.block(2, "two\n")
+    w.block(1, "one\n")
+    w.close()
+    assert (tmp_path / "r.txt").read_text() == "HEAD\none\n\ntwo\n"
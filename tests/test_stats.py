@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+
+from oprobe_stats import P2Quantile, SlidingWindow, StreamStats, Welford, percentile
+
+
+def test_p2_exact_for_small_n():
+    for n in (1, 2, 5, 6, 20):
+        data = list(range(n))
+        for p in (5, 50, 95):
+            est = P2Quantile(p)
+            for x in data:
+                est.add(x)
+            assert abs(est.value - percentile(sorted(data), p)) < 1e-9, (n, p)
+
+
+def test_p2_five_values_spread():
+    lo, hi = P2Quantile(5), P2Quantile(95)
+    for x in range(5):
+        lo.add(x)
+        hi.add(x)
+    assert abs(lo.value - 0.2) < 1e-9 and abs(hi.value - 3.8) < 1e-9
+
+
+def test_p2_streaming_after_buffer():
+    rnd = random.Random(1)
+    data = [rnd.gauss(50, 10) for _ in range(20000)]
+    for p in (5, 50, 95):
+        est = P2Quantile(p, exact=50)
+        for x in data:
+            est.add(x)
+        exact = percentile(sorted(data), p)
+        assert abs(est.value - exact) < 1.0, (p, est.value, exact)
+
+
+def test_streamstats_quantiles_short_run():
+    st = StreamStats(quantiles=(5, 95))
+    for x in range(6):
+        st.add(x)
+    s = st.summary()
+    assert s["p5_ms"] < s["p95_ms"]
+
+
+def test_sliding_window_stddev_keeps_precision_for_small_spread():
+    # ~20 ms RTT'ler, µs mertebesinde yayılım: sumsq/n - mean² burada sadeleşmeden çöker
+    rnd = random.Random(3)
+    w = SlidingWindow(10)
+    values = []
+    for i in range(5000):
+        x = 1e6 + 20.0 + rnd.gauss(0, 0.001)
+        w.add(x, now=i * 0.01)
+        values.append((i * 0.01, x))
+    live = [x for t, x in values if t > 49.99 - 10]
+    st = w.summary(now=49.99)
+    mean = sum(live) / len(live)
+    exact = math.sqrt(sum((x - mean) ** 2 for x in live) / len(live))
+    assert st["n"] == len(live)
+    assert abs(st["stddev_ms"] - exact) < 1e-3 * exact, (st["stddev_ms"], exact)
+
+
+def test_welford_remove_undoes_add():
+    w = Welford()
+    for x in (5.0, 7.0, 9.0, 11.0):
+        w.add(x)
+    w.remove(5.0)
+    w.remove(7.0)
+    assert w.n == 2 and abs(w.mean - 10.0) < 1e-12 and abs(w.pvariance - 1.0) < 1e-12
+    w.remove(9.0)
+    w.remove(11.0)
+    assert w.n == 0 and w.mean == 0.0 and w.pvariance == 0.0
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+
+from oprobe_stats import ConvergenceTracker
+from oprobe_targets import RotatingSchedule, make_target
+
+DAEMON_INTERVAL = 300   # TEST_SPECS["https_latency.py"]["interval"]
+
+
+def _targets(n, seed=7):
+    rnd = random.Random(seed)
+    return [make_target(f"https://t{i}.example", weight=rnd.choice((1, 1, 2)),
+                        interval=rnd.choice((300, 600, 900, 1500, 3000)), tags=None) for i in range(n)]
+
+
+def test_every_target_due_within_its_period_on_daemon_cadence(tmp_path):
+    # Daemon her 300 s'de yeni bir süreç başlatır, süreç tek tur ölçüp ölür: sayaç dosyadan sürer
+    targets = _targets(100)
+    state = str(tmp_path / "rotation.json")
+    periods = {t["url"]: max(1, round(t["interval"] / t["weight"] / DAEMON_INTERVAL)) for t in targets}
+    seen = {}
+    runs = 2 * max(periods.values())
+    for run in range(runs):
+        sched = RotatingSchedule(targets, DAEMON_INTERVAL, state_path=state)
+        for t in sched.due():
+            seen.setdefault(t["url"], []).append(run)
+    for url, k in periods.items():
+        runs_seen = seen.get(url, [])
+        assert runs_seen, f"{url} never due"
+        # k ardışık çalıştırmanın her penceresinde tam bir kez
+        for start in range(runs - k + 1):
+            assert sum(start <= r < start + k for r in runs_seen) == 1, url
+
+
+def test_rounds_are_balanced(tmp_path):
+    targets = _targets(500)
+    sched = RotatingSchedule(targets, DAEMON_INTERVAL, state_path=str(tmp_path / "rotation.json"))
+    counts = [len(sched.due()) for _ in range(30)]
+    expected = sched.expected_per_round()
+    assert all(abs(c - expected) <= 5 for c in counts), (counts, expected)
+
+
+def test_counter_survives_restart_and_bad_state(tmp_path):
+    state = tmp_path / "rotation.json"
+    targets = _targets(10)
+    first = RotatingSchedule(targets, DAEMON_INTERVAL, state_path=str(state))
+    r0 = first.next_round()
+    assert RotatingSchedule(targets, DAEMON_INTERVAL, state_path=str(state)).next_round() == r0 + 1
+    state.write_text("not json")
+    # Bozuk dosya: duvar saatinden yeniden başlar, hata vermez
+    assert RotatingSchedule(targets, DAEMON_INTERVAL, state_path=str(state)).next_round() >= 0
+
+
+
+def test_convergence_rounds_take_one_rotation_slot_per_run(tmp_path, records, monkeypatch):
+    import https_latency
+    records(https_latency)
+    path = tmp_path / "targets.csv"
+    path.write_text("url,weight,interval\n" + "".join(f"https://t{i}.example,1,{300 * (i % 3 + 1)}\n"
+                                                      for i in range(12)))
+    state = tmp_path / https_latency.ROTATION_STATE_FILE
+    monkeypatch.setattr(https_latency, "TARGETS_FILE", str(path))
+    monkeypatch.setattr(https_latency, "ROUND_SECONDS", DAEMON_INTERVAL)
+    monkeypatch.setattr(https_latency, "STATE_DIR", str(tmp_path))
+    # Aynı tur ortalamaları: tam 4 turda yakınsar
+    monkeypatch.setattr(https_latency, "convergence_from_env",
+                        lambda: ConvergenceTracker(min_duration=0.0, max_duration=60.0, min_samples=4))
+    probed = []
+    monkeypatch.setattr(https_latency, "perform_https_test",
+                        lambda targets: probed.append([t["url"] for t in targets]) or [[] for _ in targets])
+    monkeypatch.setattr(https_latency, "summarize_results", lambda n, targets, results: 10.0)
+
+    counters = []
+    for _ in range(3):   # daemon: her çalıştırma yeni süreç, yakınsama turları art arda
+        monkeypatch.setattr(https_latency, "_schedule", None)
+        probed.clear()
+        https_latency.main()
+        assert len(probed) == 4 and all(p == probed[0] for p in probed)
+        counters.append(json.loads(state.read_text())["round"])
+    assert counters[1] == counters[0] + 1 and counters[2] == counters[0] + 2
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import time
+
+from conftest import AUTH_DELAY_MS
+from oprobe_tsdb import TimeSeriesStore, query, rollup, series_target
+
+
+def _rolled_up(tmp_path, items):
+    # Hepsi aynı dakika kovasına düşsün: dakika sınırında koşan test ikiye bölünmesin
+    ts = time.time() // 60 * 60 - 570
+    store = TimeSeriesStore(str(tmp_path / "tsdb.sqlite"))
+    for rec in items:
+        store.add_record(dict(rec, ts=ts))
+    store.flush()
+    conn = store._db()
+    rollup(conn, now=time.time() + 2 * 86400)
+    return conn
+
+
+def test_series_key_carries_label_fields():
+    rec = {"type": "sample", "target": "8.8.8.8", "mode": "miss", "scope": "dist", "transport": "dot"}
+    assert series_target(rec) == "8.8.8.8|mode=miss|scope=dist|transport=dot"
+    assert series_target({"type": "summary", "target": "x", "phase": "load"}) == "x|phase=load"
+
+
+def test_dns_hit_and_miss_roll_up_separately(tmp_path, standin, dns_probe):
+    drl, records = dns_probe
+    server = f"127.0.0.1#{standin.port}"
+    results = [("hit",) + drl.query_domain(server, d, "hit") for d in ("google.com", "cloudflare.com")]
+    results += [("miss",) + drl.query_domain(server, "oprobe.test", "miss") for _ in range(3)]
+    drl.report_server(server, 1, results)
+    conn = _rolled_up(tmp_path, records.items)
+    since = time.time() - 3600
+
+    def one(metric, kind, **labels):
+        rows = query(conn, "dns_resol_latency", metric, since, res=60, kind=kind, labels=labels)
+        assert len({r["target"] for r in rows}) == 1, rows
+        return rows[0]
+
+    hit, miss = one("latency_ms", "sample", mode="hit"), one("latency_ms", "sample", mode="miss")
+    assert (hit["count"], miss["count"]) == (2, 3)
+    assert miss["min"] >= AUTH_DELAY_MS > hit["max"]
+    # Dağılım özetleri (scope=dist) tur özetiyle aynı seriye düşmez
+    dist_miss = one("p95_ms", "summary", mode="miss", scope="dist")
+    assert dist_miss["target"] == f"{server}|mode=miss|scope=dist"
+    rounds = query(conn, "dns_resol_latency", "miss_ok", since, res=60, kind="summary", target=server)
+    assert [r["max"] for r in rounds] == [3]
+
+
+def _probe(kind, total_ms):
+    res = {"ok": True, "status": 200, "body": "head", "mode": kind, "error": None, "bytes_in": 100,
+           "bytes_out": 50, "total_ms": total_ms, "reused": kind == "warm", "resumed": kind == "resumed",
+           "dns_ms": None, "tcp_ms": None, "tls_ms": None, "ttfb_ms": total_ms, "transfer_ms": 0.0}
+    if kind != "warm":
+        res.update(dns_ms=1.0, tcp_ms=10.0)
+    return res
+
+
+def test_https_connection_modes_roll_up_separately(tmp_path, records, monkeypatch):
+    import https_latency
+    rec = records(https_latency)
+    monkeypatch.setattr(https_latency, "_phase_stats", {})
+    targets = [{"url": "https://a.example/", "tags": ()}, {"url": "https://b.example/", "tags": ()}]
+    for rnd in (1, 2):
+        results = [[_probe("cold", 90.0), _probe("resumed", 60.0), _probe("warm", 20.0)] for _ in targets]
+        https_latency.summarize_results(rnd, targets, results)
+    conn = _rolled_up(tmp_path, rec.items)
+    since = time.time() - 3600
+
+    avg = {r["target"]: r["avg"] for r in query(conn, "https_latency", "avg_ms", since, res=60, kind="summary")}
+    # Tur özeti (AVG_KIND) ve tür başına özetler ayrı seriler: üç mod tek ortalamada karışmaz
+    assert avg == {"all": 90.0, "all|mode=cold": 90.0, "all|mode=resumed": 60.0, "all|mode=warm": 20.0}
+    warm = query(conn, "https_latency", "latency_ms", since, res=60, kind="sample",
+                 target="https://a.example/|mode=warm")
+    assert [(r["count"], r["max"]) for r in warm] == [(2, 20.0)]
+
+
+def test_jitter_window_reports_and_run_summary_roll_up_separately(tmp_path, records, monkeypatch):
+    import jitter_test
+    from oprobe_stats import SlidingWindow, StreamStats
+    rec = records(jitter_test)
+    stats, window = StreamStats(quantiles=(5, 95)), SlidingWindow(60)
+    monkeypatch.setattr(jitter_test, "_stats", stats)
+    monkeypatch.setattr(jitter_test, "_window", window)
+    monkeypatch.setattr(jitter_test, "_total", 4)
+    monkeypatch.setattr(jitter_test, "_timeouts", 0)
+    for x in (10.0, 10.0, 10.0, 10.0):
+        stats.add(x)
+    for x in (100.0, 100.0):
+        window.add(x)
+    window.add_missing(2)
+    jitter_test.report_window(jitter_test.TARGET_URL, jitter_test.CONNECTION_MODE)
+    jitter_test.print_summary()
+    conn = _rolled_up(tmp_path, rec.items)
+    since = time.time() - 3600
+
+    base = f"{jitter_test.TARGET_URL}|mode={jitter_test.CONNECTION_MODE}"
+    avg = {r["target"]: r["avg"] for r in query(conn, "jitter_test", "avg_ms", since, res=60, kind="summary")}
+    assert avg == {base: 10.0, f"{base}|scope=window": 100.0}
+    loss = query(conn, "jitter_test", "loss_pct", since, res=60, kind="summary", labels={"scope": "window"})
+    assert [r["avg"] for r in loss] == [50.0]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import time
+
+from oprobe_stats import SlidingWindow
+from oprobe_udpjitter import REORDER_HORIZON, UdpJitterProbe, build_packet
+
+
+def _feed(probe, seqs):
+    for seq in seqs:
+        now = time.time_ns()
+        probe._on_packet(build_packet(probe.session, seq, probe.size, tx_ns=now - 1_000_000), now)
+
+
+def test_reordered_packet_inside_horizon_is_not_lost():
+    window = SlidingWindow(60)
+    probe = UdpJitterProbe("127.0.0.1", window=window)
+    _feed(probe, [0, 2, 3])
+    assert probe.missing() == 0
+    _feed(probe, [1] + list(range(4, REORDER_HORIZON + 10)))
+    assert probe.missing() == 0 and probe.reordered == 1
+    window.add_missing(probe.missing())
+    assert window.summary()["loss_pct"] == 0.0
+
+
+def test_gap_is_counted_once_and_late_arrival_stays_out_of_window():
+    window = SlidingWindow(60)
+    probe = UdpJitterProbe("127.0.0.1", window=window)
+    _feed(probe, [0, 2])
+    assert probe.missing() == 0   # 1 hâlâ yolda olabilir
+    _feed(probe, range(3, REORDER_HORIZON + 2))
+    assert probe.missing() == 1
+    window.add_missing(probe.missing())
+
+    _feed(probe, [1])   # ufuktan sonra geldi: pencerede zaten kayıp
+    assert probe.missing() == 1 and probe.received == REORDER_HORIZON + 2
+    st = window.summary()
+    assert st["missed"] == 1 and st["n"] == REORDER_HORIZON + 1
@@ -5,6 +5,8 @@ import os, re, sys, time, shutil, socket, platform, subprocess
 from datetime import datetime
 from typing import Dict, Optional, List
 
+from oprobe_records import RecordStream
+
 REFRESH_SEC = 3
 INTERNAL_PING_HOST = "1.1.1.1"
 PING_TIMEOUT_SEC = 1.5
@@ -17,6 +19,8 @@ HEADERS = [
 IS_MAC = platform.system() == "Darwin"
 IS_LINUX = platform.system() == "Linux"
 
+REC = RecordStream("wificheck")
+
 def run(cmd: List[str], timeout: float = 2.5) -> str:
     try:
         out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
@@ -272,6 +276,10 @@ def classify_perf(signal: str, snr: str, gtw_ms: Optional[float], int_ms: Option
         score += 3 if int_ms<=10 else 2 if int_ms<=25 else 1 if int_ms<=60 else 0
     return "Excellent" if score>=9 else "Good" if score>=6 else "Fair" if score>=3 else "Poor"
 
+def _num(text: str) -> Optional[float]:
+    m = re.search(r"[-+]?\d+\.?\d*", str(text or ""))
+    return float(m.group(0)) if m else None
+
 def display_header():
     print("Real-Time Wi-Fi Analysis Started (Press CTRL+C to stop)")
     widths = [19,17,12,18,10,7,16,12,14,6,8,8,6,8,6,16]
@@ -303,6 +311,7 @@ def main_loop():
 
             if not wi or wi.get("ssid","-") in ("-",""):
                 render_row(not_connected_row())
+                REC.diagnostic("wifi", "not_connected")
                 time.sleep(REFRESH_SEC); continue
 
             mac = wi.get("mac","-")
@@ -332,6 +341,8 @@ def main_loop():
             row = [ts(), mac, ssid, bssid, freq, str(chan) if chan else "-",
                    rssi, tx, thr, snr, gstr, istr, dhcp, dns, auth, perf]
             render_row(row)
+            REC.sample(ssid, {"rssi_dbm": _num(rssi), "snr_db": _num(snr), "gateway_ms": gms,
+                              "internet_ms": ims}, bssid=bssid, channel=chan, perf=perf)
             time.sleep(REFRESH_SEC)
         except KeyboardInterrupt:
             print("\nStopped."); break